@@ -0,0 +1,93 @@
+"""Load benchmark for the async chat pipeline.
+
+Drives ``NexusAgent.process_message`` with N concurrent chats against a stubbed
+LLM (fixed per-call latency, no network) and real memory stores in a temporary
+data directory. A probe coroutine measures event-loop responsiveness the same
+way ``/health`` would see it while the chats are in flight.
+
+    cd backend && python -m benchmarks.chat_load --concurrency 32 --requests 256
+"""
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+from core.agent import NexusAgent
+
+class StubLLM:
+    """Stands in for LLMClient; every call just waits ``latency`` seconds."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate(self, messages: List[Dict], system: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 4096) -> str:
+        await asyncio.sleep(self.latency)
+        return "stub response"
+
+    async def generate_with_tools(self, messages: List[Dict], tools: List[Dict], system: Optional[str] = None,
+                                  tool_choice: Optional[str] = None) -> Dict:
+        await asyncio.sleep(self.latency)
+        return {
+            "content": [{"type": "text", "text": "stub response"}],
+            "stop_reason": "end_turn",
+            "tool_calls": [],
+            "usage": {"input_tokens": 0, "output_tokens": 0}
+        }
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def probe_loop(stop: asyncio.Event, interval: float, lags: List[float]):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def run(concurrency: int, total: int, latency: float, data_dir: str):
+    agent = NexusAgent(data_dir=data_dir, llm=StubLLM(latency))
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one_chat(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await agent.process_message(f"benchmark message {i} about topic {i % 17}")
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    lags: List[float] = []
+    probe = asyncio.create_task(probe_loop(stop, 0.01, lags))
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one_chat(i) for i in range(total)))
+    wall = time.perf_counter() - wall_start
+
+    stop.set()
+    await probe
+    agent.close()
+
+    print(f"chats={total} concurrency={concurrency} llm_latency={latency * 1000:.0f}ms")
+    print(f"wall={wall:.2f}s throughput={total / wall:.1f} chats/s")
+    print(f"latency p50={percentile(latencies, 50) * 1000:.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+          f"mean={statistics.mean(latencies) * 1000:.1f}ms")
+    if lags:
+        print(f"event-loop lag p50={percentile(lags, 50) * 1000:.2f}ms "
+              f"p99={percentile(lags, 99) * 1000:.2f}ms max={max(lags) * 1000:.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=128)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per stubbed LLM call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        asyncio.run(run(args.concurrency, args.requests, args.llm_latency, data_dir))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Embedding throughput: per-text calls vs batching vs the embedding cache.
+
+Two workloads against the real sentence-transformers model:
+
+* ``backfill``: embed ``--texts`` memories (a fraction repeated) one model
+  call per text, then in one batched ``Embedder.embed`` call, then again
+  with the embedding cache warm
+* ``concurrent``: ``--concurrency`` threads each embed single messages, the
+  way concurrent chats do; once with a model call per message and once
+  through the Embedder's cross-request batching
+
+    cd backend && python -m benchmarks.embedding --texts 2000 --concurrency 32
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+import argparse
+import random
+import time
+
+from benchmarks.chat_load import percentile
+from core.memory.embedder import Embedder
+from core.memory.embedding_cache import EmbeddingCache
+
+WORDS = ("deploy build cache error timeout retry user agent memory vector index query token stream "
+         "session worker process thread file parse config server client request response").split()
+
+def make_texts(count: int, repeat_fraction: float, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    texts = [f"{i} " + " ".join(rng.choices(WORDS, k=16)) for i in range(count)]
+    for i in rng.sample(range(count), int(count * repeat_fraction)):
+        texts[i] = texts[rng.randrange(count)]
+    return texts
+
+def report(label: str, texts: int, elapsed: float, latencies: List[float] = None, extra: str = ""):
+    line = f"  {label:<28} {texts / elapsed:8.1f} texts/s  total={elapsed:.2f}s"
+    if latencies:
+        line += f" p50={percentile(latencies, 50) * 1000:.1f}ms p99={percentile(latencies, 99) * 1000:.1f}ms"
+    print(line + extra)
+
+def backfill(args):
+    texts = make_texts(args.texts, args.repeat, args.seed)
+    print(f"\nbackfill texts={len(texts)} repeated={args.repeat:.0%}")
+
+    direct = Embedder(args.model)
+    direct.encode(["warm up"])
+    started = time.perf_counter()
+    for text in texts:
+        direct.encode([text])
+    report("one call per text", len(texts), time.perf_counter() - started)
+
+    embedder = Embedder(args.model, cache=EmbeddingCache(max_entries=len(texts)), max_batch=args.max_batch)
+    embedder.encode(["warm up"])
+    for label in ("batched, cold cache", "batched, warm cache"):
+        started = time.perf_counter()
+        embedder.embed(texts)
+        stats = embedder.get_stats()
+        report(label, len(texts), time.perf_counter() - started,
+               extra=f" batches={stats['batches']} hit_rate={stats['cache']['hit_rate']:.2f}")
+    embedder.close()
+
+def concurrent(args):
+    texts = make_texts(args.concurrency * args.requests, 0.0, args.seed + 1)
+    print(f"\nconcurrent threads={args.concurrency} messages={len(texts)}")
+
+    def drive(embed: Callable[[List[str]], object]) -> List[float]:
+        def one(text: str) -> float:
+            start = time.perf_counter()
+            embed([text])
+            return time.perf_counter() - start
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            return list(pool.map(one, texts))
+
+    direct = Embedder(args.model)
+    direct.encode(["warm up"])
+    started = time.perf_counter()
+    latencies = drive(direct.encode)
+    report("one call per message", len(texts), time.perf_counter() - started, latencies)
+
+    embedder = Embedder(args.model, max_batch=args.max_batch, max_wait=args.max_wait / 1000)
+    embedder.encode(["warm up"])
+    started = time.perf_counter()
+    latencies = drive(embedder.embed)
+    stats = embedder.get_stats()
+    report("cross-request batching", len(texts), time.perf_counter() - started, latencies,
+           extra=f" avg_batch={stats['avg_batch_size']:.1f}")
+    embedder.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--repeat", type=float, default=0.2, help="fraction of backfill texts that repeat another")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20, help="messages per thread")
+    parser.add_argument("--max-batch", type=int, default=512)
+    parser.add_argument("--max-wait", type=float, default=0.0, help="milliseconds to hold a batch open")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    backfill(args)
+    concurrent(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Local mock of the Anthropic Messages and OpenAI Chat Completions APIs.
+
+Answers every request with a short canned text after ``--latency`` seconds and
+fails a ``--error-rate`` fraction of requests with HTTP 429 plus a
+``retry-after`` header, which exercises LLMClient's limiter, retries and
+connection reuse without network access or API keys.
+
+    cd backend && python -m benchmarks.mock_llm_server --port 8100 --latency 0.2
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8100 ANTHROPIC_API_KEY=mock uvicorn main:app
+"""
+from typing import Dict
+import argparse
+import asyncio
+import json
+import random
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+app = FastAPI(title="Mock LLM API")
+settings = {"latency": 0.2, "error_rate": 0.0, "retry_after": 0.1, "text": "This is a mock response."}
+counters = {"requests": 0, "throttled": 0}
+
+def _throttle():
+    counters["requests"] += 1
+    if random.random() < settings["error_rate"]:
+        counters["throttled"] += 1
+        return JSONResponse(
+            {"type": "error", "error": {"type": "rate_limit_error", "message": "mock rate limit"}},
+            status_code=429,
+            headers={"retry-after": str(settings["retry_after"])}
+        )
+    return None
+
+def _sse(event: Dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+@app.post("/v1/messages")
+async def messages(request: Request):
+    body = await request.json()
+    throttled = _throttle()
+    if throttled is not None:
+        return throttled
+    await asyncio.sleep(settings["latency"])
+
+    message_id = f"msg_{uuid.uuid4().hex}"
+    usage = {"input_tokens": 100, "output_tokens": 10}
+    if not body.get("stream"):
+        return {
+            "id": message_id, "type": "message", "role": "assistant", "model": body["model"],
+            "content": [{"type": "text", "text": settings["text"]}],
+            "stop_reason": "end_turn", "stop_sequence": None, "usage": usage
+        }
+
+    async def events():
+        yield _sse({"type": "message_start", "message": {
+            "id": message_id, "type": "message", "role": "assistant", "model": body["model"], "content": [],
+            "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": 100, "output_tokens": 0}}})
+        yield _sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        for word in settings["text"].split(" "):
+            yield _sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": word + " "}})
+        yield _sse({"type": "content_block_stop", "index": 0})
+        yield _sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                    "usage": {"output_tokens": 10}})
+        yield _sse({"type": "message_stop"})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    throttled = _throttle()
+    if throttled is not None:
+        return throttled
+    await asyncio.sleep(settings["latency"])
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": 0, "model": body["model"],
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": settings["text"]}}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110}
+    }
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="retry-after seconds sent with 429s")
+    args = parser.parse_args()
+
+    settings.update(latency=args.latency, error_rate=args.error_rate, retry_after=args.retry_after)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
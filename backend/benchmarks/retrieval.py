@@ -0,0 +1,120 @@
+"""Recall and latency of vector, lexical (BM25) and hybrid memory retrieval.
+
+Builds a synthetic memory corpus per size: each memory is a dozen words from
+a Zipf-distributed vocabulary, and a third also carry a unique identifier
+such as ``E0001234``. Two query sets target known memories:
+
+* ``identifier``: "what caused E0001234 again", the exact-match case
+* ``paraphrase``: six of the memory's words in random order
+
+Vector search is exact cosine search over averaged random word vectors,
+standing in for the embedding model and Chroma's HNSW index (an upper bound
+on ANN recall). Lexical search is the agent's InvertedIndex; hybrid fuses
+both with VectorMemory's reciprocal_rank_fusion, the same code the agent
+runs. The 1M size needs several GB of RAM; pass ``--sizes`` to pick others.
+
+    cd backend && python -m benchmarks.retrieval --sizes 10000 100000 1000000
+"""
+from typing import Dict, List, Tuple
+import argparse
+import itertools
+import random
+import time
+
+import numpy as np
+
+from benchmarks.chat_load import percentile
+from core.memory.text_index import InvertedIndex, tokenize
+from core.memory.vector_store import reciprocal_rank_fusion
+
+class Corpus:
+    def __init__(self, size: int, vocab_size: int, dim: int, seed: int):
+        rng = random.Random(seed)
+        self.rng = rng
+        self.vocab = [f"w{i}" for i in range(vocab_size)]
+        cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(vocab_size)))
+        self.documents = []
+        for i in range(size):
+            words = rng.choices(self.vocab, cum_weights=cum_weights, k=12)
+            if i % 3 == 0:
+                words.insert(rng.randrange(len(words) + 1), f"E{i:07d}")
+            self.documents.append(" ".join(words))
+
+        self.dim = dim
+        self._np_rng = np.random.default_rng(seed)
+        self._word_ids: Dict[str, int] = {}
+        token_ids = [[self._word_id(word) for word in tokenize(document)] for document in self.documents]
+        self._word_vectors = self._np_rng.standard_normal((len(self._word_ids), dim)).astype(np.float32)
+        lengths = np.array([len(ids) for ids in token_ids])
+        sums = np.add.reduceat(self._word_vectors[np.concatenate(token_ids)], np.r_[0, np.cumsum(lengths)[:-1]])
+        self.matrix = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+
+    def _word_id(self, word: str) -> int:
+        return self._word_ids.setdefault(word, len(self._word_ids))
+
+    def embed(self, text: str) -> np.ndarray:
+        # Every query word also occurs in the corpus
+        vector = self._word_vectors[[self._word_ids[word] for word in tokenize(text) if word in self._word_ids]].sum(axis=0)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def queries(self, count: int) -> Dict[str, List[Tuple[str, int]]]:
+        with_ids = range(0, len(self.documents), 3)
+        identifier = [(f"what caused E{target:07d} again", target)
+                      for target in self.rng.sample(with_ids, min(count, len(with_ids)))]
+        paraphrase = []
+        for target in self.rng.sample(range(len(self.documents)), count):
+            words = [w for w in self.documents[target].split() if not w.startswith("E")]
+            paraphrase.append((" ".join(self.rng.sample(words, min(6, len(words)))), target))
+        return {"identifier": identifier, "paraphrase": paraphrase}
+
+def vector_search(corpus: Corpus, query: str, k: int) -> List[str]:
+    similarities = corpus.matrix @ corpus.embed(query)
+    top = np.argpartition(-similarities, k)[:k]
+    return [str(i) for i in top[np.argsort(-similarities[top])]]
+
+def run(size: int, args):
+    started = time.perf_counter()
+    corpus = Corpus(size, args.vocab, args.dim, args.seed)
+    index = InvertedIndex()
+    for i, document in enumerate(corpus.documents):
+        index.add(str(i), document)
+    print(f"\nmemories={size} build={time.perf_counter() - started:.1f}s")
+
+    candidates = args.k * 4
+    searches = {
+        "vector": lambda q: vector_search(corpus, q, candidates),
+        "lexical": lambda q: [key for key, _ in index.search(q, limit=candidates)],
+        "hybrid": lambda q: [key for key, _ in reciprocal_rank_fusion(
+            [vector_search(corpus, q, candidates), [key for key, _ in index.search(q, limit=candidates)]]
+        )]
+    }
+
+    for query_type, queries in corpus.queries(args.queries).items():
+        for mode, search in searches.items():
+            hits = {1: 0, 5: 0, args.k: 0}
+            latencies = []
+            for query, target in queries:
+                start = time.perf_counter()
+                ranked = search(query)[:args.k]
+                latencies.append(time.perf_counter() - start)
+                for cutoff in hits:
+                    hits[cutoff] += str(target) in ranked[:cutoff]
+            recall = " ".join(f"recall@{cutoff}={count / len(queries):.3f}" for cutoff, count in sorted(hits.items()))
+            print(f"  {query_type:<10} {mode:<7} {recall} "
+                  f"p50={percentile(latencies, 50) * 1000:.2f}ms p99={percentile(latencies, 99) * 1000:.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200, help="queries per query type")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--vocab", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args)
+
+if __name__ == "__main__":
+    main()
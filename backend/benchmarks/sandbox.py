@@ -0,0 +1,78 @@
+"""Latency and throughput of the execute_code sandbox.
+
+* ``cold``: start a one-worker SandboxPool per snippet, the cost of a fresh
+  process (interpreter start, rlimits, preloaded imports) on every call
+* ``warm``: the same snippets on an already running pool
+* ``parallel``: CPU-bound snippets submitted from many threads at once, for
+  1..N workers, to show execution spreading across cores
+
+    cd backend && python -m benchmarks.sandbox --runs 20 --workers 1 2 4
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import argparse
+import time
+
+from benchmarks.chat_load import percentile
+from core.tools.sandbox import SandboxPool
+
+SNIPPET = "import math\nvalues = [math.sqrt(i) for i in range(1000)]\ntotal = sum(values)\nprint(round(total, 2))"
+CPU_SNIPPET = "total = sum(i * i for i in range({n}))"
+
+def summarize(label: str, latencies: List[float]):
+    print(f"  {label:<10} p50={percentile(latencies, 50) * 1000:8.2f}ms "
+          f"p99={percentile(latencies, 99) * 1000:8.2f}ms")
+
+def cold(runs: int) -> List[float]:
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pool = SandboxPool(workers=1)
+        pool.run(SNIPPET)
+        latencies.append(time.perf_counter() - start)
+        pool.close()
+    return latencies
+
+def warm(runs: int) -> List[float]:
+    pool = SandboxPool(workers=1)
+    pool.run(SNIPPET)
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pool.run(SNIPPET)
+        latencies.append(time.perf_counter() - start)
+    pool.close()
+    return latencies
+
+def parallel(workers: int, jobs: int, n: int) -> float:
+    pool = SandboxPool(workers=workers, timeout=60.0)
+    with ThreadPoolExecutor(workers) as executor:
+        list(executor.map(pool.run, ["pass"] * workers))
+        start = time.perf_counter()
+        results = list(executor.map(pool.run, [CPU_SNIPPET.format(n=n)] * jobs))
+        elapsed = time.perf_counter() - start
+    pool.close()
+    assert all(result["success"] for result in results), results
+    return jobs / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--jobs", type=int, default=16, help="CPU-bound snippets per parallel run")
+    parser.add_argument("--n", type=int, default=2000000, help="loop size of the CPU-bound snippet")
+    args = parser.parse_args()
+
+    print(f"latency over {args.runs} runs")
+    summarize("cold", cold(args.runs))
+    summarize("warm", warm(args.runs))
+
+    print(f"\nparallel jobs={args.jobs}")
+    baseline = None
+    for workers in args.workers:
+        throughput = parallel(workers, args.jobs, args.n)
+        baseline = baseline or throughput
+        print(f"  workers={workers:<3} {throughput:6.2f} snippets/s scaling={throughput / baseline:4.2f}x")
+
+if __name__ == "__main__":
+    main()
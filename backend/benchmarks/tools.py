@@ -0,0 +1,82 @@
+"""Cost of a large tool catalog in ToolRegistry.
+
+Writes a plugin manifest of ``--tools`` tools into a temporary directory
+and measures:
+
+* ``startup``: building a ToolRegistry that loads the manifest (schemas
+  checked and compiled, no tool module imported)
+* ``definitions``: ``get_tool_definitions``, called on every chat turn and
+  by ``/tools``
+* ``validate``: input validation of one call against a compiled schema
+* ``cached call``: a repeated call to a pure tool answered from the result
+  cache
+
+    cd backend && python -m benchmarks.tools --tools 100 500 1000
+"""
+from typing import Callable
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from core.tools.sandbox import SandboxPool
+from core.tools.tool_registry import ToolRegistry
+
+PLUGIN = "def run(query, limit=10, tags=None):\n    return {'success': True, 'query': query, 'limit': limit}\n"
+
+def tool_spec(index: int) -> dict:
+    return {
+        "name": f"plugin_tool_{index}",
+        "description": f"Benchmark tool number {index}",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "minLength": 1, "description": "What to look up"},
+                "limit": {"type": "integer", "minimum": 1, "maximum": 100},
+                "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 10}
+            },
+            "required": ["query"],
+            "additionalProperties": False
+        },
+        "function": "bench_plugin.py:run",
+        "pure": True
+    }
+
+def per_call(function: Callable, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - start) / runs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--runs", type=int, default=10000)
+    args = parser.parse_args()
+
+    sandbox = SandboxPool(workers=1)
+    parameters = {"query": "weather in Oslo", "limit": 5, "tags": ["forecast"]}
+    for count in args.tools:
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "bench_plugin.py"), "w") as f:
+                f.write(PLUGIN)
+            with open(os.path.join(directory, "tools.json"), "w") as f:
+                json.dump({"tools": [tool_spec(i) for i in range(count)]}, f)
+
+            start = time.perf_counter()
+            registry = ToolRegistry(sandbox=sandbox, plugin_dirs=[directory], plugin_entry_points=False)
+            startup = time.perf_counter() - start
+
+            tool = registry.tools["plugin_tool_0"]
+            definitions = per_call(registry.get_tool_definitions, args.runs)
+            validate = per_call(lambda: tool["validate"](parameters), args.runs)
+            registry.execute_tool("plugin_tool_0", parameters)
+            cached = per_call(lambda: registry.execute_tool("plugin_tool_0", parameters), args.runs)
+
+        print(f"tools={count:<5} startup={startup * 1000:7.2f}ms definitions={definitions * 1e6:6.2f}us "
+              f"validate={validate * 1e6:6.2f}us cached call={cached * 1e6:6.2f}us")
+    sandbox.close()
+
+if __name__ == "__main__":
+    main()
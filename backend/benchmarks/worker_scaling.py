@@ -0,0 +1,155 @@
+"""Throughput of the HTTP API as the number of uvicorn workers grows.
+
+For each worker count, starts ``uvicorn main:app --workers N`` in shared-state
+mode (``STORAGE_BACKEND=sqlite`` plus a Chroma server) against the local mock
+LLM server, then drives ``/chat`` with a fixed number of concurrent clients
+for a fixed time. All runs share one mock LLM and one Chroma server; each run
+gets a fresh data directory.
+
+    cd backend && python -m benchmarks.worker_scaling --workers 1 2 4 --concurrency 64
+
+Pass ``--chroma-host``/``--chroma-port`` to use a running Chroma server instead
+of starting ``chroma run``, or ``--vector-backend numpy`` to share the
+memory-mapped NumPy index from the data directory with no server at all.
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.chat_load import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+def stop(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+async def drive(base_url: str, concurrency: int, duration: float) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(worker: int, http: httpx.AsyncClient):
+        nonlocal errors
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await http.post("/chat", json={"message": f"client {worker} message {i} about topic {i % 17}"})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                errors += 1
+            i += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as http:
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(client(worker, http) for worker in range(concurrency)))
+        wall = time.perf_counter() - wall_start
+
+    return {"requests": len(latencies), "errors": errors, "wall": wall, "latencies": latencies}
+
+def run_workers(workers: int, args, env: Dict) -> Dict:
+    with tempfile.TemporaryDirectory() as data_dir:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env={**env, "DATA_DIR": data_dir}
+        )
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            wait_ready(f"{base_url}/health", process)
+            # Warm every worker's embedding model and connection pools
+            asyncio.run(drive(base_url, args.concurrency, min(2.0, args.duration)))
+            return asyncio.run(drive(base_url, args.concurrency, args.duration))
+        finally:
+            stop(process)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per worker count")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--llm-port", type=int, default=8100)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per mock LLM call")
+    parser.add_argument("--vector-backend", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--chroma-host", default=None)
+    parser.add_argument("--chroma-port", type=int, default=8300)
+    args = parser.parse_args()
+
+    helpers = []
+    chroma_dir = tempfile.TemporaryDirectory()
+    try:
+        mock = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.mock_llm_server", "--port", str(args.llm_port),
+             "--latency", str(args.llm_latency)],
+            cwd=BACKEND_DIR
+        )
+        helpers.append(mock)
+        wait_ready(f"http://127.0.0.1:{args.llm_port}/stats", mock)
+
+        chroma_host = args.chroma_host
+        if chroma_host is None and args.vector_backend == "chroma":
+            chroma_host = "127.0.0.1"
+            chroma = subprocess.Popen(
+                ["chroma", "run", "--path", chroma_dir.name, "--port", str(args.chroma_port)],
+                stdout=subprocess.DEVNULL
+            )
+            helpers.append(chroma)
+            wait_ready(f"http://{chroma_host}:{args.chroma_port}/api/v1/heartbeat", chroma)
+
+        env = {
+            **os.environ,
+            "LLM_PROVIDER": "anthropic",
+            "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{args.llm_port}",
+            "ANTHROPIC_API_KEY": "mock",
+            "STORAGE_BACKEND": "sqlite",
+            "VECTOR_BACKEND": args.vector_backend,
+            "CHROMA_HOST": chroma_host or "",
+            "CHROMA_PORT": str(args.chroma_port)
+        }
+
+        print(f"concurrency={args.concurrency} duration={args.duration:.0f}s llm_latency={args.llm_latency * 1000:.0f}ms")
+        baseline = None
+        for workers in args.workers:
+            result = run_workers(workers, args, env)
+            throughput = result["requests"] / result["wall"]
+            baseline = baseline or throughput
+            latencies = result["latencies"] or [0.0]
+            print(f"workers={workers:<3} throughput={throughput:7.1f} req/s scaling={throughput / baseline:4.2f}x "
+                  f"p50={percentile(latencies, 50) * 1000:.0f}ms p99={percentile(latencies, 99) * 1000:.0f}ms "
+                  f"errors={result['errors']}")
+    finally:
+        for process in reversed(helpers):
+            stop(process)
+        chroma_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
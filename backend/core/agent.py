@@ -1,67 +1,274 @@
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
+import asyncio
+import logging
+import os
+import time
+import uuid
 from .memory.vector_store import VectorMemory
+from .memory.embedder import Embedder
+from .memory.embedding_cache import EmbeddingCache
 from .memory.episodic import EpisodicMemory
+from .memory.response_cache import ResponseCache
+from .memory.write_queue import WriteBehindQueue
+from .memory.session_store import SessionStore
+from .memory.context_builder import ContextBuilder
+from .memory.reranker import CrossEncoderReranker
 from .learning.learning_engine import LearningEngine
+from .storage.sqlite_store import SQLiteStore
+from .storage.file_lock import DataDirLock
 from .llm.llm_client import LLMClient
 from .tools.tool_registry import ToolRegistry
+from .tools.sandbox import SandboxPool
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = """You are Nexus AGI, an advanced autonomous agent with memory, learning, and tool-use capabilities.
+
+Your Capabilities:
+- Access to vector memory for semantic recall
+- Episodic memory of past interactions
+- Learning engine that detects patterns and improves skills
+- Tool execution for real-world actions
+
+Approach each task thoughtfully:
+1. Consider relevant memories and past interactions
+2. Use tools when actions are needed
+3. Learn from each interaction
+4. Provide clear, helpful responses
+
+Be proactive, intelligent, and continuously learning."""
+
 class NexusAgent:
-    def __init__(self, llm_provider: str = "anthropic"):
-        self.vector_memory = VectorMemory()
-        self.episodic_memory = EpisodicMemory()
-        self.learning_engine = LearningEngine()
-        self.llm = LLMClient(provider=llm_provider)
-        self.tool_registry = ToolRegistry()
-        self.conversation_history = []
-
-    def process_message(self, user_message: str) -> Dict:
-        """Main processing pipeline"""
-        # 1. Retrieve relevant memories
-        relevant_memories = self.vector_memory.query_memory(user_message, n_results=3)
-        recent_episodes = self.episodic_memory.get_recent_episodes(n=5)
-
-        # 2. Build context
-        context = self._build_context(user_message, relevant_memories, recent_episodes)
+    def __init__(self, llm_provider: str = "anthropic", data_dir: str = "./data", llm: Optional[LLMClient] = None,
+                 max_steps: int = 8, time_budget: float = 120.0, token_budget: int = 200000,
+                 response_cache: Optional[ResponseCache] = None, write_behind: bool = True,
+                 pattern_mode: str = "keywords", storage_backend: str = "json",
+                 vector_backend: str = "chroma", vector_host: Optional[str] = None, vector_port: int = 8000,
+                 embedding_model: str = "all-MiniLM-L6-v2", embedding_cache_size: int = 10000,
+                 embedding_cache_disk: bool = False, embedding_max_wait: float = 0.0,
+                 sandbox_workers: int = 2, sandbox_timeout: float = 10.0, sandbox_memory_mb: int = 512,
+                 session_ttl: float = 3600.0, max_sessions: int = 100000,
+                 context_budget: int = 1500, history_budget: int = 2000, rerank_model: Optional[str] = None,
+                 hybrid_search: Optional[bool] = None):
+        # State can only be shared between worker processes through SQLite
+        # and either a Chroma server or the NumPy vector backend; otherwise
+        # claim the data directory exclusively
+        self._data_lock = None
+        shared = storage_backend == "sqlite" and bool(vector_host or vector_backend == "numpy")
+        if not shared:
+            self._data_lock = DataDirLock(
+                data_dir, "Set STORAGE_BACKEND=sqlite and CHROMA_HOST or VECTOR_BACKEND=numpy to run several workers."
+            )
+            self._data_lock.acquire()
+        # The BM25 half of hybrid search is a per-process index, so it is
+        # off by default when workers share state
+        if hybrid_search is None:
+            hybrid_search = not shared
+        elif shared and hybrid_search:
+            logger.warning(
+                "Shared-state mode: the BM25 index used by hybrid memory search is per process and only sees "
+                "memories stored before this worker started or added by it, so lexical matches differ between workers"
+            )
+        self.vector_memory = VectorMemory(
+            persist_directory=os.path.join(data_dir, "memory"), backend=vector_backend,
+            host=vector_host, port=vector_port, lexical=hybrid_search,
+            reranker=CrossEncoderReranker(rerank_model) if rerank_model else None,
+            embedder=Embedder(
+                embedding_model,
+                cache=EmbeddingCache(
+                    embedding_cache_size,
+                    os.path.join(data_dir, "embeddings.db") if embedding_cache_disk else None
+                ),
+                max_wait=embedding_max_wait
+            )
+        )
+        # Episodes, patterns and skills go to JSON files or one SQLite database
+        self.store = SQLiteStore(os.path.join(data_dir, "nexus.db")) if storage_backend == "sqlite" else None
+        # Bumped by clear_memories in any process; see _check_invalidation
+        self._memory_generation = self.store.generation("memory") if self.store is not None else 0
+        self.episodic_memory = EpisodicMemory(storage_path=os.path.join(data_dir, "episodic"), store=self.store)
+        self.learning_engine = LearningEngine(
+            storage_path=os.path.join(data_dir, "learning"),
+            autosave=not write_behind,
+            mode=pattern_mode,
+            store=self.store
+        )
+        self.llm = llm or LLMClient(provider=llm_provider)
+        self.tool_registry = ToolRegistry(sandbox=SandboxPool(
+            workers=sandbox_workers, timeout=sandbox_timeout, memory_mb=sandbox_memory_mb
+        ))
+        # Opt-in semantic cache of tool-free answers
+        self.response_cache = response_cache
+        # Memory writes for finished turns are batched off the request path
+        self.write_queue = (
+            WriteBehindQueue(self.vector_memory, self.episodic_memory, self.learning_engine)
+            if write_behind else None
+        )
+        # Last few turns of each conversation, keyed by session id
+        self.sessions = SessionStore(ttl=session_ttl, max_sessions=max_sessions, store=self.store)
+        # Fills the prompt's context and history sections up to token budgets
+        self.context_builder = ContextBuilder(token_budget=context_budget, history_budget=history_budget)
+        # Per-turn limits for the tool loop
+        self.max_steps = max_steps
+        self.time_budget = time_budget
+        self.token_budget = token_budget
+
+    async def process_message(self, user_message: str, read_your_writes: bool = False,
+                              session_id: Optional[str] = None) -> Dict:
+        """Main processing pipeline
+
+        LLM calls are awaited on the async clients; blocking memory, learning
+        and tool I/O is off-loaded to worker threads so the event loop keeps
+        serving other requests. With ``read_your_writes`` queued memory writes
+        from earlier turns are flushed before retrieval. Without a
+        ``session_id`` a new session is started; its id is in the result.
+        """
+        result = None
+        async for event in self._run_turn(user_message, stream=False, read_your_writes=read_your_writes,
+                                          session_id=session_id):
+            if event["type"] == "done":
+                result = event["result"]
+
+        await self.record_turn(user_message, result)
+        return result
+
+    async def stream_message(self, user_message: str, read_your_writes: bool = False,
+                             session_id: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Streaming variant of process_message
+
+        Yields ``text_delta``, ``tool_start`` and ``tool_finish`` events and a
+        final ``done`` event whose ``result`` matches what process_message
+        returns. Nothing is written to memory here: the caller passes that
+        result to ``record_turn`` once the stream has been closed.
+        """
+        async for event in self._run_turn(user_message, stream=True, read_your_writes=read_your_writes,
+                                          session_id=session_id):
+            yield event
+
+    async def _run_turn(self, user_message: str, stream: bool, read_your_writes: bool = False,
+                        session_id: Optional[str] = None) -> AsyncIterator[Dict]:
+        session_id = session_id or uuid.uuid4().hex
+        if read_your_writes:
+            await self.flush_writes()
+        self._check_invalidation()
+
+        # 0. Answer near-duplicate questions from the response cache. The
+        # message is embedded once here and the embedding reused for memory
+        # retrieval and pattern clustering. A cached answer was given without
+        # earlier turns, so only a session's first turn may use the cache.
+        embeddings, history = await asyncio.gather(
+            asyncio.to_thread(self.vector_memory.embed, [user_message]),
+            asyncio.to_thread(self.sessions.get_history, session_id)
+        )
+        query_embedding = embeddings[0]
+        cacheable = self.response_cache is not None and not history
+        if cacheable:
+            cached = self.response_cache.lookup(query_embedding)
+            if cached is not None:
+                if stream:
+                    yield {"type": "text_delta", "text": cached["response"]}
+                pattern_id = await asyncio.to_thread(
+                    self.learning_engine.detect_pattern,
+                    {"user_message": user_message, "agent_response": cached["response"]},
+                    query_embedding
+                )
+                yield {
+                    "type": "done",
+                    "result": {
+                        "response": cached["response"],
+                        "tool_results": [],
+                        "pattern_detected": pattern_id,
+                        "memories_used": 0,
+                        "steps": [],
+                        "cached": True,
+                        "session_id": session_id,
+                        "timestamp": datetime.utcnow().isoformat()
+                    }
+                }
+                return
+
+        # 1. Retrieve relevant memories and recent episodes
+        relevant_memories, recent_episodes = await asyncio.gather(
+            # Over-fetch; the context builder ranks and trims to the budget
+            asyncio.to_thread(self.vector_memory.query_memory, user_message, 8, query_embedding),
+            asyncio.to_thread(self.episodic_memory.get_recent_episodes, 10)
+        )
+
+        # 2. Build context within the token budget
+        selected = self.context_builder.select(user_message, relevant_memories, recent_episodes)
+        context = self.context_builder.format(selected)
+        memories_used = sum(1 for item in selected if "memory" in item["sources"])
 
         # 3. Prepare messages for LLM
-        messages = self._prepare_messages(user_message, context)
+        messages = self._prepare_messages(user_message, context, history)
 
-        # 4. Generate response with tools
+        # 4. Agentic loop: generate, run requested tools, feed results back
+        # until the model stops asking for tools or a budget runs out
         tools = self.tool_registry.get_tool_definitions()
-        response = self.llm.generate_with_tools(
-            messages=messages,
-            tools=tools,
-            system=self._get_system_prompt()
-        )
-
-        # 5. Execute tool calls if any
+        system = self._get_system_prompt()
         tool_results = []
+        steps = []
         final_text = ""
-
-        for content in response["content"]:
-            if content["type"] == "text":
-                final_text += content["text"]
-
-        if response["tool_calls"]:
-            for tool_call in response["tool_calls"]:
-                result = self.tool_registry.execute_tool(
-                    tool_call["name"],
-                    tool_call["input"]
-                )
-                tool_results.append({
+        tokens_used = 0
+        started = time.monotonic()
+        tool_choice = None
+
+        for step in range(1, self.max_steps + 2):
+            step_started = time.perf_counter()
+            response = None
+            async for event in self._complete(messages, tools, system, stream, tool_choice):
+                if event["type"] == "message":
+                    response = event["result"]
+                else:
+                    yield event
+            llm_ms = (time.perf_counter() - step_started) * 1000
+
+            usage = response.get("usage", {})
+            tokens_used += usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+            final_text = self._response_text(response)
+            step_info = {
+                "step": step,
+                "stop_reason": response.get("stop_reason"),
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+                "cache_read_input_tokens": usage.get("cache_read_input_tokens", 0),
+                "cache_creation_input_tokens": usage.get("cache_creation_input_tokens", 0),
+                "llm_ms": round(llm_ms, 1),
+                "tools": [tc["name"] for tc in response["tool_calls"]],
+                "tool_ms": 0.0
+            }
+
+            if response.get("stop_reason") != "tool_use" or not response["tool_calls"] or tool_choice == "none":
+                steps.append(step_info)
+                yield {"type": "step", **step_info}
+                break
+
+            # 5. Execute tool calls
+            tool_started = time.perf_counter()
+            tool_calls = response["tool_calls"]
+            for tool_call in tool_calls:
+                yield {"type": "tool_start", "id": tool_call["id"], "name": tool_call["name"], "input": tool_call["input"]}
+
+            # Calls run concurrently; results are slotted back by index so
+            # they stay aligned with their tool_use ids
+            step_results = [None] * len(tool_calls)
+            async for index, result in self.tool_registry.execute_tools(tool_calls):
+                tool_call = tool_calls[index]
+                step_results[index] = {
                     "tool": tool_call["name"],
                     "input": tool_call["input"],
                     "result": result
-                })
+                }
+                yield {"type": "tool_finish", "id": tool_call["id"], "name": tool_call["name"], "result": result}
+            tool_results.extend(step_results)
 
-                # Learn from tool usage
-                self.learning_engine.learn_skill(
-                    tool_call["name"],
-                    {"input": tool_call["input"], "result": result}
-                )
+            # Learn from tool usage
+            await asyncio.to_thread(
+                self.learning_engine.learn_skills,
+                [(tr["tool"], {"input": tr["input"], "result": tr["result"]}) for tr in step_results]
+            )
 
-            # Generate final response with tool results
             messages.append({
                 "role": "assistant",
                 "content": response["content"]
@@ -72,72 +279,110 @@ class NexusAgent:
                     {
                         "type": "tool_result",
                         "tool_use_id": tc["id"],
-                        "content": str(tool_results[i]["result"])
+                        "content": self.tool_registry.format_result(step_results[i]["result"])
                     }
-                    for i, tc in enumerate(response["tool_calls"])
+                    for i, tc in enumerate(tool_calls)
                 ]
             })
 
-            final_response = self.llm.generate(messages=messages)
-            final_text = final_response
-
-        # 6. Store memories
-        self.vector_memory.add_memory(
-            content=f"User: {user_message}\nAgent: {final_text}",
-            metadata={"type": "conversation", "timestamp": datetime.utcnow().isoformat()}
+            step_info["tool_ms"] = round((time.perf_counter() - tool_started) * 1000, 1)
+            steps.append(step_info)
+            yield {"type": "step", **step_info}
+
+            # Out of budget: one last call with tools disabled so the model
+            # answers from what it has gathered so far
+            if (step >= self.max_steps or
+                    time.monotonic() - started >= self.time_budget or
+                    tokens_used >= self.token_budget):
+                tool_choice = "none"
+
+        if cacheable and not tool_results and final_text:
+            self.response_cache.store(query_embedding, user_message, final_text)
+
+        # 6. Detect patterns and learn
+        pattern_id = await asyncio.to_thread(
+            self.learning_engine.detect_pattern,
+            {"user_message": user_message, "agent_response": final_text},
+            query_embedding
         )
 
+        yield {
+            "type": "done",
+            "result": {
+                "response": final_text,
+                "tool_results": tool_results,
+                "pattern_detected": pattern_id,
+                "memories_used": memories_used,
+                "steps": steps,
+                "cached": False,
+                "session_id": session_id,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        }
+
+    async def _complete(self, messages: List[Dict], tools: List[Dict], system: List[Dict], stream: bool,
+                        tool_choice: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Yield text deltas when streaming, then one ``message`` event with the full response."""
+        if stream:
+            async for event in self.llm.stream_with_tools(messages=messages, tools=tools, system=system, tool_choice=tool_choice):
+                if event["type"] != "tool_use":
+                    yield event
+        else:
+            response = await self.llm.generate_with_tools(messages=messages, tools=tools, system=system, tool_choice=tool_choice)
+            yield {"type": "message", "result": response}
+
+    def _response_text(self, response: Dict) -> str:
+        return "".join(block["text"] for block in response["content"] if block["type"] == "text")
+
+    async def record_turn(self, user_message: str, result: Dict):
+        """Write a finished turn to vector and episodic memory and the session history
+
+        With write-behind enabled the writes are queued and persisted in
+        batches by a background thread; otherwise they happen inline.
+        Answers served from the response cache are recorded like any other
+        turn, so follow-ups in the session see them.
+        """
+        final_text = result["response"]
+
+        # 7. Store memories
+        memory_content = f"User: {user_message}\nAgent: {final_text}"
+        memory_metadata = {"type": "conversation"}
         episode_data = {
             "user_message": user_message,
             "agent_response": final_text,
-            "tools_used": [tr["tool"] for tr in tool_results],
-            "context": {"relevant_memories": len(relevant_memories)}
+            "tools_used": [tr["tool"] for tr in result["tool_results"]],
+            "context": {"relevant_memories": result["memories_used"]}
         }
-        self.episodic_memory.add_episode(episode_data)
-
-        # 7. Detect patterns and learn
-        pattern_id = self.learning_engine.detect_pattern(episode_data)
-
-        # 8. Update conversation history
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_message
-        })
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": final_text
-        })
-
-        return {
-            "response": final_text,
-            "tool_results": tool_results,
-            "pattern_detected": pattern_id,
-            "memories_used": len(relevant_memories),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-
-    def _build_context(self, user_message: str, memories: List[Dict], episodes: List[Dict]) -> str:
-        context = "# Relevant Context\n\n"
-
-        if memories:
-            context += "## Relevant Memories:\n"
-            for mem in memories:
-                context += f"- {mem['content'][:200]}...\n"
-
-        if episodes:
-            context += "\n## Recent Interactions:\n"
-            for ep in episodes[-3:]:
-                context += f"- User: {ep['user_message'][:100]}...\n"
-                context += f"  Agent: {ep['agent_response'][:100]}...\n"
-
-        return context
-
-    def _prepare_messages(self, user_message: str, context: str) -> List[Dict]:
+        if self.write_queue is not None:
+            self.write_queue.submit(memory_content, memory_metadata, episode_data)
+        else:
+            await asyncio.to_thread(self.vector_memory.add_memory, memory_content, memory_metadata)
+            await asyncio.to_thread(self.episodic_memory.add_episode, episode_data)
+
+        # 8. Update the session's conversation history
+        await asyncio.to_thread(self.sessions.append_turn, result["session_id"], user_message, final_text)
+
+    def _check_invalidation(self):
+        """Drop process-local caches after another worker cleared the memories"""
+        if self.store is None:
+            return
+        generation = self.store.generation("memory")
+        if generation != self._memory_generation:
+            self._memory_generation = generation
+            if self.response_cache is not None:
+                self.response_cache.clear()
+
+    async def flush_writes(self) -> bool:
+        """Wait until every queued memory write is persisted; False if some were dropped"""
+        if self.write_queue is not None:
+            return await asyncio.to_thread(self.write_queue.flush)
+        return True
+
+    def _prepare_messages(self, user_message: str, context: str, history: List[Dict]) -> List[Dict]:
         messages = []
 
         # Add relevant conversation history
-        if self.conversation_history:
-            messages.extend(self.conversation_history[-6:])
+        messages.extend(self.context_builder.trim_history(history))
 
         # Add current message with context
         messages.append({
@@ -147,38 +392,57 @@ class NexusAgent:
 
         return messages
 
-    def _get_system_prompt(self) -> str:
+    def _get_system_prompt(self) -> List[Dict]:
+        """System prompt as content blocks: a static, cacheable prefix and a small per-turn suffix
+
+        Tool definitions precede the system prompt in the provider's prompt
+        layout, so the cache breakpoint on the static block covers them too.
+        Anything that changes between turns must stay after the breakpoint.
+        """
         skills = self.learning_engine.get_skills()
         skill_summary = ", ".join([f"{name} (lvl {data['level']})" for name, data in list(skills.items())[:5]])
 
-        return f"""You are Nexus AGI, an advanced autonomous agent with memory, learning, and tool-use capabilities.
-
-Your Capabilities:
-- Access to vector memory for semantic recall
-- Episodic memory of past interactions
-- Learning engine that detects patterns and improves skills
-- Tool execution for real-world actions
-
-Current Skills: {skill_summary if skill_summary else "Building initial skills"}
-
-Approach each task thoughtfully:
-1. Consider relevant memories and past interactions
-2. Use tools when actions are needed
-3. Learn from each interaction
-4. Provide clear, helpful responses
-
-Be proactive, intelligent, and continuously learning."""
+        return [
+            {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": f"Current Skills: {skill_summary if skill_summary else 'Building initial skills'}"}
+        ]
 
     def get_memory_stats(self) -> Dict:
         """Get memory statistics"""
-        return {
-            "vector_memories": len(self.vector_memory.get_all_memories()),
-            "episodes": len(self.episodic_memory.get_recent_episodes(n=1000)),
-            "learning_stats": self.learning_engine.get_learning_stats()
+        stats = {
+            "vector_memories": self.vector_memory.count(),
+            "episodes": self.episodic_memory.count(),
+            "learning_stats": self.learning_engine.get_learning_stats(),
+            "sessions": self.sessions.get_stats(),
+            "embedder": self.vector_memory.embedder.get_stats()
         }
+        if self.response_cache is not None:
+            stats["response_cache"] = self.response_cache.get_stats()
+        if self.write_queue is not None:
+            stats["write_queue"] = self.write_queue.get_stats()
+        return stats
+
+    def close(self):
+        """Flush and release persistent stores"""
+        if self.write_queue is not None:
+            self.write_queue.close()
+        self.learning_engine.flush()
+        self.episodic_memory.close()
+        self.vector_memory.close()
+        if self.store is not None:
+            self.store.close()
+        self.tool_registry.close()
+        if self._data_lock is not None:
+            self._data_lock.release()
 
     def clear_memories(self):
         """Clear all memories"""
+        if self.write_queue is not None:
+            self.write_queue.flush()
         self.vector_memory.clear_all()
         self.episodic_memory.clear_all()
-        self.conversation_history = []
+        if self.response_cache is not None:
+            self.response_cache.clear()
+        self.sessions.clear()
+        if self.store is not None:
+            self._memory_generation = self.store.bump_generation("memory")
@@ -1,108 +1,345 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import json
 import os
+import threading
+import time
 from datetime import datetime
 import numpy as np
+from ..memory.text_index import tokenize
 
 class LearningEngine:
-    def __init__(self, storage_path: str = "./data/learning"):
+    def __init__(self, storage_path: str = "./data/learning", autosave: bool = True, save_interval: float = 5.0,
+                 mode: str = "keywords", cluster_threshold: float = 0.75, max_patterns: int = 256, store=None):
+        """Pattern detection runs in one of two modes
+
+        ``keywords`` matches messages against keyword lists taken from
+        earlier messages. ``clusters`` assigns message embeddings to the
+        nearest of at most ``max_patterns`` centroids, opening a new cluster
+        only when no centroid reaches ``cluster_threshold`` cosine
+        similarity. Each mode keeps its own patterns file.
+
+        With a ``store`` (``core.storage.sqlite_store.SQLiteStore``)
+        patterns and skills are kept in SQLite: pattern frequency changes
+        are written as deltas and skill counters are updated in SQL, so
+        several processes can share one database. Patterns added by another
+        process are picked up through the store's generation counter before
+        the next detection; skills are read straight from the store.
+        """
         self.storage_path = storage_path
+        self.store = store
         os.makedirs(storage_path, exist_ok=True)
-        self.patterns_file = os.path.join(storage_path, "patterns.json")
+        self.mode = mode
+        self.cluster_threshold = cluster_threshold
+        self.max_patterns = max_patterns
+        self.patterns_file = os.path.join(storage_path, "clusters.json" if mode == "clusters" else "patterns.json")
+        self.centroids_file = os.path.join(storage_path, "centroids.npy")
         self.skills_file = os.path.join(storage_path, "skills.json")
-        self.patterns = self._load_patterns()
+        # Callers may run on worker threads; serialize mutation and persistence
+        self._lock = threading.RLock()
+        # Changes are marked dirty and written by flush(). With autosave on,
+        # new patterns and skill updates are written immediately and
+        # frequency bumps at most once per save_interval.
+        self.autosave = autosave
+        self.save_interval = save_interval
+        self._patterns_dirty = False
+        self._skills_dirty = False
+        self._patterns_saved_at = time.monotonic()
+        # Pending store writes: positions of new patterns, frequency deltas
+        self._new_positions: set = set()
+        self._bumps: Dict[int, int] = {}
+        self._stored_centroids: Optional[np.ndarray] = None
+        self._generation_name = f"patterns:{mode}"
+        self._generation = store.generation(self._generation_name) if store is not None else 0
         self.skills = self._load_skills()
+        self._reload_patterns()
+
+    def _reload_patterns(self):
+        self.patterns = self._load_patterns()
+        # Row i is the unit-length centroid of self.patterns[i] (clusters mode)
+        self._centroids: Optional[np.ndarray] = self._load_centroids() if self.mode == "clusters" else None
+        # keyword token -> positions in self.patterns
+        self._keyword_index: Dict[str, List[int]] = {}
+        self._pattern_sizes: List[int] = []
+        for position, pattern in enumerate(self.patterns):
+            self._index_pattern(position, pattern)
+
+    def _refresh_from_store(self):
+        """Reload patterns if another process has added some since we last looked"""
+        generation = self.store.generation(self._generation_name)
+        if generation == self._generation:
+            return
+        if self._patterns_dirty:
+            self._save_patterns()
+            self._patterns_dirty = False
+        self._generation = self.store.generation(self._generation_name)
+        self._reload_patterns()
 
     def _load_patterns(self) -> List[Dict]:
+        if self.store is not None:
+            rows = self.store.load_patterns(self.mode)
+            vectors = [np.frombuffer(centroid, dtype=np.float32) for _, centroid in rows if centroid is not None]
+            if vectors and len(vectors) == len(rows):
+                self._stored_centroids = np.stack(vectors)
+            return [pattern for pattern, _ in rows]
         if os.path.exists(self.patterns_file):
             with open(self.patterns_file, 'r') as f:
                 return json.load(f)
         return []
 
+    def _load_centroids(self) -> Optional[np.ndarray]:
+        if self.store is not None:
+            saved = self._stored_centroids
+            self._stored_centroids = None
+            if saved is None:
+                return None
+        elif not os.path.exists(self.centroids_file):
+            return None
+        else:
+            saved = np.load(self.centroids_file)
+        # Clusters beyond max_patterns (it may have been lowered since) or
+        # without a saved centroid are dropped
+        n = min(len(saved), len(self.patterns), self.max_patterns)
+        del self.patterns[n:]
+        centroids = np.zeros((self.max_patterns, saved.shape[1]), dtype=np.float32)
+        centroids[:n] = saved[:n]
+        return centroids
+
     def _load_skills(self) -> Dict:
+        if self.store is not None:
+            return self.store.load_skills()
         if os.path.exists(self.skills_file):
             with open(self.skills_file, 'r') as f:
                 return json.load(f)
         return {}
 
     def _save_patterns(self):
+        if self.store is not None:
+            self._save_patterns_to_store()
+            self._patterns_saved_at = time.monotonic()
+            return
         with open(self.patterns_file, 'w') as f:
             json.dump(self.patterns, f, indent=2)
+        if self._centroids is not None:
+            tmp_file = self.centroids_file + ".tmp.npy"
+            np.save(tmp_file, self._centroids[:len(self.patterns)])
+            os.replace(tmp_file, self.centroids_file)
+        self._patterns_saved_at = time.monotonic()
+
+    def _centroid_bytes(self, position: int) -> Optional[bytes]:
+        return self._centroids[position].tobytes() if self._centroids is not None else None
+
+    def _save_patterns_to_store(self):
+        new = [(position, self.patterns[position], self._centroid_bytes(position))
+               for position in sorted(self._new_positions)]
+        bumps = [(position, delta, self.patterns[position]['last_seen'], self._centroid_bytes(position))
+                 for position, delta in self._bumps.items() if position not in self._new_positions]
+        self._new_positions.clear()
+        self._bumps.clear()
+        result = self.store.save_patterns(self.mode, new, bumps)
+        # Adopt the stored totals, which include other processes' increments
+        for position, frequency in result['frequencies'].items():
+            self.patterns[position]['frequency'] = frequency
+        moved = any(position != assigned for position, assigned in result['positions'].items())
+        if result['before'] == self._generation and not moved:
+            self._generation = result['after']
 
     def _save_skills(self):
         with open(self.skills_file, 'w') as f:
             json.dump(self.skills, f, indent=2)
 
-    def detect_pattern(self, interaction: Dict) -> Optional[str]:
-        """Detect patterns in user interactions"""
-        user_msg = interaction.get('user_message', '').lower()
+    def _patterns_changed(self, position: int, structural: bool = False):
+        if self.store is not None:
+            if structural:
+                self._new_positions.add(position)
+            else:
+                self._bumps[position] = self._bumps.get(position, 0) + 1
+        self._patterns_dirty = True
+        if self.autosave and (structural or time.monotonic() - self._patterns_saved_at >= self.save_interval):
+            self._save_patterns()
+            self._patterns_dirty = False
+
+    def _skills_changed(self):
+        if self.autosave:
+            self._save_skills()
+        else:
+            self._skills_dirty = True
+
+    def flush(self):
+        """Write changes held back while autosave is off"""
+        with self._lock:
+            if self._patterns_dirty:
+                self._save_patterns()
+                self._patterns_dirty = False
+            if self._skills_dirty:
+                self._save_skills()
+                self._skills_dirty = False
+
+    def _pattern_tokens(self, pattern: Dict) -> set:
+        # Stored keywords may predate tokenization and carry punctuation
+        return {token for keyword in pattern['keywords'] for token in tokenize(keyword)}
+
+    def _index_pattern(self, position: int, pattern: Dict):
+        tokens = self._pattern_tokens(pattern)
+        for token in tokens:
+            self._keyword_index.setdefault(token, []).append(position)
+        self._pattern_sizes.append(max(len(tokens), 1))
 
-        # Check existing patterns
-        for pattern in self.patterns:
-            if any(keyword in user_msg for keyword in pattern['keywords']):
+    def _best_match(self, tokens: set) -> Optional[int]:
+        """Position of the pattern matching the largest share of its keywords, most frequent on ties"""
+        hits: Dict[int, int] = {}
+        for token in tokens:
+            for position in self._keyword_index.get(token, ()):
+                hits[position] = hits.get(position, 0) + 1
+        if not hits:
+            return None
+
+        def score(position: int):
+            pattern = self.patterns[position]
+            return (hits[position] / self._pattern_sizes[position], pattern['frequency'], -position)
+
+        return max(hits, key=score)
+
+    def _assign_cluster(self, user_msg: str, embedding: List[float]) -> str:
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        if self._centroids is None:
+            self._centroids = np.zeros((self.max_patterns, vector.shape[0]), dtype=np.float32)
+
+        count = len(self.patterns)
+        if count:
+            similarities = self._centroids[:count] @ vector
+            best = int(np.argmax(similarities))
+            # Once full, every message joins its nearest cluster
+            if similarities[best] >= self.cluster_threshold or count >= self.max_patterns:
+                pattern = self.patterns[best]
+                # Running mean of member embeddings, kept at unit length
+                centroid = self._centroids[best] + (vector - self._centroids[best]) / (pattern['frequency'] + 1)
+                self._centroids[best] = centroid / (np.linalg.norm(centroid) or 1.0)
                 pattern['frequency'] += 1
                 pattern['last_seen'] = datetime.utcnow().isoformat()
-                self._save_patterns()
+                self._patterns_changed(best)
                 return pattern['id']
 
-        # Create new pattern if certain keywords appear
-        keywords = self._extract_keywords(user_msg)
-        if len(keywords) >= 2:
-            pattern = {
-                'id': f"pattern_{len(self.patterns)}",
-                'keywords': keywords,
-                'frequency': 1,
-                'first_seen': datetime.utcnow().isoformat(),
-                'last_seen': datetime.utcnow().isoformat()
-            }
-            self.patterns.append(pattern)
-            self._save_patterns()
-            return pattern['id']
+        self._centroids[count] = vector
+        pattern = {
+            'id': f"cluster_{count}",
+            # First member's keywords serve as a human-readable label
+            'keywords': self._extract_keywords(user_msg),
+            'frequency': 1,
+            'first_seen': datetime.utcnow().isoformat(),
+            'last_seen': datetime.utcnow().isoformat()
+        }
+        self.patterns.append(pattern)
+        self._patterns_changed(count, structural=True)
+        return pattern['id']
+
+    def detect_pattern(self, interaction: Dict, embedding: Optional[List[float]] = None) -> Optional[str]:
+        """Detect patterns in user interactions
 
-        return None
+        In keywords mode candidate patterns come from one pass over the
+        message's tokens through the keyword index, so the cost does not
+        grow with the number of stored patterns. In clusters mode the
+        message ``embedding`` is assigned with one matrix-vector product;
+        without an embedding nothing is detected.
+        """
+        with self._lock:
+            if self.store is not None:
+                self._refresh_from_store()
+            user_msg = interaction.get('user_message', '').lower()
+            if self.mode == "clusters":
+                return self._assign_cluster(user_msg, embedding) if embedding is not None else None
+
+            tokens = set(tokenize(user_msg))
+
+            # Check existing patterns
+            position = self._best_match(tokens)
+            if position is not None:
+                pattern = self.patterns[position]
+                pattern['frequency'] += 1
+                pattern['last_seen'] = datetime.utcnow().isoformat()
+                self._patterns_changed(position)
+                return pattern['id']
+
+            # Create new pattern if certain keywords appear
+            keywords = self._extract_keywords(user_msg)
+            if len(keywords) >= 2:
+                pattern = {
+                    'id': f"pattern_{len(self.patterns)}",
+                    'keywords': keywords,
+                    'frequency': 1,
+                    'first_seen': datetime.utcnow().isoformat(),
+                    'last_seen': datetime.utcnow().isoformat()
+                }
+                self.patterns.append(pattern)
+                self._index_pattern(len(self.patterns) - 1, pattern)
+                self._patterns_changed(len(self.patterns) - 1, structural=True)
+                return pattern['id']
+
+            return None
 
     def _extract_keywords(self, text: str) -> List[str]:
         # Simple keyword extraction
         common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-        words = text.lower().split()
+        words = tokenize(text)
         keywords = [w for w in words if len(w) > 3 and w not in common_words]
         return keywords[:5]
 
     def learn_skill(self, skill_name: str, skill_data: Dict):
         """Learn or improve a skill"""
-        if skill_name not in self.skills:
-            self.skills[skill_name] = {
-                'level': 1,
-                'uses': 0,
-                'success_rate': 0.0,
-                'created': datetime.utcnow().isoformat(),
-                'data': skill_data
-            }
-        else:
-            self.skills[skill_name]['uses'] += 1
-            self.skills[skill_name]['level'] = min(10, self.skills[skill_name]['uses'] // 10 + 1)
+        self.learn_skills([(skill_name, skill_data)])
 
-        self._save_skills()
+    def learn_skills(self, usages: List[Tuple[str, Dict]]):
+        """Record several skill uses with a single write"""
+        with self._lock:
+            if self.store is not None:
+                self.skills.update(self.store.record_skill_uses(usages))
+                return
+            for skill_name, skill_data in usages:
+                if skill_name not in self.skills:
+                    self.skills[skill_name] = {
+                        'level': 1,
+                        'uses': 0,
+                        'success_rate': 0.0,
+                        'created': datetime.utcnow().isoformat(),
+                        'data': skill_data
+                    }
+                else:
+                    self.skills[skill_name]['uses'] += 1
+                    self.skills[skill_name]['level'] = min(10, self.skills[skill_name]['uses'] // 10 + 1)
+
+            self._skills_changed()
 
     def update_skill_success(self, skill_name: str, success: bool):
         """Update skill success rate"""
-        if skill_name in self.skills:
-            current_rate = self.skills[skill_name]['success_rate']
-            uses = self.skills[skill_name]['uses']
-            new_rate = (current_rate * uses + (1.0 if success else 0.0)) / (uses + 1)
-            self.skills[skill_name]['success_rate'] = new_rate
-            self._save_skills()
+        with self._lock:
+            if self.store is not None:
+                skill = self.store.update_skill_success(skill_name, success)
+                if skill is not None:
+                    self.skills[skill_name] = skill
+                return
+            if skill_name in self.skills:
+                current_rate = self.skills[skill_name]['success_rate']
+                uses = self.skills[skill_name]['uses']
+                new_rate = (current_rate * uses + (1.0 if success else 0.0)) / (uses + 1)
+                self.skills[skill_name]['success_rate'] = new_rate
+                self._skills_changed()
 
     def get_patterns(self) -> List[Dict]:
-        return sorted(self.patterns, key=lambda x: x['frequency'], reverse=True)
+        with self._lock:
+            if self.store is not None:
+                self._refresh_from_store()
+            return sorted(self.patterns, key=lambda x: x['frequency'], reverse=True)
 
     def get_skills(self) -> Dict:
+        if self.store is not None:
+            with self._lock:
+                self.skills = self.store.load_skills()
         return self.skills
 
     def get_learning_stats(self) -> Dict:
         return {
             'total_patterns': len(self.patterns),
-            'total_skills': len(self.skills),
+            'total_skills': len(self.get_skills()),
             'avg_skill_level': np.mean([s['level'] for s in self.skills.values()]) if self.skills else 0,
             'patterns': self.get_patterns()[:5],
             'top_skills': sorted(self.skills.items(), key=lambda x: x[1]['level'], reverse=True)[:5]
@@ -1,19 +1,123 @@
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Union
+from collections import deque
+import asyncio
+import json
 import os
-from anthropic import Anthropic
+import time
+import anthropic
+import httpx
 import openai
+from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI
+from .rate_limit import TokenBucket, backoff_delay, parse_retry_after
+
+# OpenAI finish reasons mapped onto the Anthropic stop reasons the agent uses
+_OPENAI_STOP_REASONS = {
+    "tool_calls": "tool_use",
+    "function_call": "tool_use",
+    "stop": "end_turn",
+    "length": "max_tokens",
+}
+
+# Rate limits, overload (Anthropic 529) and transient server errors
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
 
 class LLMClient:
-    def __init__(self, provider: str = "anthropic"):
+    def __init__(self, provider: str = "anthropic", max_concurrency: Optional[int] = None,
+                 requests_per_second: Optional[float] = None, max_retries: Optional[int] = None,
+                 timeout: Optional[float] = None, keepalive_expiry: Optional[float] = None):
+        """LLM client with a pooled HTTP connection, retries and a request limiter
+
+        Unset options fall back to ``LLM_MAX_CONCURRENCY``,
+        ``LLM_REQUESTS_PER_SECOND`` (0 disables the bucket),
+        ``LLM_MAX_RETRIES``, ``LLM_TIMEOUT`` and ``LLM_KEEPALIVE_EXPIRY``.
+        The SDKs honour ``ANTHROPIC_BASE_URL`` / ``OPENAI_BASE_URL``, which
+        is how the client is pointed at a local mock server.
+        """
         self.provider = provider
+        max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+        requests_per_second = requests_per_second if requests_per_second is not None else float(os.getenv("LLM_REQUESTS_PER_SECOND", "0"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "4"))
+        timeout = timeout or float(os.getenv("LLM_TIMEOUT", "120"))
+        keepalive_expiry = keepalive_expiry or float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+
+        # One pooled connection set per client; the SDK's own retries are off
+        # because _create handles them with jitter and Retry-After
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=httpx.Timeout(timeout, connect=10.0)
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(requests_per_second)
+        self._latencies = deque(maxlen=1024)
+
         if provider == "anthropic":
-            self.client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+            self.client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), http_client=self.http_client,
+                                         max_retries=0, timeout=timeout)
             self.model = "claude-3-5-sonnet-20241022"
         elif provider == "openai":
-            openai.api_key = os.getenv("OPENAI_API_KEY")
+            self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=self.http_client,
+                                      max_retries=0, timeout=timeout)
             self.model = "gpt-4-turbo-preview"
+        self.stats = {
+            "calls": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "requests": 0,
+            "errors": 0,
+            "retries": 0
+        }
+
+    async def _call(self, create: Callable[..., Awaitable], **kwargs):
+        async with self._slots:
+            return await self._create(create, **kwargs)
+
+    async def _create(self, create: Callable[..., Awaitable], **kwargs):
+        """Issue one API request, retrying transient failures with jittered backoff
 
-    def generate(self, messages: List[Dict], system: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 4096) -> str:
+        The caller holds a concurrency slot, so backoff sleeps keep their
+        slot instead of letting new requests pile onto a throttled provider.
+        """
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            started = time.perf_counter()
+            try:
+                response = await create(**kwargs)
+            except Exception as e:
+                self._record_request(started, failed=True)
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                error_response = getattr(e, "response", None)
+                retry_after = parse_retry_after(getattr(error_response, "headers", None))
+                self.stats["retries"] += 1
+                await asyncio.sleep(backoff_delay(attempt, retry_after=retry_after))
+                attempt += 1
+                continue
+            self._record_request(started)
+            return response
+
+    def _is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, (anthropic.APIConnectionError, openai.APIConnectionError)):
+            return True
+        return getattr(error, "status_code", None) in _RETRYABLE_STATUS
+
+    def _record_request(self, started: float, failed: bool = False):
+        self._latencies.append(time.perf_counter() - started)
+        self.stats["requests"] += 1
+        if failed:
+            self.stats["errors"] += 1
+
+    async def aclose(self):
+        await self.http_client.aclose()
+
+    async def generate(self, messages: List[Dict], system: Optional[Union[str, List[Dict]]] = None, temperature: float = 0.7, max_tokens: int = 4096) -> str:
         if self.provider == "anthropic":
             kwargs = {
                 "model": self.model,
@@ -24,22 +128,27 @@ class LLMClient:
             if system:
                 kwargs["system"] = system
 
-            response = self.client.messages.create(**kwargs)
+            response = await self._call(self.client.messages.create, **kwargs)
             return response.content[0].text
 
         elif self.provider == "openai":
-            if system:
-                messages = [{"role": "system", "content": system}] + messages
-
-            response = openai.ChatCompletion.create(
+            response = await self._call(
+                self.client.chat.completions.create,
                 model=self.model,
-                messages=messages,
+                messages=self._to_openai_messages(messages, system),
                 temperature=temperature,
                 max_tokens=max_tokens
             )
             return response.choices[0].message.content
 
-    def generate_with_tools(self, messages: List[Dict], tools: List[Dict], system: Optional[str] = None) -> Dict:
+    async def generate_with_tools(self, messages: List[Dict], tools: List[Dict], system: Optional[Union[str, List[Dict]]] = None,
+                                  tool_choice: Optional[str] = None) -> Dict:
+        """Single completion that may request tools.
+
+        Returns ``content`` (text and tool_use blocks, ready to be echoed back
+        as the assistant turn), ``tool_calls``, ``stop_reason`` and token
+        ``usage``. ``tool_choice`` is ``"auto"``, ``"any"`` or ``"none"``.
+        """
         if self.provider == "anthropic":
             kwargs = {
                 "model": self.model,
@@ -49,25 +158,273 @@ class LLMClient:
             }
             if system:
                 kwargs["system"] = system
+            if tool_choice:
+                kwargs["tool_choice"] = {"type": tool_choice}
 
-            response = self.client.messages.create(**kwargs)
+            response = await self._call(self.client.messages.create, **kwargs)
 
             result = {
                 "content": [],
                 "stop_reason": response.stop_reason,
-                "tool_calls": []
+                "tool_calls": [],
+                "usage": self._record_usage(self._anthropic_usage(response.usage))
             }
 
             for block in response.content:
                 if block.type == "text":
                     result["content"].append({"type": "text", "text": block.text})
                 elif block.type == "tool_use":
-                    result["tool_calls"].append({
+                    tool_call = {
                         "id": block.id,
                         "name": block.name,
                         "input": block.input
-                    })
+                    }
+                    result["content"].append({"type": "tool_use", **tool_call})
+                    result["tool_calls"].append(tool_call)
 
             return result
 
-        return {"content": [{"type": "text", "text": "Tool use not implemented for this provider"}], "tool_calls": []}
+        elif self.provider == "openai":
+            kwargs = {
+                "model": self.model,
+                "max_tokens": 4096,
+                "messages": self._to_openai_messages(messages, system)
+            }
+            if tools:
+                kwargs["tools"] = self._to_openai_tools(tools)
+                if tool_choice:
+                    kwargs["tool_choice"] = "required" if tool_choice == "any" else tool_choice
+
+            response = await self._call(self.client.chat.completions.create, **kwargs)
+            choice = response.choices[0]
+            tool_calls = [
+                {
+                    "id": tc.id,
+                    "name": tc.function.name,
+                    "input": json.loads(tc.function.arguments or "{}")
+                }
+                for tc in choice.message.tool_calls or []
+            ]
+            usage = self._record_usage(self._openai_usage(response.usage))
+            return self._build_result(choice.message.content or "", tool_calls, choice.finish_reason, usage)
+
+    async def stream_with_tools(self, messages: List[Dict], tools: List[Dict], system: Optional[Union[str, List[Dict]]] = None,
+                                tool_choice: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Streaming counterpart of ``generate_with_tools``.
+
+        Yields ``{"type": "text_delta", "text": ...}`` as tokens arrive,
+        ``{"type": "tool_use", "id", "name", "input"}`` once a tool call is
+        complete, and finally ``{"type": "message", "result": ...}`` carrying
+        the same dict ``generate_with_tools`` returns. Pass an empty ``tools``
+        list for a plain text completion.
+        """
+        # The slot is held for the whole stream, not just the request
+        async with self._slots:
+            async for event in self._stream_with_tools(messages, tools, system, tool_choice):
+                yield event
+
+    async def _stream_with_tools(self, messages: List[Dict], tools: List[Dict], system: Optional[Union[str, List[Dict]]] = None,
+                                 tool_choice: Optional[str] = None) -> AsyncIterator[Dict]:
+        if self.provider == "anthropic":
+            kwargs = {
+                "model": self.model,
+                "max_tokens": 4096,
+                "messages": messages,
+                "stream": True
+            }
+            if tools:
+                kwargs["tools"] = tools
+                if tool_choice:
+                    kwargs["tool_choice"] = {"type": tool_choice}
+            if system:
+                kwargs["system"] = system
+
+            text = ""
+            tool_calls = []
+            blocks: Dict[int, Dict] = {}
+            stop_reason = None
+            usage = {}
+
+            stream = await self._create(self.client.messages.create, **kwargs)
+            async for event in stream:
+                if event.type == "message_start":
+                    usage = self._anthropic_usage(event.message.usage)
+                elif event.type == "content_block_start":
+                    block = event.content_block
+                    if block.type == "tool_use":
+                        blocks[event.index] = {"id": block.id, "name": block.name, "json": ""}
+                elif event.type == "content_block_delta":
+                    if event.delta.type == "text_delta":
+                        text += event.delta.text
+                        yield {"type": "text_delta", "text": event.delta.text}
+                    elif event.delta.type == "input_json_delta":
+                        blocks[event.index]["json"] += event.delta.partial_json
+                elif event.type == "content_block_stop":
+                    block = blocks.pop(event.index, None)
+                    if block is not None:
+                        tool_call = {
+                            "id": block["id"],
+                            "name": block["name"],
+                            "input": json.loads(block["json"] or "{}")
+                        }
+                        tool_calls.append(tool_call)
+                        yield {"type": "tool_use", **tool_call}
+                elif event.type == "message_delta":
+                    stop_reason = event.delta.stop_reason
+                    usage["output_tokens"] = event.usage.output_tokens
+
+            result = self._build_result(text, tool_calls, stop_reason, self._record_usage(usage))
+            yield {"type": "message", "result": result}
+
+        elif self.provider == "openai":
+            kwargs = {
+                "model": self.model,
+                "max_tokens": 4096,
+                "messages": self._to_openai_messages(messages, system),
+                "stream": True,
+                "stream_options": {"include_usage": True}
+            }
+            if tools:
+                kwargs["tools"] = self._to_openai_tools(tools)
+                if tool_choice:
+                    kwargs["tool_choice"] = "required" if tool_choice == "any" else tool_choice
+
+            text = ""
+            calls: Dict[int, Dict] = {}
+            finish_reason = None
+            usage = {}
+
+            stream = await self._create(self.client.chat.completions.create, **kwargs)
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = self._openai_usage(chunk.usage)
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = choice.delta
+                if delta.content:
+                    text += delta.content
+                    yield {"type": "text_delta", "text": delta.content}
+                for tc in delta.tool_calls or []:
+                    call = calls.setdefault(tc.index, {"id": None, "name": "", "json": ""})
+                    if tc.id:
+                        call["id"] = tc.id
+                    if tc.function and tc.function.name:
+                        call["name"] += tc.function.name
+                    if tc.function and tc.function.arguments:
+                        call["json"] += tc.function.arguments
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+
+            tool_calls = []
+            for index in sorted(calls):
+                call = calls[index]
+                tool_call = {"id": call["id"], "name": call["name"], "input": json.loads(call["json"] or "{}")}
+                tool_calls.append(tool_call)
+                yield {"type": "tool_use", **tool_call}
+
+            yield {"type": "message", "result": self._build_result(text, tool_calls, finish_reason, self._record_usage(usage))}
+
+    def _anthropic_usage(self, usage) -> Dict:
+        return {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+            "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0
+        }
+
+    def _openai_usage(self, usage) -> Dict:
+        # OpenAI caches prompt prefixes automatically and reports reads only
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details else 0
+        return {
+            "input_tokens": usage.prompt_tokens - cached,
+            "output_tokens": usage.completion_tokens,
+            "cache_read_input_tokens": cached,
+            "cache_creation_input_tokens": 0
+        }
+
+    def _record_usage(self, usage: Dict) -> Dict:
+        self.stats["calls"] += 1
+        for key, value in usage.items():
+            self.stats[key] = self.stats.get(key, 0) + value
+        return usage
+
+    def get_stats(self) -> Dict:
+        """Cumulative token usage (including prompt-cache reads and writes), request counts and latency"""
+        prompt_tokens = (self.stats["input_tokens"] + self.stats["cache_read_input_tokens"] +
+                         self.stats["cache_creation_input_tokens"])
+        latencies = sorted(self._latencies)
+        return {
+            **self.stats,
+            "cache_hit_ratio": self.stats["cache_read_input_tokens"] / prompt_tokens if prompt_tokens else 0.0,
+            "latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else 0.0,
+            "latency_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1) if latencies else 0.0
+        }
+
+    def _system_text(self, system: Union[str, List[Dict]]) -> str:
+        if isinstance(system, str):
+            return system
+        return "\n\n".join(block["text"] for block in system)
+
+    def _build_result(self, text: str, tool_calls: List[Dict], stop_reason: Optional[str], usage: Dict) -> Dict:
+        content = []
+        if text:
+            content.append({"type": "text", "text": text})
+        content.extend({"type": "tool_use", **tc} for tc in tool_calls)
+        return {
+            "content": content,
+            "stop_reason": _OPENAI_STOP_REASONS.get(stop_reason, stop_reason),
+            "tool_calls": tool_calls,
+            "usage": usage
+        }
+
+    def _to_openai_tools(self, tools: List[Dict]) -> List[Dict]:
+        return [
+            {
+                "type": "function",
+                "function": {
+                    "name": tool["name"],
+                    "description": tool["description"],
+                    "parameters": tool["input_schema"]
+                }
+            }
+            for tool in tools
+        ]
+
+    def _to_openai_messages(self, messages: List[Dict], system: Optional[Union[str, List[Dict]]] = None) -> List[Dict]:
+        """Translate Anthropic-style content blocks into OpenAI chat messages."""
+        converted = [{"role": "system", "content": self._system_text(system)}] if system else []
+        for message in messages:
+            content = message["content"]
+            if isinstance(content, str):
+                converted.append({"role": message["role"], "content": content})
+                continue
+
+            text = "".join(block["text"] for block in content if block["type"] == "text")
+            tool_uses = [block for block in content if block["type"] == "tool_use"]
+            tool_results = [block for block in content if block["type"] == "tool_result"]
+
+            if tool_uses:
+                converted.append({
+                    "role": "assistant",
+                    "content": text or None,
+                    "tool_calls": [
+                        {
+                            "id": block["id"],
+                            "type": "function",
+                            "function": {"name": block["name"], "arguments": json.dumps(block["input"])}
+                        }
+                        for block in tool_uses
+                    ]
+                })
+            elif text:
+                converted.append({"role": message["role"], "content": text})
+
+            for block in tool_results:
+                converted.append({
+                    "role": "tool",
+                    "tool_call_id": block["tool_use_id"],
+                    "content": block["content"]
+                })
+        return converted
@@ -0,0 +1,62 @@
+from typing import Optional
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+import random
+import time
+
+class TokenBucket:
+    """Async token bucket: ``rate`` requests per second with bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff; a server-sent Retry-After is a lower bound"""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Seconds to wait from ``retry-after-ms`` / ``retry-after`` response headers"""
+    if headers is None:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        # "-0000" means UTC with no zone information given
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,39 @@
+from functools import lru_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+ENCODING = "cl100k_base"
+
+@lru_cache(maxsize=1)
+def get_encoder():
+    """Shared tiktoken encoder, or None when it cannot be loaded
+
+    cl100k_base is not Claude's tokenizer, but it is close enough for
+    budgeting. Without tiktoken (or its cached BPE file) counts fall back to
+    roughly four characters per token.
+    """
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(ENCODING)
+    except Exception:
+        logger.warning("tiktoken encoding %s unavailable; estimating tokens from characters", ENCODING)
+        return None
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    encoder = get_encoder()
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to at most ``max_tokens`` tokens, marking the cut with an ellipsis"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoder = get_encoder()
+    if encoder is None:
+        return text[:max(0, max_tokens * 4 - 3)] + "..."
+    return encoder.decode(encoder.encode(text, disallowed_special=())[:max_tokens - 1]) + "..."
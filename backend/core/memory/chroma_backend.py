@@ -0,0 +1,76 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+import chromadb
+import numpy as np
+from .vector_backend import VectorBackend
+
+class ChromaBackend(VectorBackend):
+    """Chroma collection, embedded (PersistentClient) or on a Chroma server."""
+
+    def __init__(self, persist_directory: str = "./data/memory", host: Optional[str] = None, port: int = 8000,
+                 collection_name: str = "nexus_memory"):
+        # A Chroma server lets several worker processes share one collection
+        if host:
+            self.client = chromadb.HttpClient(host=host, port=port)
+        else:
+            self.client = chromadb.PersistentClient(path=persist_directory)
+        self.collection_name = collection_name
+        self.collection = self._open_collection()
+
+    def _open_collection(self):
+        # Embeddings are always passed in, so no embedding function is needed
+        return self.client.get_or_create_collection(
+            name=self.collection_name,
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=None
+        )
+
+    def _rows(self, results: Dict) -> List[Dict]:
+        return [
+            {'id': memory_id, 'content': results['documents'][i], 'metadata': results['metadatas'][i]}
+            for i, memory_id in enumerate(results['ids'])
+        ]
+
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        self.collection.add(ids=ids, embeddings=embeddings.tolist(), documents=documents, metadatas=metadatas)
+
+    def query(self, embedding: np.ndarray, n_results: int) -> List[Dict]:
+        count = self.collection.count()
+        if not count:
+            return []
+        results = self.collection.query(query_embeddings=[embedding.tolist()], n_results=min(n_results, count))
+        return [
+            {
+                'id': memory_id,
+                'content': results['documents'][0][i],
+                'metadata': results['metadatas'][0][i],
+                'distance': results['distances'][0][i]
+            }
+            for i, memory_id in enumerate(results['ids'][0])
+        ]
+
+    def get(self, ids: List[str]) -> List[Dict]:
+        return self._rows(self.collection.get(ids=ids)) if ids else []
+
+    def page(self, limit: int, offset: int = 0) -> List[Dict]:
+        return self._rows(self.collection.get(limit=limit, offset=offset))
+
+    def iter_batches(self, batch_size: int = 5000) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+        offset = 0
+        while True:
+            results = self.collection.get(limit=batch_size, offset=offset,
+                                          include=["documents", "metadatas", "embeddings"])
+            if results['ids']:
+                yield self._rows(results), np.asarray(results['embeddings'], dtype=np.float32)
+            if len(results['ids']) < batch_size:
+                return
+            offset += batch_size
+
+    def delete(self, ids: List[str]):
+        self.collection.delete(ids=ids)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def clear(self):
+        self.client.delete_collection(self.collection_name)
+        self.collection = self._open_collection()
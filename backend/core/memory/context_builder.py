@@ -0,0 +1,143 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+import math
+from .text_index import tokenize
+from ..llm.tokenizer import count_tokens, truncate_tokens
+
+class ContextBuilder:
+    """Assembles the retrieved context and chat history within token budgets.
+
+    Vector memories and recent episodes become one candidate pool. An
+    exchange stored both as a memory and as an episode is kept once.
+    Candidates are picked greedily by maximal marginal relevance:
+
+        relevance_weight * (relevance + recency_weight * recency) - (1 - relevance_weight) * redundancy
+
+    where relevance is the vector similarity (memories) or query term
+    overlap (episodes), recency decays with a ``half_life`` in hours, and
+    redundancy is the highest token overlap with anything already picked.
+    ``relevance_weight`` is MMR's lambda: 1.0 ranks by relevance alone and
+    lower values favour items unlike those already picked.
+    Picks are added until ``token_budget`` is spent; the last one is cut to
+    fit if at least ``min_item_tokens`` remain. History is filled newest
+    turn first up to ``history_budget`` tokens.
+    """
+
+    def __init__(self, token_budget: int = 1500, history_budget: int = 2000, relevance_weight: float = 0.7,
+                 recency_weight: float = 0.2, half_life: float = 24.0, duplicate_threshold: float = 0.9,
+                 min_item_tokens: int = 24):
+        self.token_budget = token_budget
+        self.history_budget = history_budget
+        self.relevance_weight = relevance_weight
+        self.recency_weight = recency_weight
+        self.half_life = half_life
+        self.duplicate_threshold = duplicate_threshold
+        self.min_item_tokens = min_item_tokens
+
+    def _recency(self, timestamp: Optional[str], now: datetime) -> float:
+        if not timestamp:
+            return 0.0
+        try:
+            age = (now - datetime.fromisoformat(timestamp)).total_seconds() / 3600
+        except (TypeError, ValueError):
+            return 0.0
+        return math.pow(0.5, max(age, 0.0) / self.half_life)
+
+    def _overlap(self, a: frozenset, b: frozenset) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+
+    def _candidates(self, user_message: str, memories: List[Dict], episodes: List[Dict]) -> List[Dict]:
+        now = datetime.utcnow()
+        query_terms = frozenset(tokenize(user_message))
+        # Normalized text -> candidate. Episodes use the same "User: ...\nAgent: ..."
+        # text as conversation memories, so an exchange present in both collapses
+        by_text: Dict[str, Dict] = {}
+
+        def add(kind: str, text: str, relevance: float, timestamp: Optional[str]):
+            key = " ".join(text.split()).lower()
+            if not key:
+                return
+            score = relevance + self.recency_weight * self._recency(timestamp, now)
+            existing = by_text.get(key)
+            if existing is not None:
+                existing["score"] = max(existing["score"], score)
+                existing["sources"].add(kind)
+                return
+            by_text[key] = {
+                "kind": kind,
+                "sources": {kind},
+                "text": text,
+                "terms": frozenset(tokenize(text)),
+                "score": score,
+                "timestamp": timestamp or ""
+            }
+
+        for episode in episodes:
+            text = f"User: {episode['user_message']}\nAgent: {episode['agent_response']}"
+            terms = frozenset(tokenize(text))
+            relevance = len(query_terms & terms) / len(query_terms) if query_terms else 0.0
+            add("episode", text, relevance, episode.get("timestamp"))
+        for memory in memories:
+            distance = memory.get("distance")
+            relevance = 1.0 - distance if distance is not None else 0.5
+            add("memory", memory["content"], relevance, (memory.get("metadata") or {}).get("timestamp"))
+        return list(by_text.values())
+
+    def select(self, user_message: str, memories: List[Dict], episodes: List[Dict]) -> List[Dict]:
+        """Pick candidates by MMR until the token budget is used up"""
+        remaining = self._candidates(user_message, memories, episodes)
+        selected: List[Dict] = []
+        budget = self.token_budget
+
+        while remaining and budget >= self.min_item_tokens:
+            def mmr(candidate: Dict) -> float:
+                redundancy = max((self._overlap(candidate["terms"], s["terms"]) for s in selected), default=0.0)
+                return self.relevance_weight * candidate["score"] - (1 - self.relevance_weight) * redundancy
+
+            best = max(remaining, key=mmr)
+            remaining.remove(best)
+            if any(self._overlap(best["terms"], s["terms"]) >= self.duplicate_threshold for s in selected):
+                continue
+
+            text = best["text"]
+            tokens = count_tokens(text)
+            if tokens > budget:
+                text = truncate_tokens(text, budget)
+                tokens = count_tokens(text)
+            selected.append({**best, "text": text, "tokens": tokens})
+            budget -= tokens
+        return selected
+
+    def format(self, selected: List[Dict]) -> str:
+        context = "# Relevant Context\n\n"
+
+        picked_memories = [item for item in selected if item["kind"] == "memory"]
+        if picked_memories:
+            context += "## Relevant Memories:\n"
+            for item in picked_memories:
+                context += f"- {item['text']}\n"
+
+        picked_episodes = sorted((item for item in selected if item["kind"] == "episode"),
+                                 key=lambda item: item["timestamp"])
+        if picked_episodes:
+            context += "\n## Recent Interactions:\n"
+            for item in picked_episodes:
+                context += "- " + item["text"].replace("\n", "\n  ") + "\n"
+
+        return context
+
+    def trim_history(self, history: List[Dict]) -> List[Dict]:
+        """Newest whole turns of ``history`` that fit the history budget"""
+        budget = self.history_budget
+        kept: List[Dict] = []
+        # Walk back one (user, assistant) pair at a time
+        for end in range(len(history), 0, -2):
+            turn = history[max(end - 2, 0):end]
+            tokens = sum(count_tokens(message["content"]) for message in turn)
+            if tokens > budget:
+                break
+            kept[:0] = turn
+            budget -= tokens
+        return kept
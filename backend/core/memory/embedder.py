@@ -0,0 +1,167 @@
+from typing import Dict, List, Optional
+from collections import deque
+import logging
+import threading
+import time
+import numpy as np
+from .embedding_cache import EmbeddingCache, content_key
+
+logger = logging.getLogger(__name__)
+
+class _Request:
+    __slots__ = ("vectors", "remaining", "error", "done")
+
+    def __init__(self, size: int):
+        self.vectors: List[Optional[np.ndarray]] = [None] * size
+        self.remaining = size
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+class Embedder:
+    """Sentence embeddings from a local sentence-transformers model.
+
+    The default model is the all-MiniLM-L6-v2 that Chroma's default
+    embedding function runs, so existing collections stay comparable. The
+    model is loaded on first use; embeddings are unit-length float32.
+
+    Texts found in the optional ``cache`` (see embedding_cache.py) skip the
+    model. The rest are queued for a background thread that runs one model
+    call for everything waiting, up to ``max_batch`` texts, so concurrent
+    requests share batches: while the model is busy, new texts pile up and
+    go into the next call together. ``max_wait`` optionally holds a batch
+    open a few milliseconds longer to collect more. Identical texts in a
+    batch are embedded once.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", batch_size: int = 64,
+                 cache: Optional[EmbeddingCache] = None, max_batch: int = 512, max_wait: float = 0.0):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._model = None
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats = {"batches": 0, "texts": 0, "requests": 0, "failures": 0,
+                       "last_batch_size": 0, "last_batch_ms": 0.0, "last_texts_per_second": 0.0,
+                       "model_seconds": 0.0}
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """One model call, bypassing the cache and the batching queue"""
+        embeddings = self._get_model().encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        keys = [content_key(self.model_name, text) for text in texts]
+        cached = self.cache.get_many(keys) if self.cache is not None else {}
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+
+        vectors: List[Optional[np.ndarray]] = [cached.get(key) for key in keys]
+        if missing:
+            request = _Request(len(missing))
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("embedder is closed")
+                self._ensure_thread()
+                self._pending.extend((request, slot, texts[i]) for slot, i in enumerate(missing))
+                self._stats["requests"] += 1
+                self._cond.notify_all()
+            request.done.wait()
+            if request.error is not None:
+                raise request.error
+            for slot, i in enumerate(missing):
+                vectors[i] = request.vectors[slot]
+            if self.cache is not None:
+                self.cache.put_many({keys[i]: vectors[i] for i in missing})
+        return np.stack(vectors)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="embedder", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                if self.max_wait > 0 and len(self._pending) < self.max_batch:
+                    deadline = time.monotonic() + self.max_wait
+                    while len(self._pending) < self.max_batch and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+
+            unique: Dict[str, int] = {}
+            for _, _, text in batch:
+                unique.setdefault(text, len(unique))
+            started = time.perf_counter()
+            try:
+                embeddings = self.encode(list(unique))
+                error = None
+            except Exception as e:
+                logger.exception("embedding batch of %d texts failed", len(unique))
+                embeddings, error = None, e
+            elapsed = time.perf_counter() - started
+
+            for request, slot, text in batch:
+                if error is not None:
+                    request.error = error
+                else:
+                    request.vectors[slot] = embeddings[unique[text]]
+                request.remaining -= 1
+                if request.remaining == 0 or error is not None:
+                    request.done.set()
+
+            with self._cond:
+                self._stats["batches"] += 1
+                self._stats["texts"] += len(unique)
+                self._stats["failures"] += int(error is not None)
+                self._stats["model_seconds"] += elapsed
+                self._stats["last_batch_size"] = len(unique)
+                self._stats["last_batch_ms"] = round(elapsed * 1000, 2)
+                self._stats["last_texts_per_second"] = round(len(unique) / elapsed, 1) if elapsed else 0.0
+
+    def close(self):
+        """Finish queued texts and stop the batching thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        if self.cache is not None:
+            self.cache.close()
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            stats = {
+                **self._stats,
+                "model_seconds": round(self._stats["model_seconds"], 3),
+                "pending": len(self._pending),
+                "avg_batch_size": self._stats["texts"] / self._stats["batches"] if self._stats["batches"] else 0.0,
+                "texts_per_second": round(self._stats["texts"] / self._stats["model_seconds"], 1)
+                if self._stats["model_seconds"] else 0.0
+            }
+        if self.cache is not None:
+            stats["cache"] = self.cache.get_stats()
+        return stats
@@ -0,0 +1,107 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+
+def content_key(model_name: str, text: str) -> bytes:
+    """Cache key for ``text`` embedded by ``model_name``"""
+    return hashlib.blake2b(f"{model_name}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+class EmbeddingCache:
+    """Embeddings keyed by a hash of model name and text.
+
+    Recently used vectors are kept in an LRU of ``max_entries`` in RAM. With
+    a ``path`` every stored vector is also written to a SQLite file, which
+    outlives restarts and is shared by worker processes; RAM misses fall
+    back to it and promote what they find.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)")
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+            self._stats["hits"] += len(found)
+
+            missing = list({key for key in keys if key not in found})
+            if missing and self._db is not None:
+                # Stay below SQLite's default limit of 999 bound parameters
+                for start in range(0, len(missing), 900):
+                    chunk = missing[start:start + 900]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        self._remember(key, vector)
+                        found[key] = vector
+                    self._stats["disk_hits"] += len(rows)
+            self._stats["misses"] += sum(key not in found for key in keys)
+        return found
+
+    def put_many(self, items: Dict[bytes, np.ndarray]):
+        if not items:
+            return
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, np.asarray(vector, dtype=np.float32))
+            self._stats["stores"] += len(items)
+            if self._db is not None:
+                self._db.execute("BEGIN")
+                try:
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+                    )
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._db.execute("COMMIT")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "hit_rate": (self._stats["hits"] + self._stats["disk_hits"]) / lookups if lookups else 0.0
+            }
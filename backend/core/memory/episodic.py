@@ -1,56 +1,284 @@
 from typing import List, Dict, Optional
 from datetime import datetime
+import bisect
+import contextlib
 import json
 import os
+import threading
+import time
+from .text_index import InvertedIndex
 
 class EpisodicMemory:
-    def __init__(self, storage_path: str = "./data/episodic"):
+    """Episodic memory backed by an append-only JSONL log.
+
+    Each episode is one line in ``episodes.jsonl``. Adding an episode appends a
+    single line, so the write cost does not depend on how many episodes exist.
+    Appends are flushed to the OS immediately and fsync'd in batches (every
+    ``fsync_every`` records or ``fsync_interval`` seconds, whichever comes
+    first); a timer fsyncs the last batch when appends stop. The log is
+    replayed on startup; a torn trailing line left by a crash is dropped and
+    the log is compacted.
+
+    Lookups go through an id -> position index and an inverted token index
+    over user messages and agent responses, both maintained on every add.
+
+    With a ``store`` (``core.storage.sqlite_store.SQLiteStore``) episodes
+    live in SQLite instead and nothing is held in memory.
+    """
+
+    def __init__(self, storage_path: str = "./data/episodic", fsync_every: int = 32, fsync_interval: float = 1.0,
+                 store=None):
         self.storage_path = storage_path
+        self.store = store
         os.makedirs(storage_path, exist_ok=True)
         self.episodes_file = os.path.join(storage_path, "episodes.json")
+        self.log_file = os.path.join(storage_path, "episodes.jsonl")
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._sync_timer: Optional[threading.Timer] = None
+        self._log = None
+        self._id_index: Dict[str, int] = {}
+        self._timestamps: List[str] = []
+        self._text_index = InvertedIndex()
+        if store is not None:
+            self.episodes = []
+            return
         self.episodes = self._load_episodes()
+        for position, episode in enumerate(self.episodes):
+            self._index_episode(position, episode)
+        self._log = open(self.log_file, 'a', encoding='utf-8')
 
     def _load_episodes(self) -> List[Dict]:
-        if os.path.exists(self.episodes_file):
-            with open(self.episodes_file, 'r') as f:
-                return json.load(f)
-        return []
+        if not os.path.exists(self.log_file):
+            if os.path.exists(self.episodes_file):
+                # Migrate the legacy single-document store into the log
+                with open(self.episodes_file, 'r') as f:
+                    episodes = json.load(f)
+                self._write_log(episodes)
+                os.replace(self.episodes_file, self.episodes_file + ".migrated")
+                return episodes
+            return []
+
+        episodes = []
+        dead_records = 0
+        with open(self.log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    episodes.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Partial write from a crash; the record was never acknowledged
+                    dead_records += 1
+
+        if dead_records:
+            self._write_log(episodes)
+        return episodes
+
+    def _write_log(self, episodes: List[Dict]):
+        """Atomically replace the log with one record per live episode."""
+        tmp_file = self.log_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for episode in episodes:
+                f.write(json.dumps(episode) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.log_file)
+        self._fsync_dir()
+
+    def _fsync_dir(self):
+        try:
+            fd = os.open(self.storage_path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _index_episode(self, position: int, episode: Dict):
+        self._id_index[episode['id']] = position
+        self._timestamps.append(episode.get('timestamp', ''))
+        self._text_index.add(position, f"{episode['user_message']} {episode['agent_response']}")
+
+    def _reset_indexes(self):
+        self._id_index = {}
+        self._timestamps = []
+        self._text_index.clear()
+
+    def _append(self, lines: List[str]):
+        start, unsynced = self._log.tell(), self._unsynced
+        try:
+            self._log.write("".join(lines))
+            self._log.flush()
+            self._unsynced += len(lines)
+            self._maybe_sync()
+        except Exception:
+            # Cut the log back so a retry does not leave a torn or duplicate record
+            with contextlib.suppress(Exception):
+                self._log.close()
+            os.truncate(self.log_file, start)
+            self._log = open(self.log_file, 'a', encoding='utf-8')
+            self._unsynced = unsynced
+            raise
+
+    def _maybe_sync(self):
+        elapsed = time.monotonic() - self._last_sync
+        if self._unsynced >= self.fsync_every or elapsed >= self.fsync_interval:
+            self._sync()
+        elif self._sync_timer is None:
+            # Sync the batch even if no further append arrives
+            self._sync_timer = threading.Timer(self.fsync_interval - elapsed, self._timed_sync)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+    def _timed_sync(self):
+        with self._lock:
+            self._sync_timer = None
+            if self._log is not None and not self._log.closed:
+                self._sync()
 
-    def _save_episodes(self):
-        with open(self.episodes_file, 'w') as f:
-            json.dump(self.episodes, f, indent=2)
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self._log.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _cancel_timer(self):
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
 
     def add_episode(self, interaction: Dict) -> str:
-        episode = {
-            'id': str(len(self.episodes)),
-            'timestamp': datetime.utcnow().isoformat(),
-            'user_message': interaction.get('user_message', ''),
-            'agent_response': interaction.get('agent_response', ''),
-            'tools_used': interaction.get('tools_used', []),
-            'context': interaction.get('context', {})
-        }
-        self.episodes.append(episode)
-        self._save_episodes()
-        return episode['id']
+        return self.add_episodes([interaction])[0]
+
+    def add_episodes(self, interactions: List[Dict]) -> List[str]:
+        """Append several episodes with a single log write
+
+        Episodes are numbered by position unless they carry an ``id``, as
+        imported ones do; an episode whose id is already stored is skipped.
+        """
+        if self.store is not None:
+            return self.store.add_episodes(interactions)
+        with self._lock:
+            ids = []
+            episodes = []
+            batch_ids = set()
+            for interaction in interactions:
+                episode_id = interaction.get('id') or str(len(self.episodes) + len(episodes))
+                ids.append(episode_id)
+                if episode_id in self._id_index or episode_id in batch_ids:
+                    continue
+                batch_ids.add(episode_id)
+                episodes.append({
+                    'id': episode_id,
+                    'timestamp': interaction.get('timestamp') or datetime.utcnow().isoformat(),
+                    'user_message': interaction.get('user_message', ''),
+                    'agent_response': interaction.get('agent_response', ''),
+                    'tools_used': interaction.get('tools_used', []),
+                    'context': interaction.get('context', {})
+                })
+            if not episodes:
+                return ids
+            # Only episodes that reached the log are kept, so a failed
+            # write can be retried without duplicating them in memory
+            self._append([json.dumps(episode) + "\n" for episode in episodes])
+            for episode in episodes:
+                self.episodes.append(episode)
+                self._index_episode(len(self.episodes) - 1, episode)
+            return ids
 
     def get_recent_episodes(self, n: int = 10) -> List[Dict]:
+        if self.store is not None:
+            return self.store.recent_episodes(n)
         return self.episodes[-n:]
 
+    def count(self) -> int:
+        if self.store is not None:
+            return self.store.count_episodes()
+        return len(self.episodes)
+
     def get_episode(self, episode_id: str) -> Optional[Dict]:
-        for episode in self.episodes:
-            if episode['id'] == episode_id:
-                return episode
-        return None
-
-    def search_episodes(self, query: str) -> List[Dict]:
-        results = []
-        query_lower = query.lower()
-        for episode in self.episodes:
-            if (query_lower in episode['user_message'].lower() or
-                query_lower in episode['agent_response'].lower()):
-                results.append(episode)
-        return results
+        if self.store is not None:
+            return self.store.get_episode(episode_id)
+        position = self._id_index.get(episode_id)
+        return self.episodes[position] if position is not None else None
+
+    def search_episodes(self, query: str, start_time: Optional[str] = None, end_time: Optional[str] = None,
+                        limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        page = self.search_episodes_page(query, start_time, end_time, limit, offset)
+        return [result['episode'] for result in page['results']]
+
+    def search_episodes_page(self, query: str, start_time: Optional[str] = None, end_time: Optional[str] = None,
+                             limit: Optional[int] = None, offset: int = 0) -> Dict:
+        """Ranked full-text search with an optional ISO timestamp range.
+
+        Returns the total number of matches and the requested page, best match
+        first. An empty query lists the episodes in range, newest first.
+        """
+        if self.store is not None:
+            return self.store.search_episodes(query, start_time, end_time, limit, offset)
+        with self._lock:
+            # Episodes are appended in time order, so the range is a slice
+            lo = bisect.bisect_left(self._timestamps, start_time) if start_time else 0
+            hi = bisect.bisect_right(self._timestamps, end_time) if end_time else len(self._timestamps)
+
+            stop = offset + limit if limit is not None else None
+            if query.strip():
+                ranked = self._text_index.search(query, predicate=lambda position: lo <= position < hi)
+                # Newer episodes win ties
+                ranked.sort(key=lambda item: (item[1], item[0]), reverse=True)
+                total = len(ranked)
+                page = ranked[offset:stop]
+            else:
+                total = max(hi - lo, 0)
+                page = [(position, 0.0) for position in range(hi - 1, lo - 1, -1)[offset:stop]]
+
+            return {
+                'total': total,
+                'results': [
+                    {'episode': self.episodes[position], 'score': score}
+                    for position, score in page
+                ]
+            }
+
+    def compact(self):
+        """Rewrite the log so it holds exactly the live episodes."""
+        if self.store is not None:
+            return
+        with self._lock:
+            self._cancel_timer()
+            self._log.close()
+            self._write_log(self.episodes)
+            self._log = open(self.log_file, 'a', encoding='utf-8')
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def flush(self):
+        """Force any batched appends to stable storage."""
+        if self.store is not None:
+            return
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._cancel_timer()
+            if self._log is not None and not self._log.closed:
+                self._sync()
+                self._log.close()
 
     def clear_all(self):
-        self.episodes = []
-        self._save_episodes()
+        if self.store is not None:
+            self.store.clear_episodes()
+            return
+        with self._lock:
+            self.episodes = []
+            self._reset_indexes()
+        self.compact()
@@ -0,0 +1,294 @@
+"""Bulk export, import and re-embedding of vector memory.
+
+Usage (from ``backend/``)::
+
+    python -m core.memory.memory_io export --data-dir ./data --out ./backup
+    python -m core.memory.memory_io import --data-dir ./data --src ./backup
+    python -m core.memory.memory_io reembed --data-dir ./data --model all-mpnet-base-v2
+
+An export is a directory of parts, each ``part-NNNNN.jsonl`` (one
+``{"id", "content", "metadata"}`` object per line) next to
+``part-NNNNN.npz`` (``ids`` and float32 ``embeddings`` in the same order),
+plus a ``manifest.json`` written last. Every step streams one chunk at a
+time, so memory use does not grow with the store.
+
+Export and import also carry the episodes, patterns and skills. They
+are written in the JSON backend's layout (``episodic/episodes.jsonl`` and
+``learning/*.json``) whichever storage backend they come from, and
+imported into either one.
+
+Import and re-embedding skip ids the target already holds, which makes
+both resumable: an interrupted run is simply started again. Episodes and
+skills are matched by id and name, and patterns are only imported into an
+empty target, as in ``core.storage.migrate``. Imported embeddings are
+reused when the export was made with the target's model and are
+recomputed otherwise. ``reembed`` writes into a fresh directory
+(``<data-dir>/memory.reembed`` by default); move it over ``memory`` with
+the server stopped to switch models.
+"""
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import argparse
+import json
+import os
+import shutil
+import time
+import numpy as np
+from .embedder import Embedder
+from .episodic import EpisodicMemory
+from .vector_store import VectorMemory
+from ..storage.migrate import import_json
+from ..storage.sqlite_store import SQLiteStore
+
+def _part_paths(path: str, part: int) -> Tuple[str, str]:
+    stem = os.path.join(path, f"part-{part:05d}")
+    return stem + ".jsonl", stem + ".npz"
+
+def export_memories(memory: VectorMemory, path: str, chunk_size: int = 10000,
+                    progress: Optional[Callable[[int], None]] = None) -> Dict:
+    """Write every memory and its embedding to ``path``; returns the manifest"""
+    os.makedirs(path, exist_ok=True)
+    total, parts, dim = 0, 0, 0
+    for rows, embeddings in memory.backend.iter_batches(chunk_size):
+        jsonl_file, npz_file = _part_paths(path, parts)
+        with open(jsonl_file, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps({'id': row['id'], 'content': row['content'], 'metadata': row['metadata']}) + "\n")
+        np.savez(npz_file, ids=np.array([row['id'] for row in rows]), embeddings=embeddings.astype(np.float32))
+        total += len(rows)
+        parts += 1
+        dim = embeddings.shape[1] if embeddings.size else dim
+        if progress:
+            progress(total)
+
+    manifest = {"count": total, "parts": parts, "dim": dim, "model": memory.embedder.model_name,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(os.path.join(path, "manifest.json"), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def read_export(path: str) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+    """Yield each exported part as (rows, embeddings)"""
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    for part in range(manifest["parts"]):
+        jsonl_file, npz_file = _part_paths(path, part)
+        with open(jsonl_file, 'r', encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        with np.load(npz_file) as arrays:
+            embeddings = arrays["embeddings"]
+            if [row['id'] for row in rows] != arrays["ids"].tolist():
+                raise ValueError(f"{jsonl_file} and {npz_file} disagree on ids")
+        yield rows, embeddings
+
+def _store_missing(memory: VectorMemory, rows: List[Dict], embeddings: Optional[np.ndarray]) -> int:
+    present = {row['id'] for row in memory.backend.get([row['id'] for row in rows])}
+    keep = [i for i, row in enumerate(rows) if row['id'] not in present]
+    if not keep:
+        return 0
+    contents = [rows[i]['content'] for i in keep]
+    vectors = embeddings[keep] if embeddings is not None else memory.embedder.embed(contents)
+    memory.add_embedded([rows[i]['id'] for i in keep], contents, vectors, [rows[i]['metadata'] for i in keep])
+    return len(keep)
+
+def import_memories(memory: VectorMemory, path: str, progress: Optional[Callable[[int], None]] = None) -> Dict:
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    # Vectors from another model do not live in the same space
+    reuse = manifest["model"] == memory.embedder.model_name
+    counts = {"read": 0, "imported": 0, "reembedded": not reuse}
+    for rows, embeddings in read_export(path):
+        counts["imported"] += _store_missing(memory, rows, embeddings if reuse else None)
+        counts["read"] += len(rows)
+        if progress:
+            progress(counts["read"])
+    return counts
+
+def reembed(source: VectorMemory, target: VectorMemory, chunk_size: int = 2000,
+            progress: Optional[Callable[[int], None]] = None) -> Dict:
+    """Copy every memory from ``source`` to ``target``, embedded with the target's model"""
+    counts = {"read": 0, "embedded": 0}
+    for rows, _ in source.backend.iter_batches(chunk_size):
+        counts["embedded"] += _store_missing(target, rows, None)
+        counts["read"] += len(rows)
+        if progress:
+            progress(counts["read"])
+    return counts
+
+_PATTERN_FILES = (("keywords", "patterns.json"), ("clusters", "clusters.json"))
+
+def _read_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _write_json(path: str, value):
+    tmp_file = path + ".tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(value, f, indent=2)
+    os.replace(tmp_file, path)
+
+def _iter_json_episodes(episodic_dir: str, batch_size: int) -> Iterator[List[Dict]]:
+    log_file = os.path.join(episodic_dir, "episodes.jsonl")
+    if not os.path.exists(log_file):
+        episodes = _read_json(os.path.join(episodic_dir, "episodes.json"), [])
+        for start in range(0, len(episodes), batch_size):
+            yield episodes[start:start + batch_size]
+        return
+    batch = []
+    with open(log_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                batch.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Blank or torn line
+                continue
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def export_state(data_dir: str, path: str, store: Optional[SQLiteStore] = None, batch_size: int = 1000) -> Dict:
+    """Write episodes, patterns and skills under ``path``; returns how many of each
+
+    They are read from ``store`` when given, else from the JSON files in
+    ``data_dir``.
+    """
+    episodic_dir = os.path.join(path, "episodic")
+    learning_dir = os.path.join(path, "learning")
+    os.makedirs(episodic_dir, exist_ok=True)
+    os.makedirs(learning_dir, exist_ok=True)
+    source_dir = os.path.join(data_dir, "learning")
+    counts = {"episodes": 0}
+
+    batches = (store.iter_episodes(batch_size) if store is not None
+               else _iter_json_episodes(os.path.join(data_dir, "episodic"), batch_size))
+    with open(os.path.join(episodic_dir, "episodes.jsonl"), 'w', encoding='utf-8') as f:
+        for batch in batches:
+            for episode in batch:
+                f.write(json.dumps(episode) + "\n")
+            counts["episodes"] += len(batch)
+
+    for mode, name in _PATTERN_FILES:
+        if store is not None:
+            rows = store.load_patterns(mode)
+            patterns = [pattern for pattern, _ in rows]
+            if mode == "clusters" and rows and all(centroid is not None for _, centroid in rows):
+                np.save(os.path.join(learning_dir, "centroids.npy"),
+                        np.stack([np.frombuffer(centroid, dtype=np.float32) for _, centroid in rows]))
+        else:
+            patterns = _read_json(os.path.join(source_dir, name), [])
+            centroids_file = os.path.join(source_dir, "centroids.npy")
+            if mode == "clusters" and patterns and os.path.exists(centroids_file):
+                shutil.copyfile(centroids_file, os.path.join(learning_dir, "centroids.npy"))
+        _write_json(os.path.join(learning_dir, name), patterns)
+        counts[mode if mode == "clusters" else "patterns"] = len(patterns)
+
+    skills = store.load_skills() if store is not None else _read_json(os.path.join(source_dir, "skills.json"), {})
+    _write_json(os.path.join(learning_dir, "skills.json"), skills)
+    counts["skills"] = len(skills)
+    return counts
+
+def import_state(path: str, data_dir: str, store: Optional[SQLiteStore] = None,
+                 batch_size: int = 1000) -> Dict[str, Dict[str, int]]:
+    """Import an ``export_state`` directory; returns ``{kind: {"imported": n, "skipped": m}}``
+
+    Into ``store`` when given, else into the JSON files in ``data_dir``.
+    """
+    if store is not None:
+        return import_json(path, store, batch_size)
+
+    counts = {}
+    episodic = EpisodicMemory(os.path.join(data_dir, "episodic"))
+    try:
+        read = 0
+        before = episodic.count()
+        for batch in _iter_json_episodes(os.path.join(path, "episodic"), batch_size):
+            episodic.add_episodes(batch)
+            read += len(batch)
+        imported = episodic.count() - before
+    finally:
+        episodic.close()
+    counts["episodes"] = {"imported": imported, "skipped": read - imported}
+
+    source_dir = os.path.join(path, "learning")
+    target_dir = os.path.join(data_dir, "learning")
+    os.makedirs(target_dir, exist_ok=True)
+    for mode, name in _PATTERN_FILES:
+        patterns = _read_json(os.path.join(source_dir, name), [])
+        imported = 0
+        # Patterns are numbered by position, so only import into an empty file
+        if patterns and not _read_json(os.path.join(target_dir, name), []):
+            centroids_file = os.path.join(source_dir, "centroids.npy")
+            if mode == "clusters" and os.path.exists(centroids_file):
+                shutil.copyfile(centroids_file, os.path.join(target_dir, "centroids.npy"))
+            _write_json(os.path.join(target_dir, name), patterns)
+            imported = len(patterns)
+        counts[mode if mode == "clusters" else "patterns"] = {"imported": imported, "skipped": len(patterns) - imported}
+
+    skills = _read_json(os.path.join(source_dir, "skills.json"), {})
+    existing = _read_json(os.path.join(target_dir, "skills.json"), {})
+    new = {name: skill for name, skill in skills.items() if name not in existing}
+    if new:
+        _write_json(os.path.join(target_dir, "skills.json"), {**existing, **new})
+    counts["skills"] = {"imported": len(new), "skipped": len(skills) - len(new)}
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Export, import or re-embed memory")
+    parser.add_argument("command", choices=["export", "import", "reembed"])
+    parser.add_argument("--data-dir", default="./data")
+    parser.add_argument("--backend", default=os.getenv("VECTOR_BACKEND", "chroma"), choices=["chroma", "numpy"])
+    parser.add_argument("--storage", default=os.getenv("STORAGE_BACKEND", "json"), choices=["json", "sqlite"],
+                        help="where episodes, patterns and skills live")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
+                        help="model of the store (export/import) or the new model (reembed)")
+    parser.add_argument("--source-model", default=None, help="reembed: model of the existing store")
+    parser.add_argument("--out", help="export: directory to write")
+    parser.add_argument("--src", help="import: directory of a previous export")
+    parser.add_argument("--target-dir", default=None, help="reembed: default <data-dir>/memory.reembed")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    # Same rule as the server: only the NumPy backend and SQLite are safe to open from a second process
+    lock = None
+    if args.backend != "numpy" or (args.storage != "sqlite" and args.command != "reembed"):
+        from ..storage.file_lock import DataDirLock
+        lock = DataDirLock(args.data_dir, "Stop the server before running memory_io on its data directory.")
+        lock.acquire()
+
+    memory_dir = os.path.join(args.data_dir, "memory")
+    report = lambda done: print(f"  {done} memories", end="\r", flush=True)
+    store = SQLiteStore(os.path.join(args.data_dir, "nexus.db")) if args.storage == "sqlite" else None
+    try:
+        if args.command == "export":
+            if not args.out:
+                parser.error("export needs --out")
+            memory = VectorMemory(memory_dir, backend=args.backend, embedder=Embedder(args.model))
+            result = export_memories(memory, args.out, args.chunk_size, report)
+            result.update(export_state(args.data_dir, args.out, store))
+        elif args.command == "import":
+            if not args.src:
+                parser.error("import needs --src")
+            memory = VectorMemory(memory_dir, backend=args.backend, embedder=Embedder(args.model))
+            result = import_memories(memory, args.src, report)
+            result.update(import_state(args.src, args.data_dir, store))
+        else:
+            memory = VectorMemory(memory_dir, backend=args.backend, embedder=Embedder(args.source_model or args.model))
+            target = VectorMemory(args.target_dir or memory_dir + ".reembed", backend=args.backend,
+                                  embedder=Embedder(args.model))
+            try:
+                result = reembed(memory, target, args.chunk_size, report)
+            finally:
+                target.close()
+        memory.close()
+        print(f"\n{args.command}: {result}")
+    finally:
+        if store is not None:
+            store.close()
+        if lock is not None:
+            lock.release()
+
+if __name__ == "__main__":
+    main()
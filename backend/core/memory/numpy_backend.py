@@ -0,0 +1,367 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager, suppress
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+from .vector_backend import VectorBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    slot INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    document TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_STATE_KEYS = ("dim", "rows", "live", "capacity", "layout", "deletes", "file")
+
+class NumpyBackend(VectorBackend):
+    """Brute-force cosine search over a memory-mapped ``.npy`` matrix.
+
+    Row ``slot`` of the vectors file holds one unit-length float32
+    embedding; ids, documents and metadata live in a small SQLite side
+    store (``meta.db``) keyed by the same slot. Deleted rows are
+    tombstoned, not moved, and ``compact`` reclaims them.
+
+    Opening the store maps the file read-only without reading it, so
+    startup takes milliseconds and hot rows stay in the OS page cache,
+    shared by every process that maps the same file. Writers serialize on
+    the SQLite write lock and write vectors to the file with plain writes
+    before committing their rows, so readers in other processes never see a
+    row without its vector. Growing or compacting writes a complete new
+    file (``vectors.<n>.npy``) and the commit that switches ``state`` over
+    to it is the only step that makes it current, so a crash on either side
+    of it leaves the file and the rows consistent. Each call checks a few
+    counters in ``state`` and remaps or reloads tombstones when another
+    process has grown, compacted or deleted.
+
+    Compacting and clearing renumber slots and bump ``layout``. A query
+    scores a snapshot of the mapping without holding any lock, then looks
+    its top slots up together with the current ``layout`` in one read
+    transaction; if the layout moved in between, the query is run again.
+    """
+
+    def __init__(self, directory: str = "./data/memory", initial_capacity: int = 1024):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.initial_capacity = initial_capacity
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(directory, "meta.db"), timeout=30.0,
+                                   isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._vectors: Optional[np.memmap] = None
+        self._active = np.zeros(0, dtype=bool)
+        self._seen: Dict[str, int] = {}
+        self._refresh()
+
+    @contextmanager
+    def _transaction(self):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def _state(self) -> Dict[str, int]:
+        state = dict.fromkeys(_STATE_KEYS, 0)
+        state.update(self._db.execute("SELECT key, value FROM state").fetchall())
+        return state
+
+    def _set_state(self, **values: int):
+        self._db.executemany(
+            "INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            list(values.items())
+        )
+
+    def _vectors_file(self, generation: int) -> str:
+        return os.path.join(self.directory, f"vectors.{generation}.npy" if generation else "vectors.npy")
+
+    def _map(self, state: Dict[str, int]) -> Dict[str, int]:
+        """Map the vectors file ``state`` names, re-reading the state if a writer replaced it meanwhile"""
+        for _ in range(100):
+            if not state["capacity"]:
+                self._vectors = None
+                return state
+            try:
+                self._vectors = np.load(self._vectors_file(state["file"]), mmap_mode="r")
+                return state
+            except FileNotFoundError:
+                newer = self._state()
+                if newer["file"] == state["file"]:
+                    raise
+                state = newer
+        raise RuntimeError("vectors file keeps changing")
+
+    def _refresh(self) -> Dict[str, int]:
+        """Bring the mapping and tombstones in line with the side store"""
+        state = self._state()
+        seen = self._seen
+        if (state["layout"] != seen.get("layout") or state["capacity"] != seen.get("capacity") or
+                state["file"] != seen.get("file")):
+            state = self._map(state)
+            seen = {}
+        if state["deletes"] != seen.get("deletes") or state["rows"] < seen.get("rows", 0) or not seen:
+            self._active = np.zeros(state["capacity"], dtype=bool)
+            self._active[:state["rows"]] = True
+            deleted = [slot for (slot,) in self._db.execute("SELECT slot FROM rows WHERE deleted = 1")]
+            self._active[deleted] = False
+        elif state["rows"] > seen.get("rows", 0):
+            self._active[seen.get("rows", 0):state["rows"]] = True
+        self._seen = state
+        return state
+
+    def _write_file(self, state: Dict[str, int], capacity: int, dim: int, slots) -> None:
+        """Write a new vectors file holding ``slots`` of the current one, in order
+
+        The file is named after the next generation and only becomes
+        current once the caller commits ``file=state["file"] + 1``; until
+        then nobody maps it, and a crash leaves it to be overwritten.
+        """
+        new = np.lib.format.open_memmap(self._vectors_file(state["file"] + 1), mode="w+",
+                                        dtype=np.float32, shape=(capacity, dim))
+        if self._vectors is not None and len(slots):
+            new[:len(slots)] = self._vectors[slots]
+        new.flush()
+        del new
+
+    def _write_vectors(self, generation: int, start: int, embeddings: np.ndarray):
+        """Write rows from ``start`` into the file without mapping it writable"""
+        with open(self._vectors_file(generation), "r+b") as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                np.lib.format.read_array_header_1_0(f)
+            else:
+                np.lib.format.read_array_header_2_0(f)
+            f.seek(f.tell() + start * embeddings.shape[1] * embeddings.itemsize)
+            f.write(np.ascontiguousarray(embeddings).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _remove_file(self, generation: int):
+        # Processes still mapping it keep their mapping until they remap
+        with suppress(FileNotFoundError):
+            os.remove(self._vectors_file(generation))
+
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        if not ids:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock, self._transaction():
+            state = self._refresh()
+            dim = state["dim"] or embeddings.shape[1]
+            if embeddings.shape[1] != dim:
+                raise ValueError(f"embedding dimension {embeddings.shape[1]} does not match the store's {dim}")
+            start, end = state["rows"], state["rows"] + len(ids)
+            updates = {"dim": dim, "rows": end, "live": state["live"] + len(ids)}
+            generation = state["file"]
+            if end > state["capacity"] or self._vectors is None:
+                updates["capacity"] = max(end, 2 * state["capacity"], self.initial_capacity)
+                self._write_file(state, updates["capacity"], dim, np.arange(start))
+                generation = updates["file"] = state["file"] + 1
+
+            # Vectors are on disk before the rows that point at them commit
+            self._write_vectors(generation, start, embeddings)
+            self._db.executemany(
+                "INSERT INTO rows (slot, id, document, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (start + i, memory_id, document, json.dumps(metadata or {}))
+                    for i, (memory_id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                ]
+            )
+            self._set_state(**updates)
+        with self._lock:
+            if "file" in updates:
+                self._remove_file(state["file"])
+            self._refresh()
+
+    def _load_rows(self, where: str, params: Tuple) -> Dict[int, Dict]:
+        rows = self._db.execute(f"SELECT slot, id, document, metadata FROM rows WHERE {where}", params).fetchall()
+        return {
+            slot: {'id': memory_id, 'content': document, 'metadata': json.loads(metadata)}
+            for slot, memory_id, document, metadata in rows
+        }
+
+    def _rank(self, vectors: np.ndarray, active: np.ndarray, rows: int, embedding: np.ndarray,
+              n_results: int) -> Tuple[List[int], np.ndarray]:
+        """Top live slots of a mapping snapshot, best first, and every slot's similarity"""
+        # Matrix-vector product over the mapping; numpy releases the GIL
+        similarities = vectors[:rows] @ np.asarray(embedding, dtype=np.float32)
+        similarities[~active[:rows]] = -np.inf
+        k = min(n_results, rows)
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [int(slot) for slot in top if similarities[slot] != -np.inf], similarities
+
+    def query(self, embedding: np.ndarray, n_results: int, max_attempts: int = 3) -> List[Dict]:
+        if n_results <= 0:
+            return []
+        for attempt in range(max_attempts):
+            with self._lock:
+                if attempt == max_attempts - 1:
+                    # Out of retries: score inside one read transaction so the
+                    # layout cannot move under us
+                    return self._query_locked(embedding, n_results)
+                state = self._refresh()
+                vectors, active, rows, layout = self._vectors, self._active, state["rows"], state["layout"]
+            if vectors is None or not rows:
+                return []
+
+            top, similarities = self._rank(vectors, active, rows, embedding, n_results)
+            if not top:
+                return []
+
+            with self._lock, self._read():
+                if self._layout() != layout:
+                    # Compacted or cleared since the snapshot: slots were renumbered
+                    continue
+                found = self._load_slots(top)
+            return self._results(top, found, similarities)
+        return []
+
+    def _query_locked(self, embedding: np.ndarray, n_results: int) -> List[Dict]:
+        with self._read():
+            state = self._refresh()
+            if self._vectors is None or not state["rows"]:
+                return []
+            top, similarities = self._rank(self._vectors, self._active, state["rows"], embedding, n_results)
+            found = self._load_slots(top) if top else {}
+        return self._results(top, found, similarities)
+
+    def _results(self, top: List[int], found: Dict[int, Dict], similarities: np.ndarray) -> List[Dict]:
+        return [
+            {**found[slot], 'distance': float(1.0 - similarities[slot])}
+            for slot in top if slot in found
+        ]
+
+    @contextmanager
+    def _read(self):
+        # One snapshot for every statement inside
+        self._db.execute("BEGIN")
+        try:
+            yield
+        finally:
+            self._db.execute("COMMIT")
+
+    def _layout(self) -> int:
+        row = self._db.execute("SELECT value FROM state WHERE key = 'layout'").fetchone()
+        return row[0] if row is not None else 0
+
+    def _load_slots(self, slots: List[int]) -> Dict[int, Dict]:
+        found = {}
+        for start in range(0, len(slots), 900):
+            chunk = tuple(slots[start:start + 900])
+            found.update(self._load_rows(f"deleted = 0 AND slot IN ({','.join('?' * len(chunk))})", chunk))
+        return found
+
+    def get(self, ids: List[str]) -> List[Dict]:
+        if not ids:
+            return []
+        found = {}
+        with self._lock:
+            # Stay below SQLite's default limit of 999 bound parameters
+            for start in range(0, len(ids), 900):
+                chunk = tuple(ids[start:start + 900])
+                found.update(self._load_rows(f"deleted = 0 AND id IN ({','.join('?' * len(chunk))})", chunk))
+        return [found[slot] for slot in sorted(found)]
+
+    def page(self, limit: int, offset: int = 0) -> List[Dict]:
+        with self._lock:
+            found = self._load_rows("deleted = 0 ORDER BY slot LIMIT ? OFFSET ?", (limit, offset))
+        return list(found.values())
+
+    def iter_batches(self, batch_size: int = 5000) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+        # Keyset pagination on slot, so each batch is an index range scan
+        last_slot = -1
+        while True:
+            with self._lock:
+                self._refresh()
+                found = self._load_rows("deleted = 0 AND slot > ? ORDER BY slot LIMIT ?", (last_slot, batch_size))
+                if not found:
+                    return
+                slots = list(found)
+                embeddings = np.array(self._vectors[slots])
+            yield list(found.values()), embeddings
+            if len(slots) < batch_size:
+                return
+            last_slot = slots[-1]
+
+    def iter_documents(self, batch_size: int = 5000) -> Iterator[List[Dict]]:
+        last_slot = -1
+        while True:
+            with self._lock:
+                found = self._load_rows("deleted = 0 AND slot > ? ORDER BY slot LIMIT ?", (last_slot, batch_size))
+            if not found:
+                return
+            yield list(found.values())
+            if len(found) < batch_size:
+                return
+            last_slot = max(found)
+
+    def delete(self, ids: List[str]):
+        if not ids:
+            return
+        with self._lock, self._transaction():
+            state = self._state()
+            deleted = 0
+            # Stay below SQLite's default limit of 999 bound parameters
+            for start in range(0, len(ids), 900):
+                chunk = tuple(ids[start:start + 900])
+                deleted += self._db.execute(
+                    f"UPDATE rows SET deleted = 1 WHERE deleted = 0 AND id IN ({','.join('?' * len(chunk))})", chunk
+                ).rowcount
+            if deleted:
+                self._set_state(live=state["live"] - deleted, deletes=state["deletes"] + 1)
+        with self._lock:
+            self._refresh()
+
+    def count(self) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM state WHERE key = 'live'").fetchone()
+        return row[0] if row is not None else 0
+
+    def compact(self):
+        """Drop tombstoned rows and renumber the live ones contiguously"""
+        with self._lock, self._transaction():
+            state = self._refresh()
+            live = [slot for (slot,) in self._db.execute("SELECT slot FROM rows WHERE deleted = 0 ORDER BY slot")]
+            if len(live) == state["rows"]:
+                return
+            capacity = max(len(live), self.initial_capacity)
+            self._write_file(state, capacity, state["dim"] or 1, np.asarray(live, dtype=np.int64))
+            self._db.execute("DELETE FROM rows WHERE deleted = 1")
+            # Ascending order never collides: each new slot is <= its old one
+            self._db.executemany("UPDATE rows SET slot = ? WHERE slot = ?",
+                                 [(new, old) for new, old in enumerate(live) if new != old])
+            self._set_state(rows=len(live), capacity=capacity, layout=state["layout"] + 1,
+                            deletes=state["deletes"] + 1, file=state["file"] + 1)
+        with self._lock:
+            self._remove_file(state["file"])
+            self._refresh()
+
+    def clear(self):
+        with self._lock, self._transaction():
+            state = self._state()
+            self._db.execute("DELETE FROM rows")
+            # Keep the file and capacity; slots are reused from zero, which
+            # renumbers them as far as in-flight queries are concerned
+            self._set_state(dim=0 if not state["capacity"] else state["dim"], rows=0, live=0,
+                            layout=state["layout"] + 1, deletes=state["deletes"] + 1)
+        with self._lock:
+            self._refresh()
+
+    def close(self):
+        with self._lock:
+            self._vectors = None
+            self._db.close()
@@ -0,0 +1,33 @@
+from typing import Dict, List
+import threading
+
+class CrossEncoderReranker:
+    """Re-scores retrieved memories with a local cross-encoder.
+
+    The sentence-transformers model is loaded on first use so that the
+    import and model load only cost anything when reranking is enabled.
+    Only the top ``max_candidates`` fused results are scored.
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", max_candidates: int = 20):
+        self.model_name = model_name
+        self.max_candidates = max_candidates
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def rerank(self, query: str, memories: List[Dict]) -> List[Dict]:
+        candidates = memories[:self.max_candidates]
+        if not candidates:
+            return memories
+        scores = self._get_model().predict([(query, memory['content']) for memory in candidates])
+        reranked = [{**memory, 'rerank_score': float(score)} for memory, score in zip(candidates, scores)]
+        reranked.sort(key=lambda memory: memory['rerank_score'], reverse=True)
+        return reranked + memories[self.max_candidates:]
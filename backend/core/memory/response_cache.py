@@ -0,0 +1,104 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import threading
+import time
+import numpy as np
+
+class ResponseCache:
+    """Semantic cache of final answers keyed on the user message embedding.
+
+    A lookup hits when a stored message lies within ``max_distance`` cosine
+    distance of the new one. Entries expire after ``ttl`` seconds and the
+    least recently used entry is evicted once ``max_entries`` is reached.
+    Embeddings live in one preallocated matrix, so a lookup is a single
+    matrix-vector product.
+
+    The key is the message alone, so only answers that do not depend on
+    earlier turns belong here; the agent looks up and stores the first
+    turn of a session only.
+    """
+
+    def __init__(self, max_distance: float = 0.05, ttl: float = 3600.0, max_entries: int = 1024):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        self._active = np.zeros(max_entries, dtype=bool)
+        self._created = np.zeros(max_entries, dtype=np.float64)
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0}
+
+    def _normalize(self, embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _release(self, slot: int):
+        del self._entries[slot]
+        self._active[slot] = False
+        self._free.append(slot)
+
+    def lookup(self, embedding: List[float]) -> Optional[Dict]:
+        """Return the cached entry closest to ``embedding``, if close enough and fresh"""
+        with self._lock:
+            if self._vectors is None or not self._entries:
+                self._stats["misses"] += 1
+                return None
+
+            # Expired entries are dropped first so they cannot hide a fresh match
+            expired = np.flatnonzero(self._active & (time.monotonic() - self._created > self.ttl))
+            for slot in expired:
+                self._release(int(slot))
+            self._stats["expirations"] += len(expired)
+            if not self._entries:
+                self._stats["misses"] += 1
+                return None
+
+            similarities = self._vectors @ self._normalize(embedding)
+            similarities[~self._active] = -np.inf
+            slot = int(np.argmax(similarities))
+            distance = 1.0 - float(similarities[slot])
+            entry = self._entries[slot]
+
+            if distance > self.max_distance:
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(slot)
+            self._stats["hits"] += 1
+            return {"message": entry["message"], "response": entry["response"], "distance": distance}
+
+    def store(self, embedding: List[float], message: str, response: str):
+        with self._lock:
+            vector = self._normalize(embedding)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+            if not self._free:
+                lru_slot = next(iter(self._entries))
+                self._release(lru_slot)
+                self._stats["evictions"] += 1
+
+            slot = self._free.pop()
+            self._vectors[slot] = vector
+            self._active[slot] = True
+            self._created[slot] = time.monotonic()
+            self._entries[slot] = {"message": message, "response": response}
+            self._stats["stores"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._active[:] = False
+            self._free = list(range(self.max_entries - 1, -1, -1))
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0
+            }
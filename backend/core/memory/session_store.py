@@ -0,0 +1,108 @@
+from typing import Dict, List, Tuple
+from collections import OrderedDict
+import threading
+import time
+
+class _Session:
+    __slots__ = ("turns", "last_seen")
+
+    def __init__(self, turns: Tuple[Tuple[str, str], ...], last_seen: float):
+        self.turns = turns
+        self.last_seen = last_seen
+
+class SessionStore:
+    """Recent conversation turns per session id.
+
+    Each session keeps at most ``max_turns`` (user, assistant) pairs as a
+    small tuple that is replaced on every turn, so a session costs a few
+    hundred bytes beyond its text. Sessions sit in an OrderedDict in
+    least-recently-used order: touching one moves it to the end, and
+    sessions idle for longer than ``ttl`` seconds or beyond
+    ``max_sessions`` are dropped from the front. Every operation is O(1)
+    amortized.
+
+    With a ``store`` (``core.storage.sqlite_store.SQLiteStore``) sessions
+    are persisted there instead and shared between worker processes.
+    """
+
+    def __init__(self, max_turns: int = 3, ttl: float = 3600.0, max_sessions: int = 100000, store=None):
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.store = store
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._evictions = 0
+        self._appends = 0
+
+    def _evict(self, now: float):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - session.last_seen <= self.ttl:
+                break
+            del self._sessions[session_id]
+            self._evictions += 1
+
+    def get_history(self, session_id: str) -> List[Dict]:
+        """The session's recent turns as chat messages, oldest first"""
+        now = time.time()
+        if self.store is not None:
+            turns = self.store.load_session(session_id, now - self.ttl)
+        else:
+            with self._lock:
+                self._evict(now)
+                session = self._sessions.get(session_id)
+                turns = session.turns if session is not None else ()
+        messages = []
+        for user_message, assistant_message in turns:
+            messages.append({"role": "user", "content": user_message})
+            messages.append({"role": "assistant", "content": assistant_message})
+        return messages
+
+    def append_turn(self, session_id: str, user_message: str, assistant_message: str):
+        now = time.time()
+        turn = (user_message, assistant_message)
+        if self.store is not None:
+            self.store.append_session_turn(session_id, turn, self.max_turns, now, now - self.ttl)
+            with self._lock:
+                self._appends += 1
+                prune = self._appends % 1024 == 0
+            if prune:
+                deleted = self.store.delete_sessions_before(now - self.ttl)
+                with self._lock:
+                    self._evictions += deleted
+            return
+
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or now - session.last_seen > self.ttl:
+                self._sessions[session_id] = _Session((turn,), now)
+            else:
+                session.turns = (session.turns + (turn,))[-self.max_turns:]
+                session.last_seen = now
+            self._sessions.move_to_end(session_id)
+            self._appends += 1
+            self._evict(now)
+
+    def delete(self, session_id: str):
+        if self.store is not None:
+            self.store.delete_session(session_id)
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+        if self.store is not None:
+            self.store.clear_sessions()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = {
+                "sessions": len(self._sessions),
+                "turns_recorded": self._appends,
+                "evictions": self._evictions
+            }
+        if self.store is not None:
+            stats["sessions"] = self.store.count_sessions()
+        return stats
@@ -0,0 +1,93 @@
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+import heapq
+import math
+import re
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, shared by every text index in the agent."""
+    return _TOKEN_RE.findall(text.lower())
+
+class InvertedIndex:
+    """In-process inverted index with BM25 ranking.
+
+    Postings map a term to ``{doc_key: term_frequency}`` so a query only touches
+    the documents that contain at least one query term.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, dense_fraction: float = 0.01, dense_min_df: int = 1000):
+        self.k1 = k1
+        self.b = b
+        self.dense_fraction = dense_fraction
+        self.dense_min_df = dense_min_df
+        self.postings: Dict[str, Dict[Hashable, int]] = {}
+        self.doc_lengths: Dict[Hashable, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, key: Hashable, text: str):
+        if key in self.doc_lengths:
+            self.remove(key, text)
+        tokens = tokenize(text)
+        for token in tokens:
+            postings = self.postings.setdefault(token, {})
+            postings[key] = postings.get(key, 0) + 1
+        self.doc_lengths[key] = len(tokens)
+        self._total_length += len(tokens)
+
+    def remove(self, key: Hashable, text: str):
+        """Remove a document; ``text`` must be the text it was indexed with."""
+        if key not in self.doc_lengths:
+            return
+        for token in set(tokenize(text)):
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self.postings[token]
+        self._total_length -= self.doc_lengths.pop(key)
+
+    def clear(self):
+        self.postings = {}
+        self.doc_lengths = {}
+        self._total_length = 0
+
+    def search(self, query: str, limit: Optional[int] = None, predicate: Optional[Callable[[Hashable], bool]] = None) -> List[Tuple[Hashable, float]]:
+        """Rank documents matching any query term by BM25 score.
+
+        ``predicate`` optionally restricts scoring to the keys it accepts.
+        With a ``limit``, terms are scored rarest first, and once at least
+        ``limit`` documents have matched, terms present in more than
+        ``dense_fraction`` of all documents only add to documents already
+        matched instead of opening new ones. Such terms carry little weight,
+        and skipping their long posting lists keeps queries with common
+        words fast on large indexes.
+        """
+        n_docs = len(self.doc_lengths)
+        if not n_docs:
+            return []
+        avg_length = self._total_length / n_docs or 1.0
+        dense = max(self.dense_min_df, self.dense_fraction * n_docs)
+        terms = [(term, self.postings[term]) for term in set(tokenize(query)) if term in self.postings]
+        terms.sort(key=lambda item: len(item[1]))
+
+        scores: Dict[Hashable, float] = {}
+        for term, postings in terms:
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            if limit is not None and len(postings) > dense and len(scores) >= limit:
+                matches = ((key, postings[key]) for key in scores if key in postings)
+            else:
+                matches = postings.items()
+            for key, tf in matches:
+                if predicate is not None and not predicate(key):
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[key] / avg_length)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if limit is not None:
+            return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,67 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from abc import ABC, abstractmethod
+import numpy as np
+
+class VectorBackend(ABC):
+    """Storage and nearest-neighbour search for VectorMemory.
+
+    Backends store ids, unit-length float32 embeddings, documents and
+    metadata. Embedding happens above this layer, so every backend sees the
+    same vectors. Results are dicts with ``id``, ``content``, ``metadata``
+    and, for queries, the cosine ``distance``.
+    """
+
+    @abstractmethod
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        ...
+
+    @abstractmethod
+    def query(self, embedding: np.ndarray, n_results: int) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def get(self, ids: List[str]) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def page(self, limit: int, offset: int = 0) -> List[Dict]:
+        ...
+
+    def iter_documents(self, batch_size: int = 5000) -> Iterator[List[Dict]]:
+        offset = 0
+        while True:
+            batch = self.page(batch_size, offset)
+            if batch:
+                yield batch
+            if len(batch) < batch_size:
+                return
+            offset += batch_size
+
+    @abstractmethod
+    def iter_batches(self, batch_size: int = 5000) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+        """Every stored memory with its embedding, ``batch_size`` rows at a time"""
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    def close(self):
+        pass
+
+def make_backend(kind: str, persist_directory: str, host: Optional[str] = None, port: int = 8000) -> VectorBackend:
+    # Imported lazily so the NumPy backend does not pull in chromadb
+    if kind == "numpy":
+        from .numpy_backend import NumpyBackend
+        return NumpyBackend(persist_directory)
+    if kind == "chroma":
+        from .chroma_backend import ChromaBackend
+        return ChromaBackend(persist_directory, host=host, port=port)
+    raise ValueError(f"Unknown vector backend: {kind}")
@@ -1,67 +1,155 @@
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import threading
 import uuid
 from datetime import datetime
+import numpy as np
+from .embedder import Embedder
+from .text_index import InvertedIndex
+from .vector_backend import make_backend
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Merge ranked id lists; each list contributes 1 / (k + rank) per id"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, memory_id in enumerate(ranking, start=1):
+            scores[memory_id] = scores.get(memory_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
 
 class VectorMemory:
-    def __init__(self, persist_directory: str = "./data/memory"):
-        self.client = chromadb.Client(Settings(
-            chroma_db_impl="duckdb+parquet",
-            persist_directory=persist_directory
-        ))
-        self.collection = self.client.get_or_create_collection(
-            name="nexus_memory",
-            metadata={"hnsw:space": "cosine"}
-        )
+    """Long-term memory with hybrid retrieval over a pluggable vector backend.
+
+    ``backend`` is "chroma" (an embedded or remote Chroma collection) or
+    "numpy" (a memory-mapped matrix, see numpy_backend.py); texts are
+    embedded here by ``embedder``, so both store the same vectors.
+
+    Next to the backend an in-process BM25 index covers the same documents,
+    kept in step by add_memories, delete_memory and clear_all and built from
+    the backend on the first query, so opening the memory stays cheap.
+    Queries run both searches and merge them with reciprocal-rank fusion, so
+    exact identifiers, error messages and file names are found even when
+    their embeddings are not close. An optional ``reranker`` (see
+    reranker.py) re-scores the fused candidates.
+
+    When several processes share a backend, the BM25 index only sees
+    memories present when it was built and those added by this process, so
+    lexical results would depend on the process serving a query. Pass
+    ``lexical=False`` there: no index is kept and "hybrid" queries are
+    plain vector searches.
+    """
+
+    def __init__(self, persist_directory: str = "./data/memory", backend: str = "chroma",
+                 host: Optional[str] = None, port: int = 8000, reranker=None, candidate_factor: int = 4,
+                 embedder: Optional[Embedder] = None, lexical: bool = True):
+        self.backend = make_backend(backend, persist_directory, host=host, port=port)
+        self.embedder = embedder or Embedder()
+        self.reranker = reranker
+        self.candidate_factor = candidate_factor
+        self.lexical = lexical
+        self._text_index = InvertedIndex()
+        self._text_index_loaded = False
+        self._index_lock = threading.Lock()
+
+    def _ensure_text_index(self):
+        # Adds and deletes before the first load also update the index;
+        # re-adding a document is idempotent, so the load may overlap them
+        with self._index_lock:
+            if self._text_index_loaded:
+                return
+            for batch in self.backend.iter_documents():
+                for memory in batch:
+                    self._text_index.add(memory['id'], memory['content'] or "")
+            self._text_index_loaded = True
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the model the stored memories were embedded with"""
+        return self.embedder.embed(texts).tolist()
 
     def add_memory(self, content: str, metadata: Optional[Dict] = None) -> str:
-        memory_id = str(uuid.uuid4())
-        if metadata is None:
-            metadata = {}
-        metadata["timestamp"] = datetime.utcnow().isoformat()
-
-        self.collection.add(
-            documents=[content],
-            metadatas=[metadata],
-            ids=[memory_id]
-        )
-        return memory_id
-
-    def query_memory(self, query: str, n_results: int = 5) -> List[Dict]:
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
-
-        memories = []
-        if results['documents'][0]:
-            for i, doc in enumerate(results['documents'][0]):
-                memories.append({
-                    'id': results['ids'][0][i],
-                    'content': doc,
-                    'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i] if 'distances' in results else None
-                })
-        return memories
+        return self.add_memories([content], [metadata])[0]
+
+    def add_memories(self, contents: List[str], metadatas: Optional[List[Optional[Dict]]] = None) -> List[str]:
+        """Add several memories with one embedding call and one backend insert"""
+        memory_ids = [str(uuid.uuid4()) for _ in contents]
+        timestamp = datetime.utcnow().isoformat()
+        prepared = []
+        for metadata in metadatas or [None] * len(contents):
+            metadata = dict(metadata or {})
+            metadata.setdefault("timestamp", timestamp)
+            prepared.append(metadata)
+
+        self.add_embedded(memory_ids, contents, self.embedder.embed(contents), prepared)
+        return memory_ids
+
+    def add_embedded(self, ids: List[str], contents: List[str], embeddings: np.ndarray, metadatas: List[Dict]):
+        """Store memories whose ids, metadata and embeddings are already known"""
+        if self.lexical:
+            with self._index_lock:
+                for memory_id, content in zip(ids, contents):
+                    self._text_index.add(memory_id, content)
+        self.backend.add(ids, embeddings, contents, metadatas)
+
+    def query_memory(self, query: str, n_results: int = 5, query_embedding: Optional[List[float]] = None,
+                     mode: str = "hybrid") -> List[Dict]:
+        """Top memories for ``query``; ``mode`` is "hybrid", "vector" or "lexical"
+
+        Results carry the fused ``score``; ``distance`` is None for memories
+        found only by the lexical search.
+        """
+        if not self.lexical:
+            if mode == "lexical":
+                raise ValueError("lexical memory search is disabled")
+            mode = "vector"
+        candidates = n_results * self.candidate_factor
+        if self.reranker is not None:
+            candidates = max(candidates, self.reranker.max_candidates)
+
+        if mode != "vector":
+            self._ensure_text_index()
+        vector_hits = self._vector_search(query, candidates, query_embedding) if mode != "lexical" else []
+        if mode == "vector":
+            lexical_ids = []
+        else:
+            with self._index_lock:
+                lexical_ids = [memory_id for memory_id, _ in self._text_index.search(query, limit=candidates)]
+
+        by_id = {memory['id']: memory for memory in vector_hits}
+        fused = reciprocal_rank_fusion([list(by_id), lexical_ids])[:candidates]
+        missing = [memory_id for memory_id, _ in fused if memory_id not in by_id]
+        if missing:
+            for memory in self.backend.get(missing):
+                by_id[memory['id']] = {**memory, 'distance': None}
+
+        memories = [{**by_id[memory_id], 'score': score} for memory_id, score in fused if memory_id in by_id]
+        if self.reranker is not None:
+            memories = self.reranker.rerank(query, memories)
+        return memories[:n_results]
+
+    def _vector_search(self, query: str, n_results: int, query_embedding: Optional[List[float]] = None) -> List[Dict]:
+        if query_embedding is None:
+            embedding = self.embedder.embed([query])[0]
+        else:
+            embedding = np.asarray(query_embedding, dtype=np.float32)
+        return self.backend.query(embedding, n_results)
 
     def get_all_memories(self, limit: int = 100) -> List[Dict]:
-        results = self.collection.get(limit=limit)
-        memories = []
-        for i, doc in enumerate(results['documents']):
-            memories.append({
-                'id': results['ids'][i],
-                'content': doc,
-                'metadata': results['metadatas'][i]
-            })
-        return memories
+        return self.backend.page(limit)
+
+    def count(self) -> int:
+        return self.backend.count()
 
     def delete_memory(self, memory_id: str):
-        self.collection.delete(ids=[memory_id])
+        if self.lexical:
+            found = self.backend.get([memory_id])
+            with self._index_lock:
+                for memory in found:
+                    self._text_index.remove(memory_id, memory['content'] or "")
+        self.backend.delete([memory_id])
 
     def clear_all(self):
-        self.client.delete_collection("nexus_memory")
-        self.collection = self.client.get_or_create_collection(
-            name="nexus_memory",
-            metadata={"hnsw:space": "cosine"}
-        )
+        with self._index_lock:
+            self._text_index.clear()
+        self.backend.clear()
+
+    def close(self):
+        self.embedder.close()
+        self.backend.close()
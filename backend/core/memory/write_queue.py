@@ -0,0 +1,171 @@
+from typing import Dict, List, Set, Tuple
+from datetime import datetime
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """Persists finished turns off the request path.
+
+    Turns are queued in memory and written by a background thread in
+    batches: one ``add_memories`` call (and so one embedding call) for all
+    queued vector memories, one log append for the episodes, and one flush
+    of any learning state changed in the meantime. A batch is written when
+    ``max_batch`` turns are waiting or ``flush_interval`` seconds after the
+    oldest one was queued. ``flush`` blocks until everything queued before
+    the call is durable, which gives callers read-your-writes.
+
+    The three stores are written independently. A store that fails is
+    retried for that batch ``max_retries`` times with exponential backoff
+    from ``retry_delay`` seconds; if it still fails the batch's turns are
+    counted as dropped and logged, never as persisted.
+    """
+
+    STORES = ("memories", "episodes", "learning")
+
+    def __init__(self, vector_memory, episodic_memory, learning_engine, max_batch: int = 64, flush_interval: float = 0.5,
+                 max_retries: int = 5, retry_delay: float = 0.5, max_retry_delay: float = 10.0):
+        self.vector_memory = vector_memory
+        self.episodic_memory = episodic_memory
+        self.learning_engine = learning_engine
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[str, Dict, Dict]] = []
+        self._oldest = 0.0
+        self._submitted = 0
+        self._persisted = 0
+        self._dropped = 0
+        self._flush_requested = False
+        self._closed = False
+        self._stats = {"batches": 0, "items": 0, "failures": 0, "retries": 0, "dropped": 0, "last_batch_ms": 0.0}
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, memory_content: str, memory_metadata: Dict, episode: Dict):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            # Stamp at submit time so episodes keep request order
+            timestamp = datetime.utcnow().isoformat()
+            memory_metadata.setdefault("timestamp", timestamp)
+            episode.setdefault("timestamp", timestamp)
+            first = not self._pending
+            if first:
+                self._oldest = time.monotonic()
+            self._pending.append((memory_content, memory_metadata, episode))
+            self._submitted += 1
+            # Wake the writer to start the flush_interval timer, or to write a full batch
+            if first or len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+
+    def flush(self) -> bool:
+        """Block until every turn submitted so far has been handled
+
+        Returns False if any of those turns was dropped after its retries
+        ran out, so it is not durable in every store.
+        """
+        with self._cond:
+            target = self._submitted
+            dropped = self._dropped
+            if self._persisted + self._dropped >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._persisted + self._dropped < target and self._thread.is_alive():
+                self._cond.wait()
+            return self._dropped == dropped and self._persisted + self._dropped >= target
+
+    def close(self):
+        """Drain the queue and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            return {
+                **self._stats,
+                "pending": len(self._pending),
+                "avg_batch_size": self._stats["items"] / self._stats["batches"] if self._stats["batches"] else 0.0
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._pending and (self._closed or self._flush_requested or
+                                          len(self._pending) >= self.max_batch):
+                        break
+                    if self._closed:
+                        return
+                    if self._pending:
+                        remaining = self.flush_interval - (time.monotonic() - self._oldest)
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                if self._pending:
+                    self._oldest = time.monotonic()
+                else:
+                    self._flush_requested = False
+
+            started = time.perf_counter()
+            todo = set(self.STORES)
+            failures = 0
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    with self._cond:
+                        self._stats["retries"] += 1
+                    time.sleep(min(self.retry_delay * 2 ** (attempt - 1), self.max_retry_delay))
+                failures += self._write(batch, todo)
+                if not todo:
+                    break
+
+            with self._cond:
+                if todo:
+                    self._dropped += len(batch)
+                    self._stats["dropped"] += len(batch)
+                    logger.error("dropping write-behind batch of %d turns; not written to %s after %d attempts",
+                                 len(batch), ", ".join(sorted(todo)), self.max_retries + 1)
+                else:
+                    self._persisted += len(batch)
+                self._stats["batches"] += 1
+                self._stats["items"] += len(batch)
+                self._stats["failures"] += failures
+                self._stats["last_batch_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                self._cond.notify_all()
+
+    def _write(self, batch: List[Tuple[str, Dict, Dict]], todo: Set[str]) -> int:
+        """Write ``batch`` to each store left in ``todo``, removing those that succeed; returns the failures"""
+        failures = 0
+        for store in [store for store in self.STORES if store in todo]:
+            try:
+                if store == "memories":
+                    self.vector_memory.add_memories(
+                        [content for content, _, _ in batch],
+                        [metadata for _, metadata, _ in batch]
+                    )
+                elif store == "episodes":
+                    self.episodic_memory.add_episodes([episode for _, _, episode in batch])
+                else:
+                    self.learning_engine.flush()
+            except Exception:
+                failures += 1
+                logger.exception("write-behind: writing %d turns to %s failed", len(batch), store)
+            else:
+                todo.discard(store)
+        return failures
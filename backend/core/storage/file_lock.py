@@ -0,0 +1,43 @@
+from typing import Optional
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process only
+    fcntl = None
+
+class DataDirLock:
+    """Exclusive advisory lock marking a data directory as owned by one process.
+
+    The JSON stores and the embedded Chroma client keep their state in
+    process memory, so a second worker on the same directory would silently
+    overwrite the first one's writes. Taking this lock makes the second
+    worker fail at startup instead.
+    """
+
+    def __init__(self, data_dir: str, reason: str):
+        self.path = os.path.join(data_dir, ".lock")
+        self.reason = reason
+        self._fd: Optional[int] = None
+
+    def acquire(self):
+        if fcntl is None or self._fd is not None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise RuntimeError(
+                f"{os.path.dirname(self.path)} is in use by another process. {self.reason}"
+            )
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
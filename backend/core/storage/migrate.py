@@ -0,0 +1,106 @@
+"""Import the JSON data files into the SQLite store.
+
+Usage (from ``backend/``)::
+
+    python -m core.storage.migrate --data-dir ./data
+
+Reads ``episodic/episodes.jsonl`` (or the legacy ``episodes.json``),
+``learning/patterns.json``, ``learning/clusters.json`` with
+``centroids.npy``, and ``learning/skills.json``. Rows that already exist
+are left alone, so the import can be re-run safely: episodes and skills
+are matched by id and name, and patterns and clusters are imported only
+into an empty table. Each kind is reported as imported and skipped. The
+JSON files are not modified.
+"""
+from typing import Dict, List
+import argparse
+import json
+import os
+import numpy as np
+from .sqlite_store import SQLiteStore
+
+def _read_episodes(episodic_dir: str) -> List[Dict]:
+    log_file = os.path.join(episodic_dir, "episodes.jsonl")
+    legacy_file = os.path.join(episodic_dir, "episodes.json")
+    if os.path.exists(log_file):
+        episodes = []
+        with open(log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    episodes.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass
+        return episodes
+    if os.path.exists(legacy_file):
+        with open(legacy_file, 'r') as f:
+            return json.load(f)
+    return []
+
+def _read_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def migrate(data_dir: str, db_path: str, batch_size: int = 1000) -> Dict[str, Dict[str, int]]:
+    """Import the JSON files; returns ``{kind: {"imported": n, "skipped": m}}``"""
+    store = SQLiteStore(db_path)
+    try:
+        return import_json(data_dir, store, batch_size)
+    finally:
+        store.close()
+
+def import_json(data_dir: str, store: SQLiteStore, batch_size: int = 1000) -> Dict[str, Dict[str, int]]:
+    """Import the JSON files under ``data_dir`` into an open store"""
+    counts = {}
+    episodes = _read_episodes(os.path.join(data_dir, "episodic"))
+    before = store.count_episodes()
+    for start in range(0, len(episodes), batch_size):
+        store.add_episodes(episodes[start:start + batch_size])
+    imported = store.count_episodes() - before
+    counts["episodes"] = {"imported": imported, "skipped": len(episodes) - imported}
+
+    learning_dir = os.path.join(data_dir, "learning")
+    # Patterns are appended, so only import into an empty table
+    patterns = _read_json(os.path.join(learning_dir, "patterns.json"), [])
+    imported = 0
+    if not store.load_patterns("keywords"):
+        store.save_patterns("keywords", [(position, p, None) for position, p in enumerate(patterns)], [])
+        imported = len(patterns)
+    counts["patterns"] = {"imported": imported, "skipped": len(patterns) - imported}
+
+    clusters = _read_json(os.path.join(learning_dir, "clusters.json"), [])
+    centroids_file = os.path.join(learning_dir, "centroids.npy")
+    imported = 0
+    if clusters and not store.load_patterns("clusters"):
+        centroids = np.load(centroids_file).astype(np.float32) if os.path.exists(centroids_file) else None
+        store.save_patterns("clusters", [
+            (position, p, centroids[position].tobytes() if centroids is not None and position < len(centroids) else None)
+            for position, p in enumerate(clusters)
+        ], [])
+        imported = len(clusters)
+    counts["clusters"] = {"imported": imported, "skipped": len(clusters) - imported}
+
+    skills = _read_json(os.path.join(learning_dir, "skills.json"), {})
+    imported = store.import_skills(skills)
+    counts["skills"] = {"imported": imported, "skipped": len(skills) - imported}
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Import JSON memory files into the SQLite store")
+    parser.add_argument("--data-dir", default="./data")
+    parser.add_argument("--db", default=None, help="database path (default: <data-dir>/nexus.db)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(args.data_dir, "nexus.db")
+    counts = migrate(args.data_dir, db_path, args.batch_size)
+    print(f"Imported into {db_path}: " + ", ".join(
+        f"{count['imported']} {name} ({count['skipped']} skipped)" for name, count in counts.items()
+    ))
+
+if __name__ == "__main__":
+    main()
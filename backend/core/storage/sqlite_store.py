@@ -0,0 +1,401 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import sqlite3
+import threading
+from ..memory.text_index import tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL,
+    user_message TEXT NOT NULL,
+    agent_response TEXT NOT NULL,
+    tools_used TEXT NOT NULL,
+    context TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS episodes_timestamp ON episodes(timestamp);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS episodes_fts USING fts5(
+    user_message, agent_response, content='episodes', content_rowid='seq'
+);
+CREATE TRIGGER IF NOT EXISTS episodes_ai AFTER INSERT ON episodes BEGIN
+    INSERT INTO episodes_fts(rowid, user_message, agent_response)
+    VALUES (new.seq, new.user_message, new.agent_response);
+END;
+CREATE TRIGGER IF NOT EXISTS episodes_ad AFTER DELETE ON episodes BEGIN
+    INSERT INTO episodes_fts(episodes_fts, rowid, user_message, agent_response)
+    VALUES ('delete', old.seq, old.user_message, old.agent_response);
+END;
+
+CREATE TABLE IF NOT EXISTS patterns (
+    mode TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    frequency INTEGER NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    centroid BLOB,
+    PRIMARY KEY (mode, position)
+);
+
+CREATE TABLE IF NOT EXISTS skills (
+    name TEXT PRIMARY KEY,
+    level INTEGER NOT NULL,
+    uses INTEGER NOT NULL,
+    success_rate REAL NOT NULL,
+    created TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    turns TEXT NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions(last_seen);
+
+CREATE TABLE IF NOT EXISTS generations (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+class SQLiteStore:
+    """Shared SQLite database for episodes, patterns and skills.
+
+    The database runs in WAL mode so readers never block the writer and
+    several processes can use the same file. Every write is one
+    ``BEGIN IMMEDIATE`` transaction; counters are updated in SQL
+    (``uses = uses + 1``) so concurrent writers cannot lose increments.
+    Connections are per thread.
+
+    Named generation counters let processes notice each other's changes:
+    a writer bumps a counter in the same transaction as the change, and a
+    reader whose last seen value differs reloads its in-memory copy.
+    """
+
+    def __init__(self, path: str = "./data/nexus.db", busy_timeout: float = 10.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly. Each
+            # connection is used by its own thread only, but close() may
+            # run on any thread.
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def generation(self, name: str) -> int:
+        return self._generation_in(self._conn(), name)
+
+    def bump_generation(self, name: str) -> int:
+        with self.transaction() as conn:
+            return self._bump(conn, name)
+
+    def _bump(self, conn: sqlite3.Connection, name: str) -> int:
+        conn.execute(
+            "INSERT INTO generations (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+        return conn.execute("SELECT value FROM generations WHERE name = ?", (name,)).fetchone()[0]
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    # Episodes
+
+    def _episode(self, row: sqlite3.Row) -> Dict:
+        return {
+            'id': row['id'],
+            'timestamp': row['timestamp'],
+            'user_message': row['user_message'],
+            'agent_response': row['agent_response'],
+            'tools_used': json.loads(row['tools_used']),
+            'context': json.loads(row['context'])
+        }
+
+    def add_episodes(self, interactions: List[Dict]) -> List[str]:
+        with self.transaction() as conn:
+            # Episodes are never deleted one by one and a seq is only used
+            # up by a row that was inserted, so the next seq is also the
+            # episode count and ids match the JSON store's numbering
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM episodes").fetchone()[0] + 1
+            ids = []
+            for interaction in interactions:
+                episode_id = interaction.get('id') or str(seq - 1)
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO episodes (seq, id, timestamp, user_message, agent_response, tools_used, context) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        seq,
+                        episode_id,
+                        interaction.get('timestamp') or datetime.utcnow().isoformat(),
+                        interaction.get('user_message', ''),
+                        interaction.get('agent_response', ''),
+                        json.dumps(interaction.get('tools_used', [])),
+                        json.dumps(interaction.get('context', {}))
+                    )
+                ).rowcount
+                # An episode whose id is already stored is skipped
+                seq += inserted
+                ids.append(episode_id)
+        return ids
+
+    def get_episode(self, episode_id: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM episodes WHERE id = ?", (episode_id,)).fetchone()
+        return self._episode(row) if row is not None else None
+
+    def recent_episodes(self, n: int) -> List[Dict]:
+        rows = self._conn().execute("SELECT * FROM episodes ORDER BY seq DESC LIMIT ?", (n,)).fetchall()
+        return [self._episode(row) for row in reversed(rows)]
+
+    def iter_episodes(self, batch_size: int = 1000) -> Iterator[List[Dict]]:
+        """Every episode in insertion order, ``batch_size`` at a time"""
+        last_seq = 0
+        while True:
+            rows = self._conn().execute(
+                "SELECT * FROM episodes WHERE seq > ? ORDER BY seq LIMIT ?", (last_seq, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            yield [self._episode(row) for row in rows]
+            last_seq = rows[-1]['seq']
+
+    def count_episodes(self) -> int:
+        return self._conn().execute("SELECT COALESCE(MAX(seq), 0) FROM episodes").fetchone()[0]
+
+    def search_episodes(self, query: str, start_time: Optional[str] = None, end_time: Optional[str] = None,
+                        limit: Optional[int] = None, offset: int = 0) -> Dict:
+        """FTS5 search ranked by bm25, same result shape as EpisodicMemory.search_episodes_page"""
+        filters, params = [], []
+        if start_time:
+            filters.append("e.timestamp >= ?")
+            params.append(start_time)
+        if end_time:
+            filters.append("e.timestamp <= ?")
+            params.append(end_time)
+
+        terms = self._fts_terms(query)
+        if terms:
+            source = "episodes_fts f JOIN episodes e ON e.seq = f.rowid"
+            filters.insert(0, "episodes_fts MATCH ?")
+            params.insert(0, terms)
+            score, order = "-bm25(episodes_fts)", "bm25(episodes_fts), e.seq DESC"
+        else:
+            source = "episodes e"
+            score, order = "0.0", "e.seq DESC"
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM {source} {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT e.*, {score} AS score FROM {source} {where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [limit if limit is not None else -1, offset]
+        ).fetchall()
+        return {
+            'total': total,
+            'results': [{'episode': self._episode(row), 'score': row['score']} for row in rows]
+        }
+
+    def _fts_terms(self, query: str) -> str:
+        # Quote each token so user input cannot inject FTS5 query syntax
+        return " OR ".join(f'"{token}"' for token in tokenize(query))
+
+    def clear_episodes(self):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM episodes")
+
+    # Patterns
+
+    def load_patterns(self, mode: str) -> List[Tuple[Dict, Optional[bytes]]]:
+        rows = self._conn().execute(
+            "SELECT * FROM patterns WHERE mode = ? ORDER BY position", (mode,)
+        ).fetchall()
+        return [
+            ({
+                'id': row['id'],
+                'keywords': json.loads(row['keywords']),
+                'frequency': row['frequency'],
+                'first_seen': row['first_seen'],
+                'last_seen': row['last_seen']
+            }, row['centroid'])
+            for row in rows
+        ]
+
+    def save_patterns(self, mode: str, new: Iterable[Tuple[int, Dict, Optional[bytes]]],
+                      bumps: Iterable[Tuple[int, int, str, Optional[bytes]]]) -> Dict:
+        """Append new patterns and apply frequency deltas in one transaction
+
+        ``new`` holds ``(position, pattern, centroid)`` and ``bumps`` holds
+        ``(position, delta, last_seen, centroid)``. New patterns go to the
+        next free positions; if another process got there first the pattern
+        lands elsewhere and the returned ``positions`` map says where.
+        Appending bumps the ``patterns:<mode>`` generation, and the result
+        carries the generation before and after the write together with the
+        stored frequency of every bumped pattern.
+        """
+        name = f"patterns:{mode}"
+        with self.transaction() as conn:
+            before = after = self._generation_in(conn, name)
+            positions = {}
+            next_position = conn.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM patterns WHERE mode = ?", (mode,)
+            ).fetchone()[0]
+            for position, p, centroid in new:
+                assigned = max(position, next_position)
+                # Ids carry the position ("pattern_3"); keep them in step
+                pattern_id = p['id'] if assigned == position else f"{p['id'].rsplit('_', 1)[0]}_{assigned}"
+                conn.execute(
+                    "INSERT OR IGNORE INTO patterns (mode, position, id, keywords, frequency, first_seen, last_seen, centroid) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (mode, assigned, pattern_id, json.dumps(p['keywords']), p['frequency'], p['first_seen'], p['last_seen'], centroid)
+                )
+                positions[position] = assigned
+                next_position = assigned + 1
+            if positions:
+                after = self._bump(conn, name)
+
+            bumps = list(bumps)
+            conn.executemany(
+                "UPDATE patterns SET frequency = frequency + ?, last_seen = MAX(last_seen, ?), "
+                "centroid = COALESCE(?, centroid) WHERE mode = ? AND position = ?",
+                [(delta, last_seen, centroid, mode, position) for position, delta, last_seen, centroid in bumps]
+            )
+            frequencies = {}
+            for position, _, _, _ in bumps:
+                row = conn.execute(
+                    "SELECT frequency FROM patterns WHERE mode = ? AND position = ?", (mode, position)
+                ).fetchone()
+                if row is not None:
+                    frequencies[position] = row[0]
+        return {'before': before, 'after': after, 'positions': positions, 'frequencies': frequencies}
+
+    def _generation_in(self, conn: sqlite3.Connection, name: str) -> int:
+        row = conn.execute("SELECT value FROM generations WHERE name = ?", (name,)).fetchone()
+        return row[0] if row is not None else 0
+
+    # Skills
+
+    def _skill(self, row: sqlite3.Row) -> Dict:
+        return {
+            'level': row['level'],
+            'uses': row['uses'],
+            'success_rate': row['success_rate'],
+            'created': row['created'],
+            'data': json.loads(row['data'])
+        }
+
+    def load_skills(self) -> Dict:
+        rows = self._conn().execute("SELECT * FROM skills ORDER BY rowid").fetchall()
+        return {row['name']: self._skill(row) for row in rows}
+
+    def record_skill_uses(self, usages: List[Tuple[str, Dict]]) -> Dict:
+        """Create or bump skills atomically; returns the updated rows"""
+        created = datetime.utcnow().isoformat()
+        with self.transaction() as conn:
+            for skill_name, skill_data in usages:
+                conn.execute(
+                    "INSERT INTO skills (name, level, uses, success_rate, created, data) VALUES (?, 1, 0, 0.0, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET uses = uses + 1, level = MIN(10, (uses + 1) / 10 + 1)",
+                    (skill_name, created, json.dumps(skill_data, default=str))
+                )
+            names = sorted({skill_name for skill_name, _ in usages})
+            rows = conn.execute(
+                f"SELECT * FROM skills WHERE name IN ({','.join('?' * len(names))})", names
+            ).fetchall() if names else []
+        return {row['name']: self._skill(row) for row in rows}
+
+    def update_skill_success(self, skill_name: str, success: bool) -> Optional[Dict]:
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE skills SET success_rate = (success_rate * uses + ?) / (uses + 1) WHERE name = ?",
+                (1.0 if success else 0.0, skill_name)
+            )
+            row = conn.execute("SELECT * FROM skills WHERE name = ?", (skill_name,)).fetchone()
+        return self._skill(row) if row is not None else None
+
+    def import_skills(self, skills: Dict) -> int:
+        """Insert skills not already present; returns how many were inserted"""
+        with self.transaction() as conn:
+            return conn.executemany(
+                "INSERT OR IGNORE INTO skills (name, level, uses, success_rate, created, data) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (name, s['level'], s['uses'], s['success_rate'], s['created'], json.dumps(s.get('data', {}), default=str))
+                    for name, s in skills.items()
+                ]
+            ).rowcount
+
+    # Sessions
+
+    def load_session(self, session_id: str, min_last_seen: float) -> List[Tuple[str, str]]:
+        row = self._conn().execute(
+            "SELECT turns FROM sessions WHERE id = ? AND last_seen >= ?", (session_id, min_last_seen)
+        ).fetchone()
+        return [tuple(turn) for turn in json.loads(row[0])] if row is not None else []
+
+    def append_session_turn(self, session_id: str, turn: Tuple[str, str], max_turns: int, now: float,
+                            min_last_seen: float) -> List[Tuple[str, str]]:
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT turns FROM sessions WHERE id = ? AND last_seen >= ?", (session_id, min_last_seen)
+            ).fetchone()
+            turns = (json.loads(row[0]) if row is not None else []) + [list(turn)]
+            turns = turns[-max_turns:]
+            conn.execute(
+                "INSERT INTO sessions (id, turns, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET turns = excluded.turns, last_seen = excluded.last_seen",
+                (session_id, json.dumps(turns), now)
+            )
+        return [tuple(t) for t in turns]
+
+    def delete_sessions_before(self, min_last_seen: float) -> int:
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM sessions WHERE last_seen < ?", (min_last_seen,)).rowcount
+
+    def delete_session(self, session_id: str):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def count_sessions(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def clear_sessions(self):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM sessions")
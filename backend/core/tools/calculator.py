@@ -0,0 +1,378 @@
+from typing import Any, Callable, Dict, Optional
+from functools import lru_cache, reduce
+import ast
+import math
+import operator
+import time
+import numpy as np
+
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau, "inf": math.inf, "nan": math.nan}
+
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+class CalculationError(ValueError):
+    """Raised for expressions the calculator rejects or cannot finish"""
+
+class _Context:
+    __slots__ = ("variables", "deadline")
+
+    def __init__(self, variables: Dict[str, Any], deadline: float):
+        self.variables = variables
+        self.deadline = deadline
+
+    def check(self):
+        if time.monotonic() > self.deadline:
+            raise CalculationError("calculation took too long")
+
+def _elementwise(scalar: Callable, vector: Callable) -> Callable:
+    """Use ``vector`` (NumPy) when any argument is an array, ``scalar`` (math) otherwise"""
+    def apply(*args):
+        if any(isinstance(arg, np.ndarray) for arg in args):
+            return vector(*args)
+        return scalar(*args)
+    return apply
+
+def _reduction(function: Callable) -> Callable:
+    # sum(xs) over one array, or sum(1, 2, 3) over the arguments
+    return lambda *args: function(args[0] if len(args) == 1 else np.asarray(args))
+
+def _extremum(builtin: Callable, reduce_array: Callable, pairwise: Callable) -> Callable:
+    def apply(*args):
+        if len(args) == 1 and isinstance(args[0], np.ndarray):
+            return reduce_array(args[0])
+        if any(isinstance(arg, np.ndarray) for arg in args):
+            return reduce(pairwise, args)
+        return builtin(*args)
+    return apply
+
+def _int_bound(value) -> Optional[int]:
+    """Largest magnitude in an int or integer array, None for anything else"""
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind not in "iu":
+            return None
+        return max(abs(int(value.max())), abs(int(value.min()))) if value.size else 0
+    if isinstance(value, int):
+        return abs(value)
+    return None
+
+def _to_float(*values):
+    # int64 arithmetic wraps around silently; float64 overflows to inf
+    return [value.astype(np.float64) if isinstance(value, np.ndarray) and value.dtype.kind in "iu" else value
+            for value in values]
+
+def _prod(x):
+    bound = _int_bound(x) if isinstance(x, np.ndarray) else None
+    if bound is not None and bound > 1 and x.size * math.log2(bound) >= 63:
+        x, = _to_float(x)
+    return np.prod(x)
+
+def _log(x, base=None):
+    if isinstance(x, np.ndarray):
+        return np.log(x) if base is None else np.log(x) / np.log(base)
+    return math.log(x) if base is None else math.log(x, base)
+
+def _round(x, digits=0):
+    return np.round(x, int(digits)) if isinstance(x, np.ndarray) else round(x, int(digits))
+
+class Calculator:
+    """Arithmetic and math-function expressions, compiled once and cached.
+
+    An expression is parsed with ``ast``, checked against a whitelist
+    (numbers, names, lists, arithmetic, comparisons and the functions in
+    ``functions``) and compiled into a tree of closures, kept in an LRU of
+    ``cache_size`` entries keyed by the expression text. Names resolve to
+    constants such as ``pi`` or to ``variables`` given per call; lists and
+    list-valued variables become NumPy arrays, so one expression evaluates
+    elementwise over whole arrays.
+
+    Limits keep a call bounded: integer results may not exceed
+    ``max_int_bits`` (``9**9**9`` is rejected up front; keep it under the
+    ~14,000 bits Python will still convert to a string), arrays hold at
+    most ``max_array_size`` elements (checked on the broadcast shape before
+    an operation on several arrays runs), expressions are capped at
+    ``max_length`` characters and ``max_nodes`` syntax nodes, and
+    evaluation stops after ``timeout`` seconds. Integer arrays switch to
+    float64 where a power or product could overflow int64.
+    """
+
+    def __init__(self, cache_size: int = 256, max_int_bits: int = 14000, max_array_size: int = 1000000,
+                 max_length: int = 2000, max_nodes: int = 500, timeout: float = 1.0, max_result_items: int = 1000):
+        self.max_int_bits = max_int_bits
+        self.max_array_size = max_array_size
+        self.max_length = max_length
+        self.max_nodes = max_nodes
+        self.timeout = timeout
+        self.max_result_items = max_result_items
+        self.functions: Dict[str, Callable] = {
+            "abs": _elementwise(abs, np.abs),
+            "sqrt": _elementwise(math.sqrt, np.sqrt),
+            "exp": _elementwise(math.exp, np.exp),
+            "log": _log,
+            "log10": _elementwise(math.log10, np.log10),
+            "log2": _elementwise(math.log2, np.log2),
+            "sin": _elementwise(math.sin, np.sin),
+            "cos": _elementwise(math.cos, np.cos),
+            "tan": _elementwise(math.tan, np.tan),
+            "asin": _elementwise(math.asin, np.arcsin),
+            "acos": _elementwise(math.acos, np.arccos),
+            "atan": _elementwise(math.atan, np.arctan),
+            "atan2": _elementwise(math.atan2, np.arctan2),
+            "sinh": _elementwise(math.sinh, np.sinh),
+            "cosh": _elementwise(math.cosh, np.cosh),
+            "tanh": _elementwise(math.tanh, np.tanh),
+            "degrees": _elementwise(math.degrees, np.degrees),
+            "radians": _elementwise(math.radians, np.radians),
+            "hypot": _elementwise(math.hypot, np.hypot),
+            "floor": _elementwise(math.floor, np.floor),
+            "ceil": _elementwise(math.ceil, np.ceil),
+            "round": _round,
+            "min": _extremum(min, np.min, np.minimum),
+            "max": _extremum(max, np.max, np.maximum),
+            "sum": _reduction(np.sum),
+            "mean": _reduction(np.mean),
+            "median": _reduction(np.median),
+            "std": _reduction(np.std),
+            "var": _reduction(np.var),
+            "prod": _reduction(_prod),
+            "dot": self._dot,
+            "len": len,
+            "gcd": math.gcd,
+            "factorial": self._factorial,
+            "comb": self._comb,
+            "perm": self._perm,
+            "arange": self._arange,
+            "linspace": self._linspace,
+        }
+        self._compile = lru_cache(maxsize=cache_size)(self._compile_uncached)
+
+    # Guarded operations
+
+    def _check_bits(self, bits: float):
+        if bits > self.max_int_bits:
+            raise CalculationError(f"result would exceed {self.max_int_bits} bits")
+
+    def _check_size(self, size: int):
+        if size > self.max_array_size:
+            raise CalculationError(f"arrays are limited to {self.max_array_size} elements")
+
+    def _check_broadcast(self, *values):
+        # One NumPy operation cannot be interrupted, so a result too large
+        # for the limit is rejected before it is computed
+        shapes = [value.shape for value in values if isinstance(value, np.ndarray)]
+        if len(shapes) > 1:
+            self._check_size(math.prod(np.broadcast_shapes(*shapes)))
+
+    def _dot(self, a, b):
+        if isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and a.ndim and b.ndim:
+            # a (..., n) . b (..., n, m) has shape a[:-1] + b[:-2] + (m,)
+            rest = b.shape[:-2] + b.shape[-1:] if b.ndim > 1 else ()
+            self._check_size(math.prod(a.shape[:-1] + rest))
+        else:
+            self._check_broadcast(a, b)
+        return np.dot(a, b)
+
+    def _pow(self, base, exponent):
+        if isinstance(base, int) and isinstance(exponent, int) and abs(base) > 1:
+            self._check_bits(abs(exponent) * math.log2(abs(base)))
+        if isinstance(base, np.ndarray) or isinstance(exponent, np.ndarray):
+            # Either operand may be the array, as in 2 ** arange(100)
+            base, exponent = _to_float(base, exponent)
+        return base ** exponent
+
+    def _mul(self, a, b):
+        if isinstance(a, int) and isinstance(b, int):
+            self._check_bits(a.bit_length() + b.bit_length())
+        elif isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+            bounds = _int_bound(a), _int_bound(b)
+            if None not in bounds and bounds[0] * bounds[1] > _INT64_MAX:
+                a, b = _to_float(a, b)
+        return a * b
+
+    def _factorial(self, n):
+        if n > 1:
+            self._check_bits(math.lgamma(n + 1) / math.log(2))
+        return math.factorial(n)
+
+    def _comb(self, n, k):
+        self._check_bits(n)
+        return math.comb(n, k)
+
+    def _perm(self, n, k=None):
+        k = n if k is None else k
+        self._check_bits(k * math.log2(max(n, 2)))
+        return math.perm(n, k)
+
+    def _arange(self, *args):
+        start, stop, step = (0, args[0], 1) if len(args) == 1 else (args[0], args[1], args[2] if len(args) > 2 else 1)
+        if step == 0:
+            raise CalculationError("arange step must not be zero")
+        self._check_size(max(math.ceil((stop - start) / step), 0))
+        return np.arange(*args)
+
+    def _linspace(self, start, stop, num=50):
+        self._check_size(int(num))
+        return np.linspace(start, stop, int(num))
+
+    def _array(self, values) -> np.ndarray:
+        array = np.asarray(values)
+        self._check_size(array.size)
+        if array.dtype == object:
+            raise CalculationError("arrays must be rectangular and numeric")
+        return array
+
+    # Compilation
+
+    _BINARY = {
+        ast.Add: operator.add, ast.Sub: operator.sub, ast.Div: operator.truediv,
+        ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod
+    }
+    _UNARY = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+    _COMPARE = {
+        ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+        ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne
+    }
+
+    def _compile_uncached(self, expression: str) -> Callable[[_Context], Any]:
+        if len(expression) > self.max_length:
+            raise CalculationError(f"expressions are limited to {self.max_length} characters")
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError as e:
+            raise CalculationError(f"invalid expression: {e.msg}")
+        if sum(1 for _ in ast.walk(tree)) > self.max_nodes:
+            raise CalculationError(f"expressions are limited to {self.max_nodes} syntax nodes")
+        return self._node(tree.body)
+
+    def _node(self, node: ast.AST) -> Callable[[_Context], Any]:
+        if isinstance(node, ast.Constant):
+            value = node.value
+            if isinstance(value, bool) or not isinstance(value, (int, float, complex)):
+                raise CalculationError(f"unsupported constant {value!r}")
+            if isinstance(value, int):
+                self._check_bits(value.bit_length())
+            return lambda ctx: value
+
+        if isinstance(node, ast.Name):
+            name = node.id
+            if name in CONSTANTS:
+                constant = CONSTANTS[name]
+                return lambda ctx: constant
+
+            def lookup(ctx: _Context):
+                if name not in ctx.variables:
+                    raise CalculationError(f"unknown name '{name}'")
+                return ctx.variables[name]
+            return lookup
+
+        if isinstance(node, (ast.List, ast.Tuple)):
+            self._check_size(len(node.elts))
+            elements = [self._node(element) for element in node.elts]
+            return lambda ctx: self._array([element(ctx) for element in elements])
+
+        if isinstance(node, ast.UnaryOp) and type(node.op) in self._UNARY:
+            op, operand = self._UNARY[type(node.op)], self._node(node.operand)
+            return lambda ctx: op(operand(ctx))
+
+        if isinstance(node, ast.BinOp):
+            if isinstance(node.op, ast.Pow):
+                op = self._pow
+            elif isinstance(node.op, ast.Mult):
+                op = self._mul
+            elif type(node.op) in self._BINARY:
+                op = self._BINARY[type(node.op)]
+            else:
+                raise CalculationError(f"unsupported operator {type(node.op).__name__}")
+            left, right = self._node(node.left), self._node(node.right)
+
+            def binary(ctx: _Context):
+                a, b = left(ctx), right(ctx)
+                ctx.check()
+                self._check_broadcast(a, b)
+                return op(a, b)
+            return binary
+
+        if isinstance(node, ast.Compare):
+            ops = []
+            for op in node.ops:
+                if type(op) not in self._COMPARE:
+                    raise CalculationError(f"unsupported comparison {type(op).__name__}")
+                ops.append(self._COMPARE[type(op)])
+            left, comparators = self._node(node.left), [self._node(c) for c in node.comparators]
+
+            def compare(ctx: _Context):
+                a = left(ctx)
+                result = True
+                for op, comparator in zip(ops, comparators):
+                    b = comparator(ctx)
+                    self._check_broadcast(result, a, b)
+                    result = result & op(a, b)
+                    a = b
+                return result
+            return compare
+
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in self.functions:
+                name = node.func.id if isinstance(node.func, ast.Name) else ast.dump(node.func)
+                raise CalculationError(f"unknown function '{name}'")
+            if node.keywords:
+                raise CalculationError("keyword arguments are not supported")
+            function, args = self.functions[node.func.id], [self._node(arg) for arg in node.args]
+            # dot checks its own result shape, which is not a broadcast
+            broadcasts = function is not self._dot
+
+            def call(ctx: _Context):
+                values = [arg(ctx) for arg in args]
+                ctx.check()
+                if broadcasts:
+                    self._check_broadcast(*values)
+                return function(*values)
+            return call
+
+        raise CalculationError(f"unsupported syntax: {type(node).__name__}")
+
+    # Evaluation
+
+    def _bind(self, variables: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        bound = {}
+        for name, value in (variables or {}).items():
+            if isinstance(value, (list, tuple)):
+                value = self._array(value)
+                if value.ndim != 1:
+                    raise CalculationError(f"variable '{name}' must be a number or a flat list of numbers")
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise CalculationError(f"variable '{name}' must be a number or a list of numbers")
+            bound[name] = value
+        return bound
+
+    def _result(self, value: Any) -> Dict:
+        if isinstance(value, np.ndarray):
+            response = {"success": True, "result": value.tolist(), "shape": list(value.shape)}
+            if value.size > self.max_result_items:
+                response["result"] = value.ravel()[:self.max_result_items].tolist()
+                response["truncated"] = True
+            return response
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, int) and not isinstance(value, bool):
+            # Bit checks bound single operations; sums can still add a bit
+            self._check_bits(value.bit_length())
+        if isinstance(value, complex):
+            value = str(value)
+        return {"success": True, "result": value}
+
+    def evaluate(self, expression: str, variables: Optional[Dict[str, Any]] = None) -> Dict:
+        try:
+            compiled = self._compile(expression)
+            context = _Context(self._bind(variables), time.monotonic() + self.timeout)
+            with np.errstate(all="ignore"):
+                return self._result(compiled(context))
+        except OverflowError:
+            return {"success": False, "error": "numeric result out of range"}
+        except MemoryError:
+            return {"success": False, "error": "calculation needs too much memory"}
+        except (CalculationError, ArithmeticError, TypeError, ValueError) as e:
+            return {"success": False, "error": str(e) or type(e).__name__}
+
+    def get_stats(self) -> Dict:
+        info = self._compile.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
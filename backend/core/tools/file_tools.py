@@ -0,0 +1,192 @@
+from typing import Dict, Optional, Tuple
+import mmap
+import os
+import re
+import tempfile
+
+# Lines are counted a block at a time when skipping ahead
+_SCAN_BLOCK = 1 << 20
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace")
+
+def _line_start(view, line: int) -> int:
+    """Byte offset where 1-based ``line`` starts, or the end of the data"""
+    pos, current = 0, 1
+    size = len(view)
+    while current < line and pos < size:
+        block = view[pos:pos + _SCAN_BLOCK]
+        newlines = block.count(b"\n")
+        if current + newlines < line:
+            current += newlines
+            pos += len(block)
+            continue
+        while current < line:
+            pos = view.find(b"\n", pos) + 1
+            current += 1
+        break
+    return min(pos, size)
+
+def _count_newlines(view, start: int, end: int) -> int:
+    # mmap has no count(); a block at a time keeps the copies small
+    newlines = 0
+    for pos in range(start, end, _SCAN_BLOCK):
+        newlines += view[pos:min(pos + _SCAN_BLOCK, end)].count(b"\n")
+    return newlines
+
+def _take(view, start: int, end: int, max_bytes: int) -> Tuple[str, int, bool]:
+    """Decode ``view[start:end]`` up to ``max_bytes``; returns (text, end, truncated)"""
+    stop = min(end, start + max_bytes)
+    return _decode(view[start:stop]), stop, stop < end
+
+def _read_lines(view, start_line: int, end_line: Optional[int], max_bytes: int) -> Dict:
+    start = _line_start(view, start_line)
+    if end_line is None:
+        end = len(view)
+    else:
+        end = start
+        for _ in range(end_line - start_line + 1):
+            newline = view.find(b"\n", end)
+            if newline < 0 or newline - start >= max_bytes:
+                end = len(view) if newline < 0 else newline + 1
+                break
+            end = newline + 1
+    content, stop, truncated = _take(view, start, end, max_bytes)
+    return {"content": content, "start_line": start_line, "offset": start, "bytes_read": stop - start,
+            "truncated": truncated}
+
+def _read_tail(view, lines: int, max_bytes: int) -> Dict:
+    size = len(view)
+    # A trailing newline ends the last line rather than starting a new one
+    pos = size - 1 if view[size - 1:size] == b"\n" else size
+    start = size if lines <= 0 else pos
+    for _ in range(lines):
+        newline = view.rfind(b"\n", 0, pos)
+        if newline < 0:
+            start = 0
+            break
+        pos, start = newline, newline + 1
+        if size - start >= max_bytes:
+            break
+    truncated = size - start > max_bytes
+    start = max(start, size - max_bytes)
+    return {"content": _decode(view[start:size]), "offset": start, "bytes_read": size - start, "truncated": truncated}
+
+def _grep(view, pattern: str, ignore_case: bool, max_matches: int, max_bytes: int) -> Dict:
+    # ^ and $ anchor at every line, as in grep
+    regex = re.compile(pattern.encode("utf-8"), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+    lines, used, matches = [], 0, 0
+    pos, line_number, counted_to = 0, 1, 0
+    size = len(view)
+    truncated = False
+    while pos < size:
+        match = regex.search(view, pos)
+        if match is None:
+            break
+        if match.start() == size and view[size - 1:size] == b"\n":
+            # The empty position after a trailing newline is not a line
+            break
+        line_start = view.rfind(b"\n", 0, match.start()) + 1
+        line_end = view.find(b"\n", match.end())
+        line_end = size if line_end < 0 else line_end
+        line_number += _count_newlines(view, counted_to, line_start)
+        counted_to = line_start
+        text = f"{line_number}:{_decode(view[line_start:min(line_end, line_start + max_bytes)])}\n"
+        matches += 1
+        if matches > max_matches or used + len(text) > max_bytes:
+            truncated = True
+            break
+        lines.append(text)
+        used += len(text)
+        pos = line_end + 1
+    return {"content": "".join(lines), "matches": len(lines), "truncated": truncated}
+
+def read_file(path: str, offset: int = 0, length: Optional[int] = None, start_line: Optional[int] = None,
+              end_line: Optional[int] = None, head: Optional[int] = None, tail: Optional[int] = None,
+              pattern: Optional[str] = None, ignore_case: bool = False, max_matches: int = 200,
+              max_bytes: int = 65536) -> Dict:
+    """Read part of a file without loading the rest of it.
+
+    One selection applies, in this order: ``pattern`` (matching lines,
+    prefixed with their line numbers), ``tail`` or ``head`` (last or first
+    N lines), ``start_line``/``end_line`` (1-based, inclusive) or the byte
+    range ``offset``/``length``. Regular files are memory-mapped, so only the
+    pages touched are read. The returned ``content`` never exceeds
+    ``max_bytes``; ``truncated`` says whether more was selected.
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            if size == 0:
+                # Empty, or a special file whose size is unknown: plain bounded read
+                view = f.read(max_bytes + 1)
+                mapped = None
+            else:
+                mapped = view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                if pattern is not None:
+                    result = _grep(view, pattern, ignore_case, max_matches, max_bytes)
+                elif tail is not None:
+                    result = _read_tail(view, tail, max_bytes)
+                elif head is not None:
+                    result = _read_lines(view, 1, head, max_bytes)
+                elif start_line is not None or end_line is not None:
+                    result = _read_lines(view, start_line or 1, end_line, max_bytes)
+                else:
+                    end = len(view) if length is None else min(len(view), offset + length)
+                    content, stop, truncated = _take(view, offset, end, max_bytes)
+                    result = {"content": content, "offset": offset, "bytes_read": max(stop - offset, 0),
+                              "truncated": truncated}
+            finally:
+                if mapped is not None:
+                    mapped.close()
+        return {"success": True, "size": size, **result}
+    except re.error as e:
+        return {"success": False, "error": f"invalid pattern: {e}"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def write_file(path: str, content: str, mode: str = "overwrite", offset: Optional[int] = None,
+               chunk_size: int = 1 << 20) -> Dict:
+    """Write ``content`` to ``path``.
+
+    ``mode`` is "overwrite" (the default: written to a temporary file and
+    renamed into place, so readers never see a partial file) or "append",
+    which lets a large file be written over several calls. With ``offset``
+    the bytes at that position are replaced in place. Text is encoded and
+    written ``chunk_size`` characters at a time.
+    """
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        def write_chunks(f) -> int:
+            written = 0
+            for start in range(0, len(content), chunk_size):
+                written += f.write(content[start:start + chunk_size].encode("utf-8"))
+            return written
+
+        if offset is not None:
+            with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+                f.seek(offset)
+                written = write_chunks(f)
+        elif mode == "append":
+            with open(path, 'ab') as f:
+                written = write_chunks(f)
+        elif mode == "overwrite":
+            fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=".tmp-")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    written = write_chunks(f)
+                # mkstemp creates files 0600; keep the mode of the file being replaced
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o7777 if os.path.exists(path) else 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        else:
+            return {"success": False, "error": f"unknown mode '{mode}'; use 'overwrite' or 'append'"}
+        return {"success": True, "path": path, "bytes_written": written, "size": os.path.getsize(path)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
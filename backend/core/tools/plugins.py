@@ -0,0 +1,151 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from importlib import metadata
+from types import ModuleType
+import glob
+import hashlib
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Packages expose tool manifests under this entry point group
+ENTRY_POINT_GROUP = "nexus.tools"
+
+# register_tool arguments a manifest may give for each tool
+SPEC_KEYS = {"name", "description", "parameters", "function", "timeout", "max_concurrency", "pure", "ttl",
+             "invalidated_by"}
+
+# Serializes loading plugin files, so each runs once however many tools name it
+_load_lock = threading.Lock()
+
+def load_file_module(path: str) -> ModuleType:
+    """Import a plugin ``.py`` file once per resolved path.
+
+    The module is registered in ``sys.modules`` under a name derived from
+    its path, so every tool naming the file shares one module and its state.
+    """
+    path = os.path.realpath(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = f"nexus_plugin_{stem}_{hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]}"
+    with _load_lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        spec = importlib.util.spec_from_file_location(name, path)
+        if spec is None or spec.loader is None:
+            raise ImportError(f"cannot load plugin module {path}")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[name]
+            raise
+        return module
+
+class LazyFunction:
+    """A tool function imported the first time it is called.
+
+    ``target`` is ``"package.module:attribute"`` or, relative to
+    ``base_dir``, ``"file.py:attribute"``. Until the tool is used only its
+    manifest entry has been read, so a large catalog costs nothing to load.
+    """
+
+    def __init__(self, target: str, base_dir: Optional[str] = None):
+        module, _, attribute = target.partition(":")
+        if not module or not attribute:
+            raise ValueError(f"function must look like 'module:attribute', got {target!r}")
+        self.target = target
+        self.base_dir = base_dir
+        self._function: Optional[Callable] = None
+        self._lock = threading.Lock()
+
+    def resolve(self) -> Callable:
+        if self._function is None:
+            with self._lock:
+                if self._function is None:
+                    self._function = self._import()
+        return self._function
+
+    def _import(self) -> Callable:
+        module_name, _, attribute = self.target.partition(":")
+        if module_name.endswith(".py"):
+            module = load_file_module(os.path.join(self.base_dir or ".", module_name))
+        else:
+            module = importlib.import_module(module_name)
+        function = module
+        for part in attribute.split("."):
+            function = getattr(function, part)
+        if not callable(function):
+            raise TypeError(f"{self.target} is not callable")
+        return function
+
+    def __call__(self, **parameters) -> Any:
+        return self.resolve()(**parameters)
+
+    def __repr__(self) -> str:
+        return f"LazyFunction({self.target!r})"
+
+def read_manifest(manifest: Any, base_dir: Optional[str] = None) -> List[Dict]:
+    """Tool specs from a manifest: ``{"tools": [...]}`` or a bare list.
+
+    Each spec holds ``register_tool`` arguments. ``function`` is a callable
+    or an import target string, which becomes a ``LazyFunction``.
+    """
+    tools = manifest.get("tools") if isinstance(manifest, dict) else manifest
+    if not isinstance(tools, list):
+        raise ValueError("a manifest must be a list of tools or an object with a 'tools' list")
+    specs = []
+    for spec in tools:
+        if not isinstance(spec, dict) or not {"name", "description", "parameters", "function"} <= set(spec):
+            raise ValueError("each tool needs name, description, parameters and function")
+        if not isinstance(spec["name"], str) or not spec["name"]:
+            raise ValueError(f"tool name must be a non-empty string, got {spec['name']!r}")
+        unknown = set(spec) - SPEC_KEYS
+        if unknown:
+            raise ValueError(f"tool {spec['name']!r} has unknown keys: {', '.join(sorted(unknown))}")
+        spec = dict(spec)
+        if isinstance(spec["function"], str):
+            spec["function"] = LazyFunction(spec["function"], base_dir)
+        specs.append(spec)
+    return specs
+
+def discover_directory(directory: str) -> Dict[str, List[Dict]]:
+    """Tool specs from every ``*.json`` manifest in ``directory``, keyed by file"""
+    found = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                found[path] = read_manifest(json.load(f), os.path.dirname(path))
+        except Exception:
+            logger.exception("skipping tool manifest %s", path)
+    return found
+
+def discover_entry_points(group: str = ENTRY_POINT_GROUP) -> Dict[str, List[Dict]]:
+    """Tool specs from installed packages' ``group`` entry points, keyed by entry point.
+
+    An entry point names a manifest object (``package.tools:MANIFEST``);
+    loading it should import nothing heavy, since tool functions given as
+    strings are only imported when called.
+    """
+    found = {}
+    for entry_point in metadata.entry_points(group=group):
+        try:
+            found[entry_point.value] = read_manifest(entry_point.load())
+        except Exception:
+            logger.exception("skipping tool entry point %s", entry_point.value)
+    return found
+
+def discover_plugins(directories: Iterable[str] = (), entry_points: bool = True) -> Dict[str, List[Dict]]:
+    """Tool specs from manifest directories and, optionally, installed entry points"""
+    found = {}
+    for directory in directories:
+        found.update(discover_directory(directory))
+    if entry_points:
+        found.update(discover_entry_points())
+    return found
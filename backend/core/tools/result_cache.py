@@ -0,0 +1,135 @@
+from typing import Any, Dict, Optional, Set, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+
+def canonical_input(parameters: Dict) -> Optional[str]:
+    """Stable JSON for ``parameters``, or None if they are not JSON-serializable"""
+    try:
+        return json.dumps(parameters, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+
+def input_key(parameters: Dict, max_bytes: Optional[int] = None) -> Optional[str]:
+    """SHA-256 of the canonical input, or None if it is not JSON or longer than ``max_bytes``"""
+    canonical = canonical_input(parameters)
+    if canonical is None:
+        return None
+    encoded = canonical.encode("utf-8")
+    if max_bytes is not None and len(encoded) > max_bytes:
+        return None
+    return hashlib.sha256(encoded).hexdigest()
+
+def result_size(result: Any) -> Optional[int]:
+    """Approximate bytes a cached result holds, measured as its JSON; None if it cannot be serialized"""
+    try:
+        return len(json.dumps(result, separators=(",", ":"), default=str))
+    except (ValueError, RecursionError):
+        # Circular, or an int too long for str()
+        return None
+
+class ToolResultCache:
+    """LRU of tool results keyed by tool name and input key (see ``input_key``).
+
+    The cache holds at most ``max_entries`` results and ``max_bytes`` of
+    them, sized by ``result_size``; a result larger than
+    ``max_entry_bytes``, or one that cannot be sized, is not cached at all. Entries optionally expire
+    after a per-entry ``ttl``. ``invalidate`` drops every entry of one tool,
+    using a per-tool key set so it never scans the whole cache. Cached
+    results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 64 << 20, max_entry_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 16
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._keys_by_tool: Dict[str, Set[Tuple[str, str]]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _tool_stats(self, tool: str) -> Dict[str, int]:
+        stats = self._stats.get(tool)
+        if stats is None:
+            stats = self._stats[tool] = {"hits": 0, "misses": 0, "stores": 0, "too_large": 0, "unsizable": 0,
+                                         "expirations": 0, "evictions": 0, "invalidations": 0}
+        return stats
+
+    def _drop(self, key: Tuple[str, str]):
+        self._bytes -= self._entries.pop(key)[2]
+        keys = self._keys_by_tool[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_tool[key[0]]
+
+    def get(self, tool: str, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            stats = self._tool_stats(tool)
+            entry = self._entries.get((tool, key))
+            if entry is not None and entry[1] is not None and time.monotonic() > entry[1]:
+                self._drop((tool, key))
+                stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end((tool, key))
+            stats["hits"] += 1
+            return True, entry[0]
+
+    def put(self, tool: str, key: str, result: Any, ttl: Optional[float] = None) -> bool:
+        """Cache ``result``; returns False if it is too large to keep or cannot be sized"""
+        # Measured outside the lock; results are read-only once produced
+        size = result_size(result)
+        with self._lock:
+            if size is None:
+                self._tool_stats(tool)["unsizable"] += 1
+                return False
+            size += len(key)
+            if size > self.max_entry_bytes:
+                self._tool_stats(tool)["too_large"] += 1
+                return False
+            if (tool, key) in self._entries:
+                self._drop((tool, key))
+            self._entries[(tool, key)] = (result, time.monotonic() + ttl if ttl else None, size)
+            self._bytes += size
+            self._keys_by_tool.setdefault(tool, set()).add((tool, key))
+            self._tool_stats(tool)["stores"] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._tool_stats(oldest[0])["evictions"] += 1
+            return True
+
+    def invalidate(self, tool: str):
+        with self._lock:
+            keys = self._keys_by_tool.get(tool)
+            if not keys:
+                return
+            self._tool_stats(tool)["invalidations"] += len(keys)
+            for key in list(keys):
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tool.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            hits = sum(stats["hits"] for stats in self._stats.values())
+            misses = sum(stats["misses"] for stats in self._stats.values())
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "tools": {tool: dict(stats) for tool, stats in self._stats.items()}
+            }
@@ -0,0 +1,355 @@
+from typing import Dict, Optional, Tuple
+import builtins
+import contextlib
+import io
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import types
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, only the wall-clock timeout applies
+    resource = None
+
+# Imported once per worker so snippets using them start warm
+DEFAULT_PRELOAD = ("math", "json", "re", "random", "statistics", "itertools", "collections", "datetime", "numpy")
+
+# Py_TPFLAGS_IMMUTABLETYPE: C types whose attributes cannot be reassigned
+_IMMUTABLE_TYPE = 1 << 8
+_MISSING = object()
+
+class _BoundedWriter(io.TextIOBase):
+    """Text sink that keeps the first ``limit`` characters and drops the rest"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.truncated = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        room = self.limit - self.size
+        if len(text) > room:
+            self.truncated = True
+            text = text[:max(room, 0)]
+        if text:
+            self.parts.append(text)
+            self.size += len(text)
+        return len(text)
+
+    def getvalue(self) -> str:
+        return "".join(self.parts)
+
+def _bounded(text: str, limit: int) -> Tuple[str, bool]:
+    return (text, False) if len(text) <= limit else (text[:limit], True)
+
+def _apply_limits(memory_mb: int, file_mb: int):
+    if resource is None:
+        return
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if file_mb:
+        limit = file_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_FSIZE, (limit, limit))
+
+def _set_cpu_budget(cpu_seconds: float):
+    # RLIMIT_CPU counts the process lifetime, so each job gets used + budget
+    if resource is None or not cpu_seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+def _run_code(code: str, max_output: int) -> Dict:
+    stdout, stderr = _BoundedWriter(max_output), _BoundedWriter(max_output)
+    # A copy, so rebinding a builtin only affects this snippet
+    namespace = {"__name__": "__sandbox__", "__builtins__": dict(vars(builtins))}
+    started = time.perf_counter()
+    error = None
+    try:
+        compiled = compile(code, "<code>", "exec")
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            exec(compiled, namespace)
+    except BaseException as e:
+        # SystemExit and friends end the snippet, not the worker
+        error = f"{type(e).__name__}: {e}"
+        stderr.write(traceback.format_exc())
+
+    variables = {
+        name: value for name, value in namespace.items()
+        if not name.startswith("__") and not isinstance(value, types.ModuleType)
+    }
+    try:
+        result, result_truncated = _bounded(str(variables), max_output)
+    except Exception as e:
+        result, result_truncated = f"<unprintable result: {e}>", False
+    response = {
+        "success": error is None,
+        "result": result,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "truncated": result_truncated or stdout.truncated or stderr.truncated,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+    if error is not None:
+        response["error"] = error
+    return response
+
+def _snapshot() -> Dict:
+    """Record the worker state a snippet could change: module and class attributes, env, cwd, sys.path"""
+    namespaces = []
+    for module in list(sys.modules.values()):
+        try:
+            namespace = vars(module)
+        except TypeError:
+            continue
+        namespaces.append((module, dict(namespace)))
+        for value in list(namespace.values()):
+            if (isinstance(value, type) and not value.__flags__ & _IMMUTABLE_TYPE
+                    and getattr(value, "__module__", None) == getattr(module, "__name__", _MISSING)):
+                namespaces.append((value, dict(vars(value))))
+    return {"modules": set(sys.modules), "namespaces": namespaces, "environ": dict(os.environ),
+            "cwd": os.getcwd(), "path": list(sys.path)}
+
+def _restore(snapshot: Dict) -> bool:
+    """Undo a snippet's changes to the worker; returns False if they cannot all be undone"""
+    for owner, saved in snapshot["namespaces"]:
+        current = vars(owner)
+        if len(current) == len(saved) and all(current.get(name, _MISSING) is value for name, value in saved.items()):
+            continue
+        for name in [name for name in current if name not in saved]:
+            with contextlib.suppress(AttributeError, TypeError):
+                delattr(owner, name)
+        for name, value in saved.items():
+            if current.get(name, _MISSING) is not value:
+                with contextlib.suppress(AttributeError, TypeError):
+                    setattr(owner, name, value)
+    if sys.path != snapshot["path"]:
+        sys.path[:] = snapshot["path"]
+    if dict(os.environ) != snapshot["environ"]:
+        os.environ.clear()
+        os.environ.update(snapshot["environ"])
+    try:
+        os.chdir(snapshot["cwd"])
+        for entry in os.scandir(snapshot["cwd"]):
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+    except OSError:
+        return False
+    # A module the snippet imported may hold its changes, and imports cannot be undone
+    return set(sys.modules) <= snapshot["modules"]
+
+def _worker_main(conn, memory_mb: int, file_mb: int, cpu_seconds: float, preload: Tuple[str, ...]):
+    # Snippets run single-threaded in a scratch directory
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = "1"
+    os.chdir(tempfile.mkdtemp(prefix="sandbox-"))
+    for module in preload:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+    # Load what a failing snippet's traceback needs before taking the snapshot
+    _run_code("raise ValueError", 1)
+    _run_code("(", 1)
+    snapshot = _snapshot()
+    _apply_limits(memory_mb, file_mb)
+    conn.send("ready")
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        code, max_output = job
+        _set_cpu_budget(cpu_seconds)
+        response = _run_code(code, max_output)
+        clean = _restore(snapshot)
+        if not clean:
+            response["recycle"] = True
+        conn.send(response)
+        if not clean:
+            return
+
+class _Worker:
+    __slots__ = ("process", "conn", "jobs", "ready")
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.jobs = 0
+        self.ready = False
+
+class SandboxPool:
+    """Pre-started worker processes that run untrusted Python snippets.
+
+    Each worker applies address-space and file-size rlimits once, imports
+    ``preload`` so common modules are warm, and then runs one snippet at a
+    time in a fresh namespace, with its own copy of the builtins and with
+    stdout and stderr captured, every output capped at ``max_output``
+    characters. After each snippet the worker puts back module and class
+    attributes, ``os.environ``, ``sys.path`` and the working directory and
+    empties its scratch directory, so nothing carries over to the next
+    job; a snippet that imported a module the worker had not loaded is
+    followed by a fresh worker instead. Snippets get ``cpu_seconds`` of CPU
+    (RLIMIT_CPU) and ``timeout`` seconds of wall-clock time; a worker that
+    overruns, crashes or hits a limit is killed and replaced, and workers
+    are recycled after ``max_jobs`` snippets. ``run`` blocks the calling
+    thread only, so the registry's thread pool spreads snippets across
+    cores while the event loop keeps serving chats.
+
+    Workers are started from a forkserver (spawn where unavailable), never
+    forked from the server process and its threads.
+    """
+
+    def __init__(self, workers: int = 2, timeout: float = 10.0, cpu_seconds: Optional[float] = None,
+                 memory_mb: int = 512, file_mb: int = 16, max_output: int = 65536, max_jobs: int = 200,
+                 preload: Tuple[str, ...] = DEFAULT_PRELOAD):
+        self.workers = workers
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds or timeout
+        self.memory_mb = memory_mb
+        self.file_mb = file_mb
+        self.max_output = max_output
+        self.max_jobs = max_jobs
+        self.preload = tuple(preload)
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {"runs": 0, "failures": 0, "timeouts": 0, "crashes": 0, "started": 0, "recycled": 0}
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.memory_mb, self.file_mb, self.cpu_seconds, self.preload),
+            name="sandbox",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        with self._lock:
+            self._stats["started"] += 1
+        return _Worker(process, parent_conn)
+
+    def _discard(self, worker: _Worker, kill: bool):
+        if kill:
+            worker.process.kill()
+        else:
+            with contextlib.suppress(OSError):
+                worker.conn.send(None)
+        worker.process.join(timeout=1.0)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+        worker.conn.close()
+
+    def _release(self, worker: Optional[_Worker]):
+        """Return ``worker`` to the pool, or a fresh one in place of a discarded worker"""
+        with self._lock:
+            closed = self._closed
+        if closed:
+            if worker is not None:
+                self._discard(worker, kill=False)
+            return
+        self._idle.put(worker if worker is not None else self._spawn())
+
+    def _wait_ready(self, worker: _Worker, deadline: float) -> bool:
+        # The first message from a new worker says it finished warming up
+        if worker.ready:
+            return True
+        if worker.conn.poll(max(deadline - time.monotonic(), 0)) and worker.conn.recv() == "ready":
+            worker.ready = True
+        return worker.ready
+
+    def run(self, code: str, timeout: Optional[float] = None) -> Dict:
+        timeout = timeout or self.timeout
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("sandbox pool is closed")
+        worker = self._idle.get()
+        outcome = "ok"
+        try:
+            if not self._wait_ready(worker, time.monotonic() + 60.0):
+                outcome = "crash"
+            else:
+                deadline = time.monotonic() + timeout
+                worker.conn.send((code, self.max_output))
+                if worker.conn.poll(max(deadline - time.monotonic(), 0)):
+                    result = worker.conn.recv()
+                else:
+                    outcome = "timeout"
+        except (EOFError, OSError):
+            outcome = "crash"
+
+        with self._lock:
+            self._stats["runs"] += 1
+            if outcome != "ok":
+                self._stats["failures"] += 1
+                self._stats["timeouts" if outcome == "timeout" else "crashes"] += 1
+
+        if outcome != "ok":
+            self._discard(worker, kill=True)
+            self._release(None)
+            if outcome == "timeout":
+                return {"success": False, "error": f"Execution timed out after {timeout}s"}
+            # Negative exit codes are signals, e.g. SIGXCPU from the CPU limit
+            exitcode = worker.process.exitcode
+            status = f"code {exitcode}"
+            if exitcode is not None and exitcode < 0:
+                try:
+                    status = signal.Signals(-exitcode).name
+                except ValueError:
+                    status = f"signal {-exitcode}"
+            return {"success": False, "error": f"Sandbox worker exited ({status}); "
+                                               f"the snippet may have exceeded its CPU or memory limit"}
+
+        worker.jobs += 1
+        if result.pop("recycle", False) or worker.jobs >= self.max_jobs:
+            self._discard(worker, kill=False)
+            with self._lock:
+                self._stats["recycled"] += 1
+            self._release(None)
+        else:
+            self._release(worker)
+        if not result["success"]:
+            with self._lock:
+                self._stats["failures"] += 1
+        return result
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, "workers": self.workers, "idle": self._idle.qsize()}
+
+    def close(self):
+        """Stop idle workers; busy ones are stopped as they finish"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(worker, kill=False)
@@ -0,0 +1,251 @@
+from typing import Any, Callable, Dict, List, Optional
+import math
+import re
+
+# Keywords that only describe a value and are never checked
+ANNOTATIONS = {"description", "title", "default", "examples", "format", "$schema", "$comment", "deprecated",
+               "readOnly", "writeOnly"}
+
+_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    # JSON has one number type, so 2.0 is an integer
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool))
+                         or (isinstance(v, float) and v.is_integer()),
+}
+
+# A check returns an error message for the value at ``path``, or None
+Check = Callable[[Any, str], Optional[str]]
+
+class SchemaError(ValueError):
+    """Raised for a tool input schema that is malformed or uses unsupported keywords"""
+
+def _child(path: str, key: Any) -> str:
+    return f"{path}[{key}]" if isinstance(key, int) else f"{path}.{key}" if path else str(key)
+
+def _where(path: str) -> str:
+    return path or "input"
+
+def _same(value: Any, option: Any) -> bool:
+    # 1 == 1.0 in JSON, but 1 == True only in Python
+    if _TYPES["number"](value) and _TYPES["number"](option):
+        return value == option
+    return type(value) is type(option) and value == option
+
+def _length_rule(low: int, high: float, unit: str) -> str:
+    if high == math.inf:
+        return f"at least {low} {unit}"
+    return f"at most {high} {unit}" if low == 0 else f"between {low} and {high} {unit}"
+
+def _number(schema: Dict, keyword: str) -> float:
+    value = schema[keyword]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or math.isnan(value):
+        raise SchemaError(f"'{keyword}' must be a number")
+    return value
+
+def _count(schema: Dict, keyword: str) -> int:
+    value = schema[keyword]
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise SchemaError(f"'{keyword}' must be a non-negative integer")
+    return value
+
+def _type_check(schema: Dict) -> Check:
+    names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+    for name in names:
+        if name not in _TYPES:
+            raise SchemaError(f"unknown type {name!r}")
+    tests = [_TYPES[name] for name in names]
+    expected = " or ".join(names)
+
+    def check(value, path):
+        if not any(test(value) for test in tests):
+            return f"{_where(path)} must be {expected}"
+    return check
+
+def _object_checks(schema: Dict) -> List[Check]:
+    checks = []
+    properties = schema.get("properties", {})
+    if not isinstance(properties, dict):
+        raise SchemaError("'properties' must be an object")
+    compiled = {name: _compile(subschema) for name, subschema in properties.items()}
+    required = schema.get("required", [])
+    if not isinstance(required, list) or not all(isinstance(name, str) for name in required):
+        raise SchemaError("'required' must be a list of property names")
+    extra = schema.get("additionalProperties", True)
+    extra_check = None if isinstance(extra, bool) else _compile(extra)
+
+    if required:
+        def check_required(value, path):
+            if isinstance(value, dict):
+                for name in required:
+                    if name not in value:
+                        return f"{_where(path)} is missing required property '{name}'"
+        checks.append(check_required)
+
+    if compiled or extra is not True:
+        def check_properties(value, path):
+            if not isinstance(value, dict):
+                return None
+            for name, item in value.items():
+                check = compiled.get(name, extra_check)
+                if check is not None:
+                    error = check(item, _child(path, name))
+                    if error:
+                        return error
+                elif extra is False:
+                    return f"{_where(path)} has unexpected property '{name}'"
+        checks.append(check_properties)
+    return checks
+
+def _array_checks(schema: Dict) -> List[Check]:
+    checks = []
+    if "items" in schema:
+        item_check = _compile(schema["items"])
+
+        def check_items(value, path):
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    error = item_check(item, _child(path, index))
+                    if error:
+                        return error
+        checks.append(check_items)
+    if "minItems" in schema or "maxItems" in schema:
+        low = _count(schema, "minItems") if "minItems" in schema else 0
+        high = _count(schema, "maxItems") if "maxItems" in schema else math.inf
+        rule = _length_rule(low, high, "items")
+
+        def check_length(value, path):
+            if isinstance(value, list) and not low <= len(value) <= high:
+                return f"{_where(path)} must have {rule}"
+        checks.append(check_length)
+    return checks
+
+def _string_checks(schema: Dict) -> List[Check]:
+    checks = []
+    if "minLength" in schema or "maxLength" in schema:
+        low = _count(schema, "minLength") if "minLength" in schema else 0
+        high = _count(schema, "maxLength") if "maxLength" in schema else math.inf
+        rule = _length_rule(low, high, "characters")
+
+        def check_length(value, path):
+            if isinstance(value, str) and not low <= len(value) <= high:
+                return f"{_where(path)} must be {rule}"
+        checks.append(check_length)
+    if "pattern" in schema:
+        try:
+            regex = re.compile(schema["pattern"])
+        except (re.error, TypeError) as e:
+            raise SchemaError(f"invalid pattern {schema['pattern']!r}: {e}")
+
+        def check_pattern(value, path):
+            if isinstance(value, str) and not regex.search(value):
+                return f"{_where(path)} does not match {regex.pattern!r}"
+        checks.append(check_pattern)
+    return checks
+
+_BOUNDS = {
+    "minimum": (lambda v, b: v >= b, ">="),
+    "maximum": (lambda v, b: v <= b, "<="),
+    "exclusiveMinimum": (lambda v, b: v > b, ">"),
+    "exclusiveMaximum": (lambda v, b: v < b, "<"),
+}
+
+def _number_checks(schema: Dict) -> List[Check]:
+    checks = []
+    for keyword, (test, symbol) in _BOUNDS.items():
+        if keyword not in schema:
+            continue
+        bound = _number(schema, keyword)
+
+        def check_bound(value, path, test=test, symbol=symbol, bound=bound):
+            if _TYPES["number"](value) and not test(value, bound):
+                return f"{_where(path)} must be {symbol} {bound}"
+        checks.append(check_bound)
+    return checks
+
+def _combinator_checks(schema: Dict) -> List[Check]:
+    checks = []
+    for keyword in ("anyOf", "oneOf", "allOf"):
+        if keyword not in schema:
+            continue
+        options = schema[keyword]
+        if not isinstance(options, list) or not options:
+            raise SchemaError(f"'{keyword}' must be a non-empty list of schemas")
+        compiled = [_compile(option) for option in options]
+
+        if keyword == "allOf":
+            def check_all(value, path, compiled=compiled):
+                for check in compiled:
+                    error = check(value, path)
+                    if error:
+                        return error
+            checks.append(check_all)
+        else:
+            def check_some(value, path, compiled=compiled, exactly_one=keyword == "oneOf"):
+                matched = sum(1 for check in compiled if check(value, path) is None)
+                if matched == 0 or (exactly_one and matched > 1):
+                    quantity = "exactly one" if exactly_one else "at least one"
+                    return f"{_where(path)} must match {quantity} of the allowed schemas"
+            checks.append(check_some)
+    return checks
+
+_KEYWORDS = {
+    "type", "enum", "const", "properties", "required", "additionalProperties", "items", "minItems", "maxItems",
+    "minLength", "maxLength", "pattern", "anyOf", "oneOf", "allOf", *_BOUNDS
+} | ANNOTATIONS
+
+def _compile(schema: Any) -> Check:
+    if schema is True or schema == {}:
+        return lambda value, path: None
+    if not isinstance(schema, dict):
+        raise SchemaError(f"a schema must be an object, got {schema!r}")
+    unknown = set(schema) - _KEYWORDS
+    if unknown:
+        raise SchemaError(f"unsupported schema keywords: {', '.join(sorted(unknown))}")
+
+    checks: List[Check] = []
+    if "type" in schema:
+        checks.append(_type_check(schema))
+    if "enum" in schema or "const" in schema:
+        allowed = schema["enum"] if "enum" in schema else [schema["const"]]
+        if not isinstance(allowed, list) or not allowed:
+            raise SchemaError("'enum' must be a non-empty list")
+
+        def check_enum(value, path):
+            if not any(_same(value, option) for option in allowed):
+                return f"{_where(path)} must be one of {', '.join(repr(option) for option in allowed)}"
+        checks.append(check_enum)
+    checks += _object_checks(schema) + _array_checks(schema) + _string_checks(schema)
+    checks += _number_checks(schema) + _combinator_checks(schema)
+
+    if not checks:
+        return lambda value, path: None
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value, path):
+        for check in checks:
+            error = check(value, path)
+            if error:
+                return error
+    return check_all
+
+def compile_schema(schema: Dict) -> Callable[[Any], Optional[str]]:
+    """Check ``schema`` once and compile it into a validator.
+
+    Supports the subset of JSON Schema tool inputs use: types, enum/const,
+    object properties, required and additionalProperties, array items and
+    lengths, string lengths and patterns, numeric bounds and
+    anyOf/oneOf/allOf. Descriptive keywords are ignored; anything else
+    (``$ref``, a misspelt keyword) raises ``SchemaError`` here rather than
+    letting bad input through later. The validator returns the first
+    problem with a value as a message, or None when it is valid.
+    """
+    if not isinstance(schema, dict) or schema.get("type", "object") != "object":
+        raise SchemaError("a tool input schema must be an object schema")
+    check = _compile(schema)
+    return lambda value: check(value, "")
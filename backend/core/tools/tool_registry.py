@@ -1,19 +1,94 @@
-from typing import Dict, List, Callable, Any
+from typing import AsyncIterator, Dict, List, Callable, Any, Iterable, Optional, Set, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
 import json
+import logging
 import os
 import subprocess
+import threading
 from datetime import datetime
+from .calculator import Calculator
+from .file_tools import read_file, write_file
+from .plugins import discover_plugins
+from .result_cache import ToolResultCache, input_key
+from .sandbox import SandboxPool
+from .schema import compile_schema
+
+logger = logging.getLogger(__name__)
+
+class _FrozenDict(dict):
+    """Read-only dict; still a dict to JSON encoders and the LLM SDKs"""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("tool definitions are read-only")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # Copies are ordinary, mutable dicts
+        return dict, (dict(self),)
+
+class _FrozenList(list):
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("tool definitions are read-only")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = clear = extend = insert = pop = remove = reverse = sort = _read_only
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return _FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return _FrozenList(_freeze(item) for item in value)
+    return value
 
 class ToolRegistry:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = 8, default_timeout: float = 30.0, sandbox: Optional[SandboxPool] = None,
+                 max_read_bytes: Optional[int] = None, max_result_chars: Optional[int] = None,
+                 cache_size: Optional[int] = None, cache_bytes: Optional[int] = None, plugin_dirs: Optional[List[str]] = None,
+                 plugin_entry_points: Optional[bool] = None):
         self.tools = {}
+        # Built on first request and reused until a tool is registered
+        self._definitions: Optional[List[Dict]] = None
+        self.default_timeout = default_timeout
+        # Caps on what one file read, and any one tool result, adds to the prompt
+        self.max_read_bytes = max_read_bytes or int(os.getenv("TOOL_MAX_READ_BYTES", "65536"))
+        self.max_result_chars = max_result_chars or int(os.getenv("TOOL_MAX_RESULT_CHARS", "100000"))
+        # Shared by every request, so it also caps tool concurrency server-wide
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="tool")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Calls that timed out but whose threads are still running
+        self._stranded: Set[Future] = set()
+        self._stranded_lock = threading.Lock()
+        # Results of pure tools, and which tools to invalidate after each tool runs
+        self.result_cache = ToolResultCache(
+            cache_size or int(os.getenv("TOOL_CACHE_SIZE", "4096")),
+            cache_bytes or int(os.getenv("TOOL_CACHE_MAX_BYTES", str(64 << 20)))
+        )
+        self._invalidates: Dict[str, Set[str]] = {}
+        # Worker processes for execute_code
+        self.sandbox = sandbox or SandboxPool()
+        self.calculator = Calculator()
         self._register_default_tools()
+        if plugin_dirs is None:
+            plugin_dirs = [d for d in os.getenv("TOOL_PLUGIN_DIRS", "").split(os.pathsep) if d]
+        if plugin_entry_points is None:
+            plugin_entry_points = os.getenv("TOOL_PLUGIN_ENTRY_POINTS", "true").lower() == "true"
+        self.load_plugins(plugin_dirs, plugin_entry_points)
 
     def _register_default_tools(self):
         """Register default tools"""
         self.register_tool(
             name="execute_code",
-            description="Execute Python code safely",
+            description=(
+                "Execute Python code in an isolated worker process. Returns printed output, "
+                f"errors and the top-level variables; runs are limited to {self.sandbox.timeout:g}s "
+                f"and {self.sandbox.memory_mb} MB"
+            ),
             parameters={
                 "type": "object",
                 "properties": {
@@ -21,7 +96,10 @@ class ToolRegistry:
                 },
                 "required": ["code"]
             },
-            function=self._execute_code
+            function=self._execute_code,
+            # The sandbox enforces its own timeout; queue no more calls than it has workers
+            timeout=self.sandbox.timeout + 5.0,
+            max_concurrency=self.sandbox.workers
         )
 
         self.register_tool(
@@ -34,16 +112,32 @@ class ToolRegistry:
                 },
                 "required": ["query"]
             },
-            function=self._search_web
+            function=self._search_web,
+            pure=True,
+            ttl=3600.0
         )
 
         self.register_tool(
             name="read_file",
-            description="Read contents of a file",
+            description=(
+                "Read part of a file. Select matching lines with pattern (a regular expression), the last or "
+                "first N lines with tail or head, a line range with start_line/end_line, or a byte range "
+                f"with offset/length. Output is capped at max_bytes (at most {self.max_read_bytes}); "
+                "truncated is true when more was selected, and size is the file's total bytes"
+            ),
             parameters={
                 "type": "object",
                 "properties": {
-                    "path": {"type": "string", "description": "File path to read"}
+                    "path": {"type": "string", "description": "File path to read"},
+                    "pattern": {"type": "string", "description": "Return only lines matching this regex, with line numbers"},
+                    "ignore_case": {"type": "boolean", "description": "Case-insensitive pattern"},
+                    "tail": {"type": "integer", "minimum": 0, "description": "Return the last N lines"},
+                    "head": {"type": "integer", "minimum": 0, "description": "Return the first N lines"},
+                    "start_line": {"type": "integer", "minimum": 1, "description": "First line to return (1-based)"},
+                    "end_line": {"type": "integer", "minimum": 1, "description": "Last line to return (inclusive)"},
+                    "offset": {"type": "integer", "minimum": 0, "description": "Byte offset to start reading at"},
+                    "length": {"type": "integer", "minimum": 0, "description": "Number of bytes to read"},
+                    "max_bytes": {"type": "integer", "minimum": 1, "description": "Cap on returned bytes"}
                 },
                 "required": ["path"]
             },
@@ -52,12 +146,18 @@ class ToolRegistry:
 
         self.register_tool(
             name="write_file",
-            description="Write content to a file",
+            description=(
+                "Write content to a file. mode 'overwrite' (default) replaces the file atomically; 'append' "
+                "adds to the end, so large files can be written over several calls; offset overwrites bytes "
+                "in place at that position"
+            ),
             parameters={
                 "type": "object",
                 "properties": {
                     "path": {"type": "string", "description": "File path to write"},
-                    "content": {"type": "string", "description": "Content to write"}
+                    "content": {"type": "string", "description": "Content to write"},
+                    "mode": {"type": "string", "enum": ["overwrite", "append"], "description": "How to write"},
+                    "offset": {"type": "integer", "minimum": 0, "description": "Byte position to write at"}
                 },
                 "required": ["path", "content"]
             },
@@ -66,54 +166,264 @@ class ToolRegistry:
 
         self.register_tool(
             name="calculate",
-            description="Perform mathematical calculations",
+            description=(
+                "Evaluate a math expression: + - * / // % **, comparisons, pi, e, and functions such as "
+                "sqrt, log, exp, sin, round, min, max, sum, mean, std, factorial, arange and linspace. "
+                "Lists and list-valued variables are evaluated elementwise, so one call can cover many values"
+            ),
             parameters={
                 "type": "object",
                 "properties": {
-                    "expression": {"type": "string", "description": "Mathematical expression to evaluate"}
+                    "expression": {"type": "string", "description": "Mathematical expression to evaluate"},
+                    "variables": {
+                        "type": "object",
+                        "description": "Optional values for names in the expression: numbers or lists of numbers",
+                        "additionalProperties": {
+                            "anyOf": [{"type": "number"}, {"type": "array", "items": {"type": "number"}}]
+                        }
+                    }
                 },
                 "required": ["expression"]
             },
-            function=self._calculate
+            function=self._calculate,
+            pure=True
         )
 
-    def register_tool(self, name: str, description: str, parameters: Dict, function: Callable):
+    def register_tool(self, name: str, description: str, parameters: Dict, function: Callable,
+                      timeout: Optional[float] = None, max_concurrency: Optional[int] = None,
+                      pure: bool = False, ttl: Optional[float] = None, invalidated_by: Iterable[str] = ()):
+        """Register a tool
+
+        ``timeout`` overrides the registry default for this tool and
+        ``max_concurrency`` caps how many of its calls may run at once.
+
+        A ``pure`` tool returns the same result for the same input, so
+        successful results are cached by input and reused, for ``ttl``
+        seconds if given. ``invalidated_by`` names tools whose calls drop
+        this tool's cached results, e.g. a reader invalidated by a writer.
+        Tools that see state changed outside the registry (files, the clock)
+        should not be marked pure.
+
+        ``parameters`` is checked and compiled into a validator here, so a
+        bad schema raises ``SchemaError`` at registration and every call's
+        input is validated before the tool runs.
+        """
+        validate = compile_schema(parameters)
         self.tools[name] = {
             "name": name,
             "description": description,
             "input_schema": parameters,
-            "function": function
+            "function": function,
+            "validate": validate,
+            "timeout": timeout,
+            "max_concurrency": max_concurrency,
+            "pure": pure,
+            "ttl": ttl,
+            "invalidated_by": tuple(invalidated_by)
         }
+        if max_concurrency:
+            self._semaphores[name] = asyncio.Semaphore(max_concurrency)
+        else:
+            self._semaphores.pop(name, None)
+        for dependents in self._invalidates.values():
+            dependents.discard(name)
+        for source in invalidated_by:
+            self._invalidates.setdefault(source, set()).add(name)
+        # Results of a previous registration under this name no longer apply
+        self.result_cache.invalidate(name)
+        self._definitions = None
+
+    def load_plugins(self, directories: List[str] = (), entry_points: bool = True) -> int:
+        """Register tools from plugin manifests; returns how many were registered
+
+        Manifests are ``*.json`` files in ``directories`` and objects named
+        by installed packages' ``nexus.tools`` entry points (see
+        ``core.tools.plugins``). Only the manifests are read: each tool's
+        module is imported on its first call. A tool with a bad manifest
+        entry or schema is logged and skipped, as is one whose name is
+        already registered: a plugin cannot replace a built-in such as
+        ``execute_code`` or another plugin's tool.
+        """
+        registered = 0
+        for source, specs in discover_plugins(directories, entry_points).items():
+            for spec in specs:
+                if spec["name"] in self.tools:
+                    logger.warning("skipping tool %r from %s: a tool with that name is already registered",
+                                   spec["name"], source)
+                    continue
+                try:
+                    self.register_tool(**spec)
+                    registered += 1
+                except (TypeError, ValueError):
+                    logger.exception("skipping tool %r from %s", spec.get("name"), source)
+        return registered
 
     def get_tool_definitions(self) -> List[Dict]:
-        """Get tool definitions for LLM"""
-        return [
-            {
-                "name": tool["name"],
-                "description": tool["description"],
-                "input_schema": tool["input_schema"]
-            }
-            for tool in self.tools.values()
-        ]
+        """Get tool definitions for LLM
+
+        The list is built once and shared by every caller until a tool is
+        registered, so it is read-only.
+        """
+        definitions = self._definitions
+        if definitions is None:
+            definitions = self._definitions = _freeze([
+                {
+                    "name": tool["name"],
+                    "description": tool["description"],
+                    "input_schema": tool["input_schema"]
+                }
+                for tool in self.tools.values()
+            ])
+        return definitions
+
+    def _cache_key(self, tool_name: str, parameters: Dict) -> Optional[str]:
+        if not self.tools[tool_name]["pure"]:
+            return None
+        # Inputs too large to be worth keeping are not cached
+        return input_key(parameters, self.result_cache.max_entry_bytes)
+
+    def _run_tool(self, tool_name: str, parameters: Dict, key: Optional[str]) -> Any:
+        """Run a tool, cache its result under ``key`` and apply its invalidations"""
+        tool = self.tools[tool_name]
+        try:
+            result = tool["function"](**parameters)
+        except Exception as e:
+            result = {"error": str(e)}
+        try:
+            for dependent in self._invalidates.get(tool_name, ()):
+                self.result_cache.invalidate(dependent)
+            # Failures are not cached so a later call can succeed
+            failed = isinstance(result, dict) and (result.get("success") is False or "error" in result)
+            if key is not None and not failed:
+                self.result_cache.put(tool_name, key, result, tool["ttl"])
+        except Exception:
+            # The call itself succeeded; only caching its result failed
+            logger.exception("caching the result of tool %s failed", tool_name)
+        return result
 
     def execute_tool(self, tool_name: str, parameters: Dict) -> Any:
         if tool_name not in self.tools:
             return {"error": f"Tool {tool_name} not found"}
 
+        key = self._cache_key(tool_name, parameters)
+        if key is not None:
+            hit, result = self.result_cache.get(tool_name, key)
+            if hit:
+                return result
+        # Bad input is rejected before dispatch; it never runs or invalidates anything
+        error = self.tools[tool_name]["validate"](parameters)
+        if error:
+            return {"error": f"Invalid input for {tool_name}: {error}"}
+        return self._run_tool(tool_name, parameters, key)
+
+    async def execute_tool_async(self, tool_name: str, parameters: Dict) -> Any:
+        """Run a tool on the worker pool, bounded by its timeout
+
+        Cached results and input errors are returned directly, without a
+        trip to the pool. The timeout covers waiting for one of the tool's
+        ``max_concurrency`` slots as well as the run. A call that times out
+        keeps its slot and its thread until it really finishes; the count
+        of such threads is reported by ``get_cache_stats``.
+        """
+        if tool_name not in self.tools:
+            return {"error": f"Tool {tool_name} not found"}
+
+        key = self._cache_key(tool_name, parameters)
+        if key is not None:
+            hit, result = self.result_cache.get(tool_name, key)
+            if hit:
+                return result
+        # Bad input is rejected before dispatch; it never runs or invalidates anything
+        error = self.tools[tool_name]["validate"](parameters)
+        if error:
+            return {"error": f"Invalid input for {tool_name}: {error}"}
+
+        timeout = self.tools[tool_name]["timeout"] or self.default_timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        semaphore = self._semaphores.get(tool_name)
+        if semaphore:
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                limit = self.tools[tool_name]["max_concurrency"]
+                return {"error": f"Tool {tool_name} is saturated: all {limit} slots busy for {timeout}s"}
         try:
-            return self.tools[tool_name]["function"](**parameters)
-        except Exception as e:
-            return {"error": str(e)}
+            future = self._executor.submit(self._run_tool, tool_name, parameters, key)
+        except BaseException:
+            if semaphore:
+                semaphore.release()
+            raise
+        # The tool's slot is freed when its thread really finishes, not when
+        # the caller stops waiting, so max_concurrency bounds what is running
+        future.add_done_callback(lambda f: self._call_finished(loop, semaphore, f))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), deadline - loop.time())
+        except asyncio.TimeoutError:
+            if future.cancelled():
+                # Still queued behind other calls; it will not run
+                return {"error": f"Tool {tool_name} timed out after {timeout}s waiting for a worker"}
+            # The worker thread cannot be interrupted; it finishes in the background
+            with self._stranded_lock:
+                if not future.done():
+                    self._stranded.add(future)
+                stranded = len(self._stranded)
+            logger.warning("tool %s timed out after %ss; %d of %d tool threads held by timed-out calls",
+                           tool_name, timeout, stranded, self.max_concurrency)
+            return {"error": f"Tool {tool_name} timed out after {timeout}s"}
 
-    def _execute_code(self, code: str) -> Dict:
+    def _call_finished(self, loop: asyncio.AbstractEventLoop, semaphore: Optional[asyncio.Semaphore], future):
+        """Done-callback of a tool call's thread; runs on that thread"""
+        with self._stranded_lock:
+            self._stranded.discard(future)
+        if semaphore:
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                # The loop has closed; nothing is waiting on the slot
+                pass
+
+    async def execute_tools(self, tool_calls: List[Dict]) -> AsyncIterator[Tuple[int, Any]]:
+        """Run tool calls concurrently, yielding ``(index, result)`` as each finishes
+
+        ``index`` is the call's position in ``tool_calls`` so callers can
+        keep results aligned with their ``tool_use_id``.
+        """
+        tasks = {
+            asyncio.ensure_future(self.execute_tool_async(tc["name"], tc["input"])): index
+            for index, tc in enumerate(tool_calls)
+        }
         try:
-            # Create a safe execution environment
-            exec_globals = {"__builtins__": __builtins__}
-            exec_locals = {}
-            exec(code, exec_globals, exec_locals)
-            return {"success": True, "result": str(exec_locals)}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield tasks[task], task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def format_result(self, result: Any) -> str:
+        """Tool result as prompt text, cut to ``max_result_chars``"""
+        text = str(result)
+        if len(text) > self.max_result_chars:
+            text = text[:self.max_result_chars] + f"... [truncated {len(text) - self.max_result_chars} characters]"
+        return text
+
+    def get_cache_stats(self) -> Dict:
+        stats = self.result_cache.get_stats()
+        stats["pure_tools"] = sorted(name for name, tool in self.tools.items() if tool["pure"])
+        with self._stranded_lock:
+            stats["stranded_threads"] = len(self._stranded)
+        stats["max_threads"] = self.max_concurrency
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.sandbox.close()
+
+    def _execute_code(self, code: str) -> Dict:
+        return self.sandbox.run(code)
 
     def _search_web(self, query: str) -> Dict:
         # Placeholder for web search
@@ -124,26 +434,11 @@ class ToolRegistry:
             ]
         }
 
-    def _read_file(self, path: str) -> Dict:
-        try:
-            with open(path, 'r') as f:
-                content = f.read()
-            return {"success": True, "content": content}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+    def _read_file(self, path: str, max_bytes: Optional[int] = None, **selection) -> Dict:
+        return read_file(path, max_bytes=min(max_bytes or self.max_read_bytes, self.max_read_bytes), **selection)
 
-    def _write_file(self, path: str, content: str) -> Dict:
-        try:
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            with open(path, 'w') as f:
-                f.write(content)
-            return {"success": True, "path": path}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+    def _write_file(self, path: str, content: str, mode: str = "overwrite", offset: Optional[int] = None) -> Dict:
+        return write_file(path, content, mode=mode, offset=offset)
 
-    def _calculate(self, expression: str) -> Dict:
-        try:
-            result = eval(expression, {"__builtins__": {}})
-            return {"success": True, "result": result}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+    def _calculate(self, expression: str, variables: Optional[Dict] = None) -> Dict:
+        return self.calculator.evaluate(expression, variables)
@@ -1,8 +1,14 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import Optional, List, Dict
+from datetime import datetime, timezone
 from core.agent import NexusAgent
+from core.memory.response_cache import ResponseCache
+import asyncio
+import json
 import os
 from dotenv import load_dotenv
 
@@ -20,22 +26,67 @@ app.add_middleware(
 )
 
 # Initialize agent
-agent = NexusAgent(llm_provider=os.getenv("LLM_PROVIDER", "anthropic"))
+response_cache = None
+if os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true":
+    response_cache = ResponseCache(
+        max_distance=float(os.getenv("RESPONSE_CACHE_MAX_DISTANCE", "0.05")),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    )
+
+agent = NexusAgent(
+    llm_provider=os.getenv("LLM_PROVIDER", "anthropic"),
+    max_steps=int(os.getenv("AGENT_MAX_STEPS", "8")),
+    time_budget=float(os.getenv("AGENT_TIME_BUDGET", "120")),
+    token_budget=int(os.getenv("AGENT_TOKEN_BUDGET", "200000")),
+    response_cache=response_cache,
+    write_behind=os.getenv("WRITE_BEHIND_ENABLED", "true").lower() == "true",
+    pattern_mode=os.getenv("PATTERN_MODE", "keywords"),
+    storage_backend=os.getenv("STORAGE_BACKEND", "json"),
+    data_dir=os.getenv("DATA_DIR", "./data"),
+    vector_backend=os.getenv("VECTOR_BACKEND", "chroma"),
+    vector_host=os.getenv("CHROMA_HOST") or None,
+    vector_port=int(os.getenv("CHROMA_PORT", "8000")),
+    embedding_model=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
+    embedding_cache_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+    embedding_cache_disk=os.getenv("EMBEDDING_CACHE_DISK", "false").lower() == "true",
+    embedding_max_wait=float(os.getenv("EMBEDDING_MAX_WAIT_MS", "0")) / 1000,
+    sandbox_workers=int(os.getenv("SANDBOX_WORKERS", "2")),
+    sandbox_timeout=float(os.getenv("SANDBOX_TIMEOUT", "10")),
+    sandbox_memory_mb=int(os.getenv("SANDBOX_MEMORY_MB", "512")),
+    session_ttl=float(os.getenv("SESSION_TTL", "3600")),
+    max_sessions=int(os.getenv("SESSION_MAX", "100000")),
+    context_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500")),
+    history_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "2000")),
+    # e.g. cross-encoder/ms-marco-MiniLM-L-6-v2; empty disables reranking
+    rerank_model=os.getenv("RERANK_MODEL") or None,
+    # auto: on unless workers share state, where the BM25 index would be per process
+    hybrid_search={"true": True, "false": False}.get(os.getenv("HYBRID_SEARCH", "auto").lower())
+)
 
 # Request/Response models
 class MessageRequest(BaseModel):
     message: str
+    # Flush queued memory writes from earlier turns before retrieval
+    read_your_writes: bool = False
+    # Continue an earlier conversation; a new session is started when omitted
+    session_id: Optional[str] = None
 
 class MessageResponse(BaseModel):
     response: str
     tool_results: List[Dict]
     pattern_detected: Optional[str]
     memories_used: int
+    steps: List[Dict] = []
+    cached: bool = False
+    session_id: str
     timestamp: str
 
 class MemoryQuery(BaseModel):
     query: str
     n_results: int = 5
+    # "hybrid", "vector" or "lexical"
+    mode: str = "hybrid"
 
 @app.get("/")
 async def root():
@@ -50,16 +101,62 @@ async def root():
 async def chat(request: MessageRequest):
     """Main chat endpoint"""
     try:
-        result = agent.process_message(request.message)
+        result = await agent.process_message(
+            request.message, read_your_writes=request.read_your_writes, session_id=request.session_id
+        )
         return MessageResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: Dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: MessageRequest):
+    """Chat endpoint streaming server-sent events
+
+    Emits text_delta, tool_start and tool_finish events followed by a done
+    event with the response metadata. Memory writes run after the stream
+    has closed.
+    """
+    turn = {}
+
+    async def events():
+        try:
+            async for event in agent.stream_message(
+                request.message, read_your_writes=request.read_your_writes, session_id=request.session_id
+            ):
+                if event["type"] == "done":
+                    turn["result"] = event["result"]
+                yield _sse(event)
+        except Exception as e:
+            yield _sse({"type": "error", "detail": str(e)})
+
+    async def record():
+        if "result" in turn:
+            await agent.record_turn(request.message, turn["result"])
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(record)
+    )
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Forget a session's conversation history"""
+    try:
+        await asyncio.to_thread(agent.sessions.delete, session_id)
+        return {"status": "success", "message": f"Session {session_id} deleted"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/memory/stats")
 async def get_memory_stats():
     """Get memory and learning statistics"""
     try:
-        stats = agent.get_memory_stats()
+        stats = await asyncio.to_thread(agent.get_memory_stats)
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -68,7 +165,9 @@ async def get_memory_stats():
 async def query_memory(request: MemoryQuery):
     """Query vector memory"""
     try:
-        memories = agent.vector_memory.query_memory(request.query, request.n_results)
+        memories = await asyncio.to_thread(
+            agent.vector_memory.query_memory, request.query, request.n_results, None, request.mode
+        )
         return {"memories": memories}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -77,16 +176,48 @@ async def query_memory(request: MemoryQuery):
 async def get_episodes(n: int = 10):
     """Get recent episodes"""
     try:
-        episodes = agent.episodic_memory.get_recent_episodes(n)
+        episodes = await asyncio.to_thread(agent.episodic_memory.get_recent_episodes, n)
         return {"episodes": episodes}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _to_episode_timestamp(value: Optional[datetime]) -> Optional[str]:
+    # Episodes store naive UTC ISO timestamps
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+@app.get("/memory/episodes/search")
+async def search_episodes(q: str = "", start: Optional[datetime] = None, end: Optional[datetime] = None,
+                          limit: int = 10, offset: int = 0):
+    """Ranked full-text search over episodes"""
+    if limit < 1 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be positive and offset non-negative")
+    try:
+        page = await asyncio.to_thread(
+            agent.episodic_memory.search_episodes_page,
+            q,
+            start_time=_to_episode_timestamp(start),
+            end_time=_to_episode_timestamp(end),
+            limit=limit,
+            offset=offset
+        )
+        return {
+            "episodes": page["results"],
+            "total": page["total"],
+            "limit": limit,
+            "offset": offset
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/learning/patterns")
 async def get_patterns():
     """Get learned patterns"""
     try:
-        patterns = agent.learning_engine.get_patterns()
+        patterns = await asyncio.to_thread(agent.learning_engine.get_patterns)
         return {"patterns": patterns}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -95,29 +226,39 @@ async def get_patterns():
 async def get_skills():
     """Get learned skills"""
     try:
-        skills = agent.learning_engine.get_skills()
+        skills = await asyncio.to_thread(agent.learning_engine.get_skills)
         return {"skills": skills}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/tools")
 async def get_tools():
-    """Get available tools"""
+    """Get available tools and result-cache hit counts"""
     try:
-        tools = agent.tool_registry.get_tool_definitions()
-        return {"tools": tools}
+        tools = await asyncio.to_thread(agent.tool_registry.get_tool_definitions)
+        return {"tools": tools, "cache": agent.tool_registry.get_cache_stats()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/llm/stats")
+async def get_llm_stats():
+    """Get LLM token usage and prompt-cache hit counts"""
+    return agent.llm.get_stats()
+
 @app.delete("/memory/clear")
 async def clear_memory():
     """Clear all memories"""
     try:
-        agent.clear_memories()
+        await asyncio.to_thread(agent.clear_memories)
         return {"status": "success", "message": "All memories cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.on_event("shutdown")
+async def shutdown():
+    await asyncio.to_thread(agent.close)
+    await agent.llm.aclose()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
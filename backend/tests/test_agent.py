@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import logging
+import threading
+
+import numpy as np
+import pytest
+
+from core.agent import NexusAgent
+
+
+class _Model:
+    """Deterministic stand-in for the sentence-transformers model"""
+
+    def encode(self, texts, **kwargs):
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha1(text.encode()).digest()[:4], "little")
+            vector = np.random.default_rng(seed).standard_normal(16)
+            vectors.append(vector / np.linalg.norm(vector))
+        return np.array(vectors, dtype=np.float32)
+
+
+class _LLM:
+    """Scripted LLM; ``respond`` builds each reply from the request"""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+
+    async def generate_with_tools(self, messages, tools, system=None, tool_choice=None):
+        self.requests.append({"messages": list(messages), "system": system, "tool_choice": tool_choice})
+        return await self.respond(len(self.requests), tool_choice)
+
+    async def aclose(self):
+        pass
+
+
+def _text(text, input_tokens=10, output_tokens=5):
+    return {
+        "content": [{"type": "text", "text": text}],
+        "tool_calls": [],
+        "stop_reason": "end_turn",
+        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens}
+    }
+
+
+def _tool_use(calls, input_tokens=10, output_tokens=5):
+    tool_calls = [{"id": f"call_{i}", "name": name, "input": tool_input} for i, (name, tool_input) in enumerate(calls)]
+    return {
+        "content": [{"type": "tool_use", **call} for call in tool_calls],
+        "tool_calls": tool_calls,
+        "stop_reason": "tool_use",
+        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens}
+    }
+
+
+@pytest.fixture
+def make_agent(tmp_path):
+    agents = []
+
+    def make(respond, **kwargs):
+        agent = NexusAgent(data_dir=str(tmp_path / f"data{len(agents)}"), llm=_LLM(respond), write_behind=False,
+                           vector_backend="numpy", sandbox_workers=1, **kwargs)
+        agent.vector_memory.embedder._model = _Model()
+        agents.append(agent)
+        return agent
+
+    yield make
+    for agent in agents:
+        agent.close()
+
+
+def test_concurrent_turns_overlap_on_the_event_loop(make_agent):
+    in_flight = 0
+    peak = 0
+
+    async def respond(n, tool_choice):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.1)
+        in_flight -= 1
+        return _text(f"answer {n}")
+
+    agent = make_agent(respond)
+
+    async def run():
+        return await asyncio.gather(*(agent.process_message(f"question {i}") for i in range(4)))
+
+    results = asyncio.run(run())
+    assert peak == 4
+    assert sorted(result["response"] for result in results) == [f"answer {n}" for n in range(1, 5)]
+    assert agent.episodic_memory.count() == 4
+
+
+def test_tool_calls_in_one_step_run_concurrently(make_agent):
+    async def respond(n, tool_choice):
+        if n == 1:
+            return _tool_use([("rendezvous", {"value": "a"}), ("rendezvous", {"value": "b"})])
+        return _text("done")
+
+    agent = make_agent(respond)
+    # Both calls must be running at once to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def rendezvous(value):
+        barrier.wait()
+        return value
+
+    agent.tool_registry.register_tool("rendezvous", "", {"type": "object", "properties": {"value": {"type": "string"}}},
+                                      rendezvous)
+    result = asyncio.run(agent.process_message("run both"))
+
+    assert [tool_result["result"] for tool_result in result["tool_results"]] == ["a", "b"]
+    tool_message = agent.llm.requests[1]["messages"][-1]["content"]
+    assert [block["tool_use_id"] for block in tool_message] == ["call_0", "call_1"]
+    assert [block["content"] for block in tool_message] == ["a", "b"]
+
+
+async def _always_calculate(n, tool_choice):
+    if tool_choice == "none":
+        return _text("final answer")
+    return _tool_use([("calculate", {"expression": f"{n} + 1"})])
+
+
+def test_step_budget_ends_with_a_tool_free_answer(make_agent):
+    agent = make_agent(_always_calculate, max_steps=2)
+    result = asyncio.run(agent.process_message("keep going"))
+
+    assert [request["tool_choice"] for request in agent.llm.requests] == [None, None, "none"]
+    assert result["response"] == "final answer"
+    assert len(result["tool_results"]) == 2
+    assert [step["tools"] for step in result["steps"]] == [["calculate"], ["calculate"], []]
+
+
+def test_token_budget_stops_the_loop_early(make_agent):
+    agent = make_agent(_always_calculate, max_steps=8, token_budget=15)
+    result = asyncio.run(agent.process_message("keep going"))
+
+    assert [request["tool_choice"] for request in agent.llm.requests] == [None, "none"]
+    assert len(result["tool_results"]) == 1
+
+
+def test_shared_state_mode_turns_off_the_per_process_lexical_index(make_agent, caplog):
+    with caplog.at_level(logging.WARNING, logger="core.agent"):
+        agent = make_agent(_always_calculate, storage_backend="sqlite")
+        assert agent._data_lock is None
+        assert agent.vector_memory.lexical is False
+        assert "BM25 index" not in caplog.text
+
+        agent = make_agent(_always_calculate, storage_backend="sqlite", hybrid_search=True)
+        assert agent.vector_memory.lexical is True
+        assert "BM25 index" in caplog.text
@@ -0,0 +1,104 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.tools.calculator import Calculator
+
+
+@pytest.fixture
+def calc():
+    return Calculator()
+
+
+def test_arithmetic_functions_and_constants(calc):
+    assert calc.evaluate("2 + 3 * 4")["result"] == 14
+    assert calc.evaluate("sqrt(16) + log(e)")["result"] == 5.0
+    assert calc.evaluate("factorial(5) // 7 % 4")["result"] == 17 % 4
+    assert calc.evaluate("1 < 2 <= 2")["result"] is True
+
+
+def test_variables_evaluate_elementwise(calc):
+    result = calc.evaluate("x ** 2 + y", {"x": [1, 2, 3], "y": 1})
+    assert result["result"] == [2.0, 5.0, 10.0]
+    assert result["shape"] == [3]
+    assert calc.evaluate("mean(x)", {"x": [1, 2, 3]})["result"] == 2.0
+
+
+def test_unsafe_syntax_is_rejected(calc):
+    for expression in ("__import__('os')", "x.real", "[i for i in x]", "lambda: 1", "'a' * 3"):
+        result = calc.evaluate(expression, {"x": [1]})
+        assert result["success"] is False
+
+
+def test_huge_integers_are_rejected_up_front(calc):
+    assert "bits" in calc.evaluate("9 ** 9 ** 9")["error"]
+    assert "bits" in calc.evaluate("factorial(10 ** 6)")["error"]
+
+
+def test_variables_must_be_flat_lists(calc):
+    result = calc.evaluate("x", {"x": [[1, 2], [3, 4]]})
+    assert "flat list" in result["error"]
+    assert calc.evaluate("x", {"x": "1"})["success"] is False
+
+
+def test_broadcast_beyond_the_array_limit_is_rejected_before_computing():
+    calc = Calculator(max_array_size=10000)
+    column = "[" + ", ".join(f"[{i}]" for i in range(100)) + "]"
+    row = list(range(1000))
+
+    result = calc.evaluate(f"{column} * x", {"x": row})
+    assert "limited to 10000 elements" in result["error"]
+    assert "limited" in calc.evaluate(f"{column} < x", {"x": row})["error"]
+    assert "limited" in calc.evaluate(f"atan2({column}, x)", {"x": row})["error"]
+    assert "limited" in calc.evaluate(f"max({column}, x)", {"x": row})["error"]
+    # An outer product through dot
+    assert "limited" in calc.evaluate(f"dot({column}, [x])", {"x": row})["error"]
+    # Within the limit it still works
+    assert calc.evaluate("[[1], [2]] * [1, 2, 3]")["shape"] == [2, 3]
+    assert calc.evaluate("dot(x, x)", {"x": [1, 2, 3]})["result"] == 14
+
+
+def test_large_results_are_truncated(calc):
+    result = calc.evaluate("arange(5000)")
+    assert result["truncated"] is True
+    assert len(result["result"]) == calc.max_result_items
+    assert result["shape"] == [5000]
+
+
+def test_memory_error_is_reported(calc, monkeypatch):
+    def exhausted(*args):
+        raise MemoryError()
+
+    monkeypatch.setitem(calc.functions, "sqrt", exhausted)
+    assert calc.evaluate("sqrt(2)") == {"success": False, "error": "calculation needs too much memory"}
+
+
+def test_compiled_expressions_are_cached(calc):
+    calc.evaluate("x + 1", {"x": 1})
+    calc.evaluate("x + 1", {"x": 2})
+    stats = calc.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_integers_too_long_to_print_are_rejected(calc):
+    for expression in ("10 ** 5000", "comb(100000, 50000)", "factorial(5000)", "2 ** 13999 + 2 ** 13999"):
+        assert "bits" in calc.evaluate(expression)["error"]
+    assert len(str(calc.evaluate("2 ** 13000")["result"])) == 3914
+
+
+def test_integer_arrays_do_not_wrap_around(calc):
+    powers = calc.evaluate("2 ** arange(100)")["result"]
+    assert powers[63] == 2.0 ** 63
+    assert powers[99] == 2.0 ** 99
+    assert calc.evaluate("x ** y", {"x": [3], "y": [50]})["result"] == [3.0 ** 50]
+
+    big = 3 * 10 ** 9
+    assert calc.evaluate("x * x", {"x": [big, 2]})["result"] == [float(big) ** 2, 4.0]
+    assert calc.evaluate("x * 10 ** 10", {"x": [big]})["result"] == [big * 1e10]
+    assert calc.evaluate("prod(arange(1, 30))")["result"] == pytest.approx(math.factorial(29))
+    # Products that fit stay exact integers
+    assert calc.evaluate("x * 3", {"x": [1, 2]})["result"] == [3, 6]
+    assert calc.evaluate("prod([1, 2, 3])")["result"] == 6
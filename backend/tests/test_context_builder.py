@@ -0,0 +1,67 @@
+from core.memory.context_builder import ContextBuilder
+from core.llm.tokenizer import count_tokens
+
+
+def _memory(content, distance, timestamp=None):
+    return {"content": content, "distance": distance, "metadata": {"timestamp": timestamp} if timestamp else {}}
+
+
+def _episode(user_message, agent_response, timestamp="2026-01-01T00:00:00"):
+    return {"user_message": user_message, "agent_response": agent_response, "timestamp": timestamp}
+
+
+def test_exchange_in_memory_and_episodes_is_kept_once():
+    builder = ContextBuilder(recency_weight=0.0)
+    selected = builder.select(
+        "python sorting",
+        [_memory("User: python sorting\nAgent: use sorted()", 0.1)],
+        [_episode("python sorting", "use sorted()")]
+    )
+    assert len(selected) == 1
+    assert selected[0]["sources"] == {"memory", "episode"}
+
+
+def test_redundant_candidate_loses_to_a_different_one():
+    memories = [
+        _memory("python list sorting with sorted and key functions", 0.10),
+        _memory("python list sorting with sorted and key functions explained", 0.12),
+        _memory("rust ownership and the borrow checker", 0.30),
+    ]
+    builder = ContextBuilder(relevance_weight=0.5, recency_weight=0.0, duplicate_threshold=1.1)
+    picked = [item["text"] for item in builder.select("python sorting", memories, [])][:2]
+    assert picked[1].startswith("rust")
+
+    # With all weight on relevance the near-duplicate comes second
+    builder = ContextBuilder(relevance_weight=1.0, recency_weight=0.0, duplicate_threshold=1.1)
+    picked = [item["text"] for item in builder.select("python sorting", memories, [])][:2]
+    assert picked[1].endswith("explained")
+
+
+def test_selection_stays_within_the_token_budget():
+    memories = [_memory(f"memory number {i} " + "word " * 200, 0.1 + i / 100) for i in range(5)]
+    builder = ContextBuilder(token_budget=300, min_item_tokens=24)
+    selected = builder.select("memory", memories, [])
+    assert sum(item["tokens"] for item in selected) <= 300
+    assert selected[-1]["text"].endswith("...")
+
+
+def test_format_orders_episodes_by_time():
+    builder = ContextBuilder(recency_weight=0.0)
+    selected = builder.select("q", [], [
+        _episode("q later", "b", "2026-01-02T00:00:00"),
+        _episode("q earlier", "a", "2026-01-01T00:00:00"),
+    ])
+    context = builder.format(selected)
+    assert context.index("q earlier") < context.index("q later")
+    assert "## Recent Interactions:" in context
+
+
+def test_trim_history_keeps_newest_whole_turns():
+    history = []
+    for i in range(5):
+        history += [{"role": "user", "content": f"question {i} " * 10},
+                    {"role": "assistant", "content": f"answer {i} " * 10}]
+    per_turn = count_tokens(history[-2]["content"]) + count_tokens(history[-1]["content"])
+    builder = ContextBuilder(history_budget=per_turn * 2 + 1)
+    kept = builder.trim_history(history)
+    assert kept == history[-4:]
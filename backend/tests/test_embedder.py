@@ -0,0 +1,98 @@
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from core.memory.embedder import Embedder
+from core.memory.embedding_cache import EmbeddingCache, content_key
+
+
+class _Model:
+    """Records each batch; the first call waits for ``release``"""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+
+    def encode(self, texts, **kwargs):
+        if not self.batches:
+            self.release.wait(5)
+        self.batches.append(list(texts))
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+def _embedder(**kwargs):
+    embedder = Embedder(**kwargs)
+    embedder._model = _Model()
+    return embedder
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert condition()
+
+
+def test_concurrent_requests_share_one_model_call():
+    embedder = _embedder()
+    model = embedder._model
+    results = {}
+
+    def embed(name, texts):
+        results[name] = embedder.embed(texts)
+
+    first = threading.Thread(target=embed, args=("first", ["a"]))
+    first.start()
+    _wait_for(lambda: embedder.get_stats()["pending"] == 0 and embedder._thread is not None)
+    # While the model is busy with "a", three more requests queue up
+    others = [threading.Thread(target=embed, args=(name, texts))
+              for name, texts in [("x", ["bb", "ccc"]), ("y", ["bb"]), ("z", ["dddd"])]]
+    for thread in others:
+        thread.start()
+    _wait_for(lambda: embedder.get_stats()["pending"] == 4)
+    model.release.set()
+    for thread in [first, *others]:
+        thread.join(5)
+
+    assert model.batches[0] == ["a"]
+    # Identical texts across requests are embedded once
+    assert sorted(model.batches[1]) == ["bb", "ccc", "dddd"]
+    assert len(model.batches) == 2
+    assert results["x"][:, 0].tolist() == [2, 3]
+    assert results["y"][:, 0].tolist() == [2]
+    assert results["z"][:, 0].tolist() == [4]
+    assert embedder.get_stats()["batches"] == 2
+    embedder.close()
+
+
+def test_cached_texts_skip_the_model(tmp_path):
+    embedder = _embedder(cache=EmbeddingCache(path=str(tmp_path / "embeddings.db")))
+    embedder._model.release.set()
+    embedder.embed(["a", "bb"])
+    embedder.embed(["bb", "ccc"])
+    assert embedder._model.batches == [["a", "bb"], ["ccc"]]
+    embedder.close()
+
+    # The disk cache outlives the process-local one
+    embedder = _embedder(cache=EmbeddingCache(path=str(tmp_path / "embeddings.db")))
+    assert embedder.embed(["a", "ccc"])[:, 0].tolist() == [1, 3]
+    assert embedder._model.batches == []
+    embedder.close()
+
+
+def test_failed_disk_write_is_rolled_back(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    cache = EmbeddingCache(path=path)
+    good = content_key("model", "good")
+    with pytest.raises(sqlite3.Error):
+        cache.put_many({good: np.ones(2), ("not", "bytes"): np.ones(2)})
+    assert not cache._db.in_transaction
+
+    cache.put_many({content_key("model", "next"): np.ones(2)})
+    cache.close()
+    reopened = EmbeddingCache(path=path)
+    assert list(reopened.get_many([good, content_key("model", "next")])) == [content_key("model", "next")]
+    reopened.close()
@@ -0,0 +1,118 @@
+import json
+import os
+import time
+
+import pytest
+
+from core.memory.episodic import EpisodicMemory
+
+
+def _episode(i):
+    return {"user_message": f"question {i}", "agent_response": f"answer {i}"}
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    calls = []
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        calls.append(fd)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", fsync)
+    return calls
+
+
+def test_torn_trailing_line_is_dropped_and_log_compacted(tmp_path):
+    memory = EpisodicMemory(str(tmp_path))
+    memory.add_episodes([_episode(0), _episode(1)])
+    memory.close()
+    with open(memory.log_file, "a", encoding="utf-8") as f:
+        f.write('{"id": "2", "user_mes')
+
+    memory = EpisodicMemory(str(tmp_path))
+    assert [episode["user_message"] for episode in memory.episodes] == ["question 0", "question 1"]
+    with open(memory.log_file, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 2
+    memory.close()
+
+
+def test_legacy_episodes_json_is_migrated(tmp_path):
+    legacy = [{"id": "0", "timestamp": "2024-01-01T00:00:00", "user_message": "old question",
+               "agent_response": "old answer", "tools_used": [], "context": {}}]
+    with open(tmp_path / "episodes.json", "w") as f:
+        json.dump(legacy, f)
+
+    memory = EpisodicMemory(str(tmp_path))
+    assert memory.episodes == legacy
+    assert memory.search_episodes("question")[0]["id"] == "0"
+    assert not (tmp_path / "episodes.json").exists()
+    assert (tmp_path / "episodes.json.migrated").exists()
+    memory.close()
+
+    # The log is the source of truth from now on
+    assert EpisodicMemory(str(tmp_path)).episodes == legacy
+
+
+def test_ids_continue_after_reopen(tmp_path):
+    memory = EpisodicMemory(str(tmp_path))
+    assert memory.add_episodes([_episode(0), _episode(1)]) == ["0", "1"]
+    memory.close()
+
+    memory = EpisodicMemory(str(tmp_path))
+    assert memory.add_episode(_episode(2)) == "2"
+    assert memory.get_episode("1")["user_message"] == "question 1"
+    assert memory.count() == 3
+    memory.close()
+
+
+def test_appends_are_fsynced_in_batches(tmp_path, fsyncs):
+    memory = EpisodicMemory(str(tmp_path), fsync_every=3, fsync_interval=60)
+    memory.add_episode(_episode(0))
+    memory.add_episode(_episode(1))
+    assert fsyncs == []
+    memory.add_episode(_episode(2))
+    assert len(fsyncs) == 1
+
+    memory.add_episode(_episode(3))
+    memory.close()
+    assert len(fsyncs) == 2
+
+
+def test_last_batch_is_fsynced_when_appends_stop(tmp_path, fsyncs):
+    memory = EpisodicMemory(str(tmp_path), fsync_every=100, fsync_interval=0.05)
+    memory.add_episode(_episode(0))
+    memory.add_episode(_episode(1))
+    assert fsyncs == []
+
+    deadline = time.monotonic() + 5
+    while memory._unsynced and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert memory._unsynced == 0
+    assert len(fsyncs) == 1
+    memory.close()
+    assert len(fsyncs) == 1
+
+
+def test_failed_append_leaves_nothing_behind_for_the_retry(tmp_path, monkeypatch):
+    memory = EpisodicMemory(str(tmp_path), fsync_every=1)
+    memory.add_episode(_episode(0))
+    real_fsync = os.fsync
+
+    def failing_fsync(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "fsync", failing_fsync)
+    with pytest.raises(OSError):
+        memory.add_episodes([_episode(1), _episode(2)])
+    assert memory.count() == 1
+    assert memory.get_episode("1") is None
+
+    monkeypatch.setattr(os, "fsync", real_fsync)
+    assert memory.add_episodes([_episode(1), _episode(2)]) == ["1", "2"]
+    memory.close()
+
+    memory = EpisodicMemory(str(tmp_path))
+    assert [episode["id"] for episode in memory.episodes] == ["0", "1", "2"]
+    memory.close()
@@ -0,0 +1,123 @@
+import os
+import stat
+
+import pytest
+
+from core.tools.file_tools import read_file, write_file
+
+
+@pytest.fixture
+def lines_file(tmp_path):
+    path = tmp_path / "lines.txt"
+    path.write_text("".join(f"line {i}\n" for i in range(1, 101)))
+    return str(path)
+
+
+def test_head_and_line_ranges(lines_file):
+    assert read_file(lines_file, head=2)["content"] == "line 1\nline 2\n"
+    result = read_file(lines_file, start_line=99, end_line=200)
+    assert result["content"] == "line 99\nline 100\n"
+    assert result["offset"] == os.path.getsize(lines_file) - len("line 99\nline 100\n")
+    assert read_file(lines_file, start_line=100)["content"] == "line 100\n"
+    assert read_file(lines_file, start_line=500)["content"] == ""
+
+
+def test_tail(lines_file):
+    assert read_file(lines_file, tail=2)["content"] == "line 99\nline 100\n"
+    assert read_file(lines_file, tail=0)["content"] == ""
+    assert read_file(lines_file, tail=1000)["content"].startswith("line 1\n")
+
+
+def test_tail_without_trailing_newline(tmp_path):
+    path = tmp_path / "f.txt"
+    path.write_text("a\nb\nc")
+    assert read_file(str(path), tail=2)["content"] == "b\nc"
+
+
+def test_byte_range(lines_file):
+    result = read_file(lines_file, offset=5, length=3)
+    assert result["content"] == "1\nl"
+    assert result["bytes_read"] == 3
+    assert result["truncated"] is False
+    assert read_file(lines_file, offset=10_000)["content"] == ""
+
+
+def test_output_is_capped_at_max_bytes(lines_file):
+    result = read_file(lines_file, max_bytes=10)
+    assert result["content"] == "line 1\nlin"
+    assert result["truncated"] is True
+    assert result["size"] == os.path.getsize(lines_file)
+
+    result = read_file(lines_file, tail=50, max_bytes=16)
+    assert result["content"] == "ine 99\nline 100\n"
+    assert result["truncated"] is True
+
+    result = read_file(lines_file, start_line=10, end_line=90, max_bytes=8)
+    assert result["content"] == "line 10\n"
+    assert result["truncated"] is True
+
+
+def test_pattern_anchors_match_per_line(lines_file):
+    result = read_file(lines_file, pattern="^line 5")
+    assert result["content"].splitlines()[:2] == ["5:line 5", "50:line 50"]
+    assert result["matches"] == 11
+
+    result = read_file(lines_file, pattern="0$")
+    assert result["matches"] == 10
+    assert result["content"].splitlines()[0] == "10:line 10"
+
+    result = read_file(lines_file, pattern="^", max_matches=2)
+    assert result["content"] == "1:line 1\n2:line 2\n"
+    assert result["truncated"] is True
+
+    # The position after the final newline is not a line
+    assert read_file(lines_file, pattern="^")["matches"] == 100
+
+
+def test_pattern_line_numbers_with_sparse_matches(tmp_path, monkeypatch):
+    from core.tools import file_tools
+    # Small blocks exercise the block-wise newline count
+    monkeypatch.setattr(file_tools, "_SCAN_BLOCK", 7)
+    path = tmp_path / "sparse.txt"
+    path.write_text("".join("needle\n" if i in (3, 500, 999) else "hay\n" for i in range(1, 1001)))
+    assert read_file(str(path), pattern="needle")["content"] == "3:needle\n500:needle\n999:needle\n"
+    assert read_file(str(path), start_line=500, end_line=500)["content"] == "needle\n"
+
+
+def test_pattern_options_and_errors(lines_file):
+    assert read_file(lines_file, pattern="LINE 7$", ignore_case=True)["content"] == "7:line 7\n"
+    assert read_file(lines_file, pattern="^$")["matches"] == 0
+    result = read_file(lines_file, pattern="(")
+    assert result["success"] is False
+    assert "invalid pattern" in result["error"]
+
+    result = read_file(lines_file, pattern="line", max_bytes=20)
+    assert result["content"] == "1:line 1\n2:line 2\n"
+    assert result["truncated"] is True
+
+
+def test_empty_and_missing_files(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_text("")
+    assert read_file(str(path))["content"] == ""
+    assert read_file(str(path), pattern="x")["matches"] == 0
+    assert read_file(str(tmp_path / "missing.txt"))["success"] is False
+
+
+def test_write_modes(tmp_path):
+    path = str(tmp_path / "out" / "f.txt")
+    assert write_file(path, "hello")["size"] == 5
+    os.chmod(path, 0o640)
+    write_file(path, "héllo world", chunk_size=3)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert write_file(path, "!", mode="append")["size"] == len("héllo world!".encode())
+    write_file(path, "J", offset=0)
+    assert open(path, encoding="utf-8").read() == "Jéllo world!"
+    assert write_file(path, "x", mode="prepend")["success"] is False
+    assert not [name for name in os.listdir(tmp_path / "out") if name.startswith(".tmp-")]
+
+
+def test_write_bare_file_name(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert write_file("bare.txt", "x")["success"] is True
+    assert (tmp_path / "bare.txt").read_text() == "x"
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from core.learning.learning_engine import LearningEngine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return LearningEngine(str(tmp_path))
+
+
+def _detect(engine, message, embedding=None):
+    return engine.detect_pattern({"user_message": message}, embedding)
+
+
+def test_keywords_skip_short_and_common_words(engine):
+    assert engine._extract_keywords("Plot the weather forecast, with rainfall and humidity for Berlin today") == [
+        "plot", "weather", "forecast", "rainfall", "humidity"
+    ]
+    assert engine._extract_keywords("and the of a") == []
+
+
+def test_new_pattern_needs_two_keywords(engine):
+    assert _detect(engine, "hello") is None
+    assert _detect(engine, "Deploy the backend service") == "pattern_0"
+    assert engine.patterns[0]["keywords"] == ["deploy", "backend", "service"]
+
+
+def test_messages_join_the_best_matching_pattern(engine):
+    assert _detect(engine, "deploy backend service") == "pattern_0"
+    assert _detect(engine, "weather forecast berlin") == "pattern_1"
+    assert _detect(engine, "what's the forecast in Berlin?") == "pattern_1"
+    # Matching 2 of 3 keywords beats matching 1 of 3
+    assert _detect(engine, "deploy the forecast to the backend") == "pattern_0"
+    assert [pattern["frequency"] for pattern in engine.patterns] == [2, 2]
+
+
+def test_ties_go_to_the_more_frequent_pattern(engine):
+    _detect(engine, "python tutorial basics")
+    _detect(engine, "cookbook recipes guide")
+    _detect(engine, "cookbook recipes")
+    # One of three keywords each; pattern_1 has been seen twice
+    assert _detect(engine, "tutorial cookbook") == "pattern_1"
+
+
+def test_stored_keywords_with_punctuation_still_match(tmp_path):
+    engine = LearningEngine(str(tmp_path))
+    engine.patterns = [{"id": "pattern_0", "keywords": ["weather,", "forecast?"], "frequency": 1,
+                        "first_seen": "", "last_seen": ""}]
+    engine._save_patterns()
+
+    engine = LearningEngine(str(tmp_path))
+    assert _detect(engine, "the weather forecast") == "pattern_0"
+
+
+def test_patterns_survive_a_restart(tmp_path):
+    engine = LearningEngine(str(tmp_path))
+    _detect(engine, "deploy backend service")
+    _detect(engine, "deploy backend")
+    engine.flush()
+
+    engine = LearningEngine(str(tmp_path))
+    assert engine.patterns[0]["frequency"] == 2
+    assert _detect(engine, "backend service") == "pattern_0"
+
+
+def _clusters(path, **kwargs):
+    return LearningEngine(str(path), mode="clusters", **kwargs)
+
+
+def test_embeddings_join_the_nearest_cluster(tmp_path):
+    engine = _clusters(tmp_path, cluster_threshold=0.9)
+    assert _detect(engine, "no embedding") is None
+    assert _detect(engine, "deploy backend", [1.0, 0.0, 0.0]) == "cluster_0"
+    assert _detect(engine, "weather today", [0.0, 1.0, 0.0]) == "cluster_1"
+    assert _detect(engine, "deploy frontend", [0.95, 0.05, 0.0]) == "cluster_0"
+    assert engine.patterns[0]["keywords"] == ["deploy", "backend"]
+    assert engine.patterns[0]["frequency"] == 2
+    # The centroid moved towards the new member and stayed unit length
+    assert 0 < engine._centroids[0][1] < 0.05
+    assert np.linalg.norm(engine._centroids[0]) == pytest.approx(1.0)
+
+
+def test_full_engine_assigns_to_the_nearest_cluster(tmp_path):
+    engine = _clusters(tmp_path, cluster_threshold=0.99, max_patterns=2)
+    _detect(engine, "a", [1.0, 0.0])
+    _detect(engine, "b", [0.0, 1.0])
+    assert _detect(engine, "c", [0.4, 0.6]) == "cluster_1"
+    assert len(engine.patterns) == 2
+
+
+def test_clusters_reload_after_max_patterns_is_lowered(tmp_path):
+    engine = _clusters(tmp_path, cluster_threshold=0.99)
+    for i in range(4):
+        vector = [0.0] * 4
+        vector[i] = 1.0
+        _detect(engine, f"message {i}", vector)
+    engine.flush()
+
+    engine = _clusters(tmp_path, cluster_threshold=0.99, max_patterns=2)
+    assert [pattern["id"] for pattern in engine.patterns] == ["cluster_0", "cluster_1"]
+    assert engine._centroids.shape == (2, 4)
+    assert _detect(engine, "again", [0.0, 1.0, 0.0, 0.0]) == "cluster_1"
+    assert _detect(engine, "full", [0.0, 0.0, 0.0, 1.0]) in ("cluster_0", "cluster_1")
@@ -0,0 +1,163 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+pytest.importorskip("anthropic")
+pytest.importorskip("openai")
+
+from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI
+
+from core.llm.llm_client import LLMClient
+
+SYSTEM = [
+    {"type": "text", "text": "static prefix", "cache_control": {"type": "ephemeral"}},
+    {"type": "text", "text": "per-turn suffix"}
+]
+TOOLS = [{"name": "calculate", "description": "Evaluate", "input_schema": {"type": "object", "properties": {}}}]
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.fixture(autouse=True)
+def api_keys(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+
+def _client(provider, respond):
+    """An LLMClient whose SDK client sends requests to ``respond`` instead of the network"""
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return respond(request)
+
+    llm = LLMClient(provider=provider, max_retries=0)
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    sdk = AsyncAnthropic if provider == "anthropic" else AsyncOpenAI
+    llm.client = sdk(http_client=http_client, max_retries=0)
+    return llm, requests
+
+
+def _anthropic_message(**usage):
+    return httpx.Response(200, json={
+        "id": "msg_1", "type": "message", "role": "assistant", "model": "claude",
+        "content": [{"type": "text", "text": "hi"}],
+        "stop_reason": "end_turn", "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5, **usage}
+    })
+
+
+def test_anthropic_system_prompt_is_sent_as_cacheable_blocks():
+    llm, requests = _client("anthropic", lambda request: _anthropic_message(
+        cache_read_input_tokens=300, cache_creation_input_tokens=40
+    ))
+    result = asyncio.run(llm.generate_with_tools(MESSAGES, TOOLS, system=SYSTEM, tool_choice="auto"))
+
+    payload = requests[0]
+    assert payload["system"] == SYSTEM
+    assert payload["tools"] == TOOLS
+    assert payload["tool_choice"] == {"type": "auto"}
+    assert result["usage"] == {
+        "input_tokens": 10, "output_tokens": 5, "cache_read_input_tokens": 300, "cache_creation_input_tokens": 40
+    }
+    stats = llm.get_stats()
+    assert stats["cache_read_input_tokens"] == 300
+    assert stats["cache_hit_ratio"] == pytest.approx(300 / 350)
+
+
+def test_openai_gets_the_system_blocks_as_one_message():
+    llm, requests = _client("openai", lambda request: httpx.Response(200, json={
+        "id": "c1", "object": "chat.completion", "created": 0, "model": "gpt",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": "hi"}}],
+        "usage": {"prompt_tokens": 50, "completion_tokens": 7, "total_tokens": 57,
+                  "prompt_tokens_details": {"cached_tokens": 32}}
+    }))
+    result = asyncio.run(llm.generate_with_tools(MESSAGES, TOOLS, system=SYSTEM))
+
+    assert requests[0]["messages"][0] == {"role": "system", "content": "static prefix\n\nper-turn suffix"}
+    assert result["usage"]["cache_read_input_tokens"] == 32
+    assert result["usage"]["input_tokens"] == 18
+
+
+def _sse(events, named=True):
+    body = ""
+    for event in events:
+        if named:
+            body += f"event: {event['type']}\n"
+        body += f"data: {json.dumps(event)}\n\n"
+    return body
+
+
+async def _collect(llm, tools):
+    return [event async for event in llm.stream_with_tools(MESSAGES, tools, system=SYSTEM)]
+
+
+def test_anthropic_stream_records_usage_and_tool_calls():
+    events = [
+        {"type": "message_start", "message": {
+            "id": "msg_1", "type": "message", "role": "assistant", "model": "claude", "content": [],
+            "stop_reason": None, "stop_sequence": None,
+            "usage": {"input_tokens": 10, "output_tokens": 1, "cache_read_input_tokens": 300,
+                      "cache_creation_input_tokens": 0}}},
+        {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Let me check"}},
+        {"type": "content_block_stop", "index": 0},
+        {"type": "content_block_start", "index": 1,
+         "content_block": {"type": "tool_use", "id": "tu_1", "name": "calculate", "input": {}}},
+        {"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": '{"expression": '}},
+        {"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": '"1 + 1"}'}},
+        {"type": "content_block_stop", "index": 1},
+        {"type": "message_delta", "delta": {"stop_reason": "tool_use", "stop_sequence": None}, "usage": {"output_tokens": 12}},
+        {"type": "message_stop"}
+    ]
+    llm, requests = _client("anthropic", lambda request: httpx.Response(
+        200, text=_sse(events), headers={"content-type": "text/event-stream"}
+    ))
+    streamed = asyncio.run(_collect(llm, TOOLS))
+
+    assert requests[0]["stream"] is True
+    assert [event["type"] for event in streamed] == ["text_delta", "tool_use", "message"]
+    result = streamed[-1]["result"]
+    assert result["tool_calls"] == [{"id": "tu_1", "name": "calculate", "input": {"expression": "1 + 1"}}]
+    assert result["stop_reason"] == "tool_use"
+    assert result["usage"] == {
+        "input_tokens": 10, "output_tokens": 12, "cache_read_input_tokens": 300, "cache_creation_input_tokens": 0
+    }
+    stats = llm.get_stats()
+    assert (stats["calls"], stats["input_tokens"], stats["output_tokens"]) == (1, 10, 12)
+
+
+def test_openai_stream_asks_for_and_records_usage():
+    def chunk(delta=None, finish_reason=None, usage=None):
+        return {
+            "id": "c1", "object": "chat.completion.chunk", "created": 0, "model": "gpt",
+            "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            "usage": usage
+        }
+
+    chunks = [
+        chunk({"role": "assistant", "content": "Hel"}),
+        chunk({"content": "lo"}),
+        chunk({}, finish_reason="stop"),
+        chunk(usage={"prompt_tokens": 50, "completion_tokens": 7, "total_tokens": 57,
+                     "prompt_tokens_details": {"cached_tokens": 32}})
+    ]
+    body = _sse(chunks, named=False) + "data: [DONE]\n\n"
+    llm, requests = _client("openai", lambda request: httpx.Response(
+        200, text=body, headers={"content-type": "text/event-stream"}
+    ))
+    streamed = asyncio.run(_collect(llm, []))
+
+    assert requests[0]["stream_options"] == {"include_usage": True}
+    assert "".join(event["text"] for event in streamed if event["type"] == "text_delta") == "Hello"
+    result = streamed[-1]["result"]
+    assert result["stop_reason"] == "end_turn"
+    assert result["usage"] == {
+        "input_tokens": 18, "output_tokens": 7, "cache_read_input_tokens": 32, "cache_creation_input_tokens": 0
+    }
+    stats = llm.get_stats()
+    assert (stats["calls"], stats["input_tokens"], stats["output_tokens"]) == (1, 18, 7)
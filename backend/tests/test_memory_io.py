@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pytest
+
+from core.learning.learning_engine import LearningEngine
+from core.memory.embedder import Embedder
+from core.memory.episodic import EpisodicMemory
+from core.memory.memory_io import export_memories, export_state, import_memories, import_state
+from core.memory.vector_store import VectorMemory
+from core.storage.sqlite_store import SQLiteStore
+
+
+class _Model:
+    def encode(self, texts, **kwargs):
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha1(text.encode()).digest()[:4], "little")
+            vector = np.random.default_rng(seed).standard_normal(16)
+            vectors.append(vector / np.linalg.norm(vector))
+        return np.array(vectors, dtype=np.float32)
+
+
+def _vector_memory(data_dir):
+    embedder = Embedder()
+    embedder._model = _Model()
+    return VectorMemory(os.path.join(data_dir, "memory"), backend="numpy", embedder=embedder)
+
+
+@pytest.fixture
+def source(tmp_path):
+    data_dir = str(tmp_path / "source")
+    episodic = EpisodicMemory(os.path.join(data_dir, "episodic"))
+    episodic.add_episodes([{"user_message": f"question {i}", "agent_response": f"answer {i}",
+                            "tools_used": ["calculate"]} for i in range(5)])
+    episodic.close()
+
+    engine = LearningEngine(os.path.join(data_dir, "learning"))
+    engine.detect_pattern({"user_message": "deploy backend service"})
+    engine.detect_pattern({"user_message": "weather forecast berlin"})
+    engine.detect_pattern({"user_message": "deploy the backend"})
+    engine.learn_skills([("calculate", {"tool": "calculate"}), ("web_search", {"tool": "web_search"})])
+    engine.flush()
+
+    memory = _vector_memory(data_dir)
+    memory.add_memories(["the sky is blue", "grass is green", "snow is white"], [{"n": i} for i in range(3)])
+    memory.close()
+    return data_dir
+
+
+def _export(source, tmp_path):
+    out = str(tmp_path / "export")
+    memory = _vector_memory(source)
+    try:
+        export_memories(memory, out)
+    finally:
+        memory.close()
+    assert export_state(source, out) == {"episodes": 5, "patterns": 2, "clusters": 0, "skills": 2}
+    return out
+
+
+def _import(out, data_dir, store=None):
+    memory = _vector_memory(data_dir)
+    try:
+        memories = import_memories(memory, out)
+    finally:
+        memory.close()
+    return memories, import_state(out, data_dir, store)
+
+
+def _snapshot(data_dir, store=None):
+    episodic = EpisodicMemory(os.path.join(data_dir, "episodic"), store=store)
+    engine = LearningEngine(os.path.join(data_dir, "learning"), store=store)
+    memory = _vector_memory(data_dir)
+    try:
+        return {
+            "episodes": episodic.get_recent_episodes(100),
+            "patterns": engine.get_patterns(),
+            "skills": engine.get_skills(),
+            "memories": sorted((m["id"], m["content"], json.dumps(m["metadata"], sort_keys=True))
+                               for m in memory.get_all_memories()),
+        }
+    finally:
+        episodic.close()
+        engine.flush()
+        memory.close()
+
+
+def _read(path, name):
+    with open(os.path.join(path, name)) as f:
+        if name.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def test_round_trip_into_an_empty_json_data_dir(source, tmp_path):
+    out = _export(source, tmp_path)
+    target = str(tmp_path / "target")
+
+    memories, state = _import(out, target)
+    assert memories["imported"] == 3
+    assert state == {"episodes": {"imported": 5, "skipped": 0}, "patterns": {"imported": 2, "skipped": 0},
+                     "clusters": {"imported": 0, "skipped": 0}, "skills": {"imported": 2, "skipped": 0}}
+    assert _snapshot(target) == _snapshot(source)
+
+    # New episodes continue after the imported ids
+    episodic = EpisodicMemory(os.path.join(target, "episodic"))
+    assert episodic.add_episode({"user_message": "new", "agent_response": "turn"}) == "5"
+    episodic.close()
+
+
+def test_round_trip_into_sqlite(source, tmp_path):
+    out = _export(source, tmp_path)
+    target = str(tmp_path / "target")
+    store = SQLiteStore(os.path.join(target, "nexus.db"))
+    try:
+        _, state = _import(out, target, store)
+        assert {kind: count["imported"] for kind, count in state.items()} == {
+            "episodes": 5, "patterns": 2, "clusters": 0, "skills": 2}
+        expected = _snapshot(source)
+        del expected["memories"]
+        actual = _snapshot(target, store)
+        del actual["memories"]
+        assert actual == expected
+
+        # Exporting from SQLite gives back the same files
+        again = str(tmp_path / "again")
+        assert export_state(target, again, store) == {"episodes": 5, "patterns": 2, "clusters": 0, "skills": 2}
+        assert _read(again, "episodic/episodes.jsonl") == _read(out, "episodic/episodes.jsonl")
+        for name in ("learning/patterns.json", "learning/skills.json"):
+            assert _read(again, name) == _read(out, name)
+    finally:
+        store.close()
+
+
+def test_reimport_skips_existing_rows(source, tmp_path):
+    out = _export(source, tmp_path)
+    target = str(tmp_path / "target")
+    _import(out, target)
+    before = _snapshot(target)
+
+    memories, state = _import(out, target)
+    assert memories["imported"] == 0
+    assert state == {"episodes": {"imported": 0, "skipped": 5}, "patterns": {"imported": 0, "skipped": 2},
+                     "clusters": {"imported": 0, "skipped": 0}, "skills": {"imported": 0, "skipped": 2}}
+    assert _snapshot(target) == before
+
+
+def test_reimport_into_sqlite_skips_existing_rows(source, tmp_path):
+    out = _export(source, tmp_path)
+    store = SQLiteStore(str(tmp_path / "nexus.db"))
+    try:
+        import_state(out, str(tmp_path / "target"), store)
+        state = import_state(out, str(tmp_path / "target"), store)
+        assert {kind: count["imported"] for kind, count in state.items()} == {
+            "episodes": 0, "patterns": 0, "clusters": 0, "skills": 0}
+        assert store.count_episodes() == 5
+    finally:
+        store.close()
+
+
+def test_cluster_centroids_travel_with_the_clusters(tmp_path):
+    source = str(tmp_path / "source")
+    engine = LearningEngine(os.path.join(source, "learning"), mode="clusters")
+    engine.detect_pattern({"user_message": "first topic"}, [1.0, 0.0, 0.0])
+    engine.detect_pattern({"user_message": "second topic"}, [0.0, 1.0, 0.0])
+    engine.flush()
+
+    out = str(tmp_path / "export")
+    assert export_state(source, out)["clusters"] == 2
+    target = str(tmp_path / "target")
+    assert import_state(out, target)["clusters"] == {"imported": 2, "skipped": 0}
+
+    engine = LearningEngine(os.path.join(target, "learning"), mode="clusters")
+    assert engine.detect_pattern({"user_message": "more"}, [0.0, 0.9, 0.1]) == "cluster_1"
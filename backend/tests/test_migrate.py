@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.storage.migrate import migrate
+from core.storage.sqlite_store import SQLiteStore
+
+
+def _pattern(pattern_id):
+    return {"id": pattern_id, "keywords": ["python"], "frequency": 2,
+            "first_seen": "2026-01-01T00:00:00", "last_seen": "2026-01-02T00:00:00"}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    episodic = tmp_path / "episodic"
+    learning = tmp_path / "learning"
+    episodic.mkdir()
+    learning.mkdir()
+    episodes = [{"id": str(i), "timestamp": "2026-01-01", "user_message": f"q{i}", "agent_response": "a",
+                 "tools_used": [], "context": {}} for i in range(3)]
+    (episodic / "episodes.jsonl").write_text("".join(json.dumps(e) + "\n" for e in episodes) + "not json\n")
+    (learning / "patterns.json").write_text(json.dumps([_pattern("pattern_0"), _pattern("pattern_1")]))
+    (learning / "clusters.json").write_text(json.dumps([_pattern("cluster_0")]))
+    np.save(learning / "centroids.npy", np.ones((1, 4), dtype=np.float64))
+    skill = {"level": 1, "uses": 3, "success_rate": 1.0, "created": "2026-01-01", "data": {}}
+    (learning / "skills.json").write_text(json.dumps({"calculate": skill, "read_file": skill}))
+    return tmp_path
+
+
+def test_migrate_imports_everything(data_dir):
+    db_path = str(data_dir / "nexus.db")
+    counts = migrate(str(data_dir), db_path, batch_size=2)
+
+    assert counts == {
+        "episodes": {"imported": 3, "skipped": 0},
+        "patterns": {"imported": 2, "skipped": 0},
+        "clusters": {"imported": 1, "skipped": 0},
+        "skills": {"imported": 2, "skipped": 0},
+    }
+    store = SQLiteStore(db_path)
+    try:
+        (cluster, centroid), = store.load_patterns("clusters")
+        assert np.frombuffer(centroid, dtype=np.float32).tolist() == [1.0] * 4
+    finally:
+        store.close()
+
+
+def test_rerun_reports_everything_skipped(data_dir):
+    db_path = str(data_dir / "nexus.db")
+    migrate(str(data_dir), db_path)
+    counts = migrate(str(data_dir), db_path)
+
+    assert all(count["imported"] == 0 for count in counts.values())
+    assert counts["episodes"]["skipped"] == 3
+    assert counts["patterns"]["skipped"] == 2
+    assert counts["clusters"]["skipped"] == 1
+    assert counts["skills"]["skipped"] == 2
+
+    store = SQLiteStore(db_path)
+    try:
+        assert store.count_episodes() == 3
+        assert len(store.load_patterns("keywords")) == 2
+    finally:
+        store.close()
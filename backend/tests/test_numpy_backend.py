@@ -0,0 +1,182 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.memory.numpy_backend import NumpyBackend
+
+
+def _unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "memory")
+
+
+@pytest.fixture
+def backend(directory):
+    backend = NumpyBackend(directory, initial_capacity=2)
+    yield backend
+    backend.close()
+
+
+def _add(backend, ids, vectors):
+    backend.add(ids, np.stack(vectors), [f"doc {i}" for i in ids], [{"n": i} for i in ids])
+
+
+def test_add_query_grow_and_reopen(directory, backend):
+    _add(backend, ["a", "b", "c"], [_unit(1, 0, 0), _unit(0, 1, 0), _unit(1, 1, 0)])
+    results = backend.query(_unit(1, 0.1, 0), 2)
+    assert [r["id"] for r in results] == ["a", "c"]
+    assert results[0]["content"] == "doc a"
+    assert results[0]["metadata"] == {"n": "a"}
+    assert results[0]["distance"] < results[1]["distance"]
+    backend.close()
+
+    reopened = NumpyBackend(directory)
+    try:
+        assert reopened.count() == 3
+        assert [r["id"] for r in reopened.query(_unit(0, 1, 0), 1)] == ["b"]
+    finally:
+        reopened.close()
+
+
+def test_dimension_mismatch_is_rejected(backend):
+    _add(backend, ["a"], [_unit(1, 0, 0)])
+    with pytest.raises(ValueError, match="dimension"):
+        _add(backend, ["b"], [_unit(1, 0)])
+    assert backend.count() == 1
+
+
+def test_delete_hides_rows_and_compact_renumbers(backend):
+    _add(backend, ["a", "b", "c"], [_unit(1, 0, 0), _unit(0, 1, 0), _unit(0, 0, 1)])
+    backend.delete(["a", "missing"])
+    assert backend.count() == 2
+    assert "a" not in [r["id"] for r in backend.query(_unit(1, 0, 0), 3)]
+
+    backend.compact()
+    assert backend.count() == 2
+    assert [r["id"] for r in backend.query(_unit(0, 0, 1), 1)] == ["c"]
+    assert [r["id"] for r in backend.get(["b", "c"])] == ["b", "c"]
+    batches = list(backend.iter_batches(batch_size=1))
+    assert [rows[0]["id"] for rows, _ in batches] == ["b", "c"]
+    assert np.allclose(batches[1][1][0], _unit(0, 0, 1))
+
+
+def test_delete_many_ids(backend):
+    ids = [str(i) for i in range(2000)]
+    _add(backend, ids, [_unit(1, i, 0) for i in range(2000)])
+    backend.delete(ids[:1500])
+    assert backend.count() == 500
+
+
+def test_compaction_between_scoring_and_lookup_is_retried(directory, backend):
+    _add(backend, ["a", "b", "c"], [_unit(1, 0, 0), _unit(0, 1, 0), _unit(0, 0, 1)])
+    other = NumpyBackend(directory)
+    rank = backend._rank
+    calls = []
+
+    def rank_then_compact(*args):
+        result = rank(*args)
+        if not calls:
+            # Another worker deletes and compacts while this query is scoring
+            other.delete(["a"])
+            other.compact()
+        calls.append(1)
+        return result
+
+    backend._rank = rank_then_compact
+    try:
+        results = backend.query(_unit(0, 0, 1), 1)
+        assert [r["id"] for r in results] == ["c"]
+        assert results[0]["distance"] == pytest.approx(0.0, abs=1e-6)
+        assert len(calls) == 2
+    finally:
+        other.close()
+
+
+def test_clear_renumbers_for_queries_in_flight(directory, backend):
+    _add(backend, ["a", "b"], [_unit(1, 0, 0), _unit(0, 1, 0)])
+    other = NumpyBackend(directory)
+    rank = backend._rank
+    calls = []
+
+    def rank_then_replace(*args):
+        result = rank(*args)
+        if not calls:
+            other.clear()
+            _add(other, ["x", "y"], [_unit(0, 0, 1), _unit(0, 1, 1)])
+        calls.append(1)
+        return result
+
+    backend._rank = rank_then_replace
+    try:
+        results = backend.query(_unit(1, 0, 0), 1)
+        # Slot 0 now holds "x"; the stale score for "a" must not be attached to it
+        assert results and results[0]["id"] in {"x", "y"}
+        assert results[0]["distance"] == pytest.approx(1.0, abs=1e-6)
+    finally:
+        other.close()
+
+
+def test_mapping_is_read_only_and_sees_other_writers(directory, backend):
+    _add(backend, ["a"], [_unit(1, 0, 0)])
+    assert backend._vectors.mode == "r"
+    assert not backend._vectors.flags.writeable
+
+    other = NumpyBackend(directory)
+    try:
+        # Fits the current file, so it is written in place
+        _add(other, ["b"], [_unit(0, 1, 0)])
+        assert [r["id"] for r in backend.query(_unit(0, 1, 0), 1)] == ["b"]
+    finally:
+        other.close()
+
+
+def test_replaced_files_are_removed(directory, backend):
+    _add(backend, ["a", "b", "c"], [_unit(1, 0, 0), _unit(0, 1, 0), _unit(0, 0, 1)])
+    backend.delete(["a"])
+    backend.compact()
+    assert [name for name in os.listdir(directory) if name.startswith("vectors")] == [
+        os.path.basename(backend._vectors_file(backend._seen["file"]))
+    ]
+
+
+def test_crash_before_compaction_commits_leaves_the_store_consistent(directory, backend):
+    _add(backend, ["a", "b", "c"], [_unit(1, 0, 0), _unit(0, 1, 0), _unit(0, 0, 1)])
+    backend.delete(["a"])
+
+    def crash(**values):
+        raise OSError("power loss")
+
+    backend._set_state = crash
+    with pytest.raises(OSError):
+        backend.compact()
+    backend.close()
+
+    reopened = NumpyBackend(directory)
+    try:
+        assert reopened.count() == 2
+        assert [r["id"] for r in reopened.query(_unit(0, 0, 1), 1)] == ["c"]
+        assert [r["id"] for r in reopened.query(_unit(0, 1, 0), 1)] == ["b"]
+        # The half-written file is simply overwritten by the next compaction
+        reopened.compact()
+        assert [r["id"] for r in reopened.query(_unit(0, 0, 1), 1)] == ["c"]
+    finally:
+        reopened.close()
+
+
+def test_backends_must_implement_the_whole_interface():
+    from core.memory.vector_backend import VectorBackend
+
+    class Partial(VectorBackend):
+        def add(self, ids, embeddings, documents, metadatas):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+    assert isinstance(NumpyBackend.__new__(NumpyBackend), VectorBackend)
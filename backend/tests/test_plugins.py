@@ -0,0 +1,97 @@
+import json
+import sys
+
+import pytest
+
+from core.tools.plugins import LazyFunction, discover_directory, discover_plugins, read_manifest
+
+PLUGIN = """
+LOADS = globals().get("LOADS", 0) + 1
+calls = []
+
+def greet(name):
+    calls.append(name)
+    return {"greeting": f"hello {name}", "loads": LOADS}
+
+def count():
+    return len(calls)
+"""
+
+
+def _tool(name, function, **extra):
+    return {"name": name, "description": name, "parameters": {"type": "object"}, "function": function, **extra}
+
+
+@pytest.fixture
+def plugin_dir(tmp_path):
+    (tmp_path / "tools.py").write_text(PLUGIN)
+    manifest = {"tools": [_tool("greet", "tools.py:greet"), _tool("count", "tools.py:count", pure=False)]}
+    (tmp_path / "greeting.json").write_text(json.dumps(manifest))
+    yield tmp_path
+    for name in [name for name in sys.modules if name.startswith("nexus_plugin_tools_")]:
+        del sys.modules[name]
+
+
+def test_functions_are_imported_on_first_call(plugin_dir):
+    specs = discover_directory(str(plugin_dir))[str(plugin_dir / "greeting.json")]
+    greet = specs[0]["function"]
+    assert isinstance(greet, LazyFunction)
+    assert not [name for name in sys.modules if name.startswith("nexus_plugin_tools_")]
+    assert greet(name="ada")["greeting"] == "hello ada"
+
+
+def test_tools_from_one_file_share_one_module(plugin_dir):
+    specs = read_manifest(json.loads((plugin_dir / "greeting.json").read_text()), str(plugin_dir))
+    greet, count = specs[0]["function"], specs[1]["function"]
+    assert greet(name="a")["loads"] == 1
+    greet(name="b")
+    # A second manifest naming the same file also reuses it
+    again = read_manifest([_tool("greet2", "tools.py:greet")], str(plugin_dir))[0]["function"]
+    assert again(name="c")["loads"] == 1
+    assert count() == 3
+
+
+def test_import_errors_surface_on_call_and_are_retried(plugin_dir):
+    (plugin_dir / "broken.py").write_text("raise RuntimeError('boom')\n")
+    broken = LazyFunction("broken.py:run", str(plugin_dir))
+    with pytest.raises(RuntimeError):
+        broken()
+    assert not [name for name in sys.modules if name.startswith("nexus_plugin_broken_")]
+
+    missing = LazyFunction("tools.py:nope", str(plugin_dir))
+    with pytest.raises(AttributeError):
+        missing()
+
+
+def test_module_targets_and_dotted_attributes():
+    join = LazyFunction("os:path.join")
+    assert join.resolve() is __import__("os").path.join
+    assert repr(join) == "LazyFunction('os:path.join')"
+    with pytest.raises(TypeError):
+        LazyFunction("os:sep").resolve()
+    with pytest.raises(ValueError):
+        LazyFunction("os")
+
+
+@pytest.mark.parametrize("manifest, message", [
+    ({"tool": []}, "a manifest must be"),
+    ([{"name": "x"}], "each tool needs"),
+    ([_tool("x", "m:f", colour="red")], "unknown keys"),
+    ([_tool(["x"], "m:f")], "non-empty string"),
+])
+def test_bad_manifests_are_rejected(manifest, message):
+    with pytest.raises(ValueError, match=message):
+        read_manifest(manifest)
+
+
+def test_bad_manifest_file_is_skipped(plugin_dir):
+    (plugin_dir / "bad.json").write_text("{not json")
+    found = discover_plugins([str(plugin_dir)], entry_points=False)
+    assert list(found) == [str(plugin_dir / "greeting.json")]
+
+
+def test_callables_pass_through():
+    def function():
+        return 1
+
+    assert read_manifest([_tool("f", function)])[0]["function"] is function
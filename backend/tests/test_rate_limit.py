@@ -0,0 +1,61 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from core.llm.rate_limit import TokenBucket, backoff_delay, parse_retry_after
+
+
+def test_retry_after_seconds_and_milliseconds():
+    assert parse_retry_after({"retry-after": "3"}) == 3.0
+    assert parse_retry_after({"retry-after-ms": "250", "retry-after": "3"}) == 0.25
+    assert parse_retry_after({"retry-after-ms": "soon", "retry-after": "2"}) == 2.0
+
+
+def test_retry_after_missing_or_unparseable():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after({}) is None
+    assert parse_retry_after({"retry-after": "tomorrow"}) is None
+
+
+def test_retry_after_http_date_with_zone():
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    delay = parse_retry_after({"retry-after": format_datetime(when, usegmt=True)})
+    assert 25 <= delay <= 31
+
+
+def test_retry_after_http_date_with_unknown_zone_is_utc():
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    header = when.strftime("%a, %d %b %Y %H:%M:%S -0000")
+    assert 25 <= parse_retry_after({"retry-after": header}) <= 31
+    # A date in the past means retry now
+    assert parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 -0000"}) == 0.0
+
+
+def test_backoff_is_capped_and_respects_retry_after():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=0.5, cap=4.0) <= 4.0
+    assert backoff_delay(0, base=0.5, cap=30.0, retry_after=7.0) >= 7.0
+    assert backoff_delay(0, base=0.5, cap=5.0, retry_after=60.0) == 5.0
+
+
+def test_token_bucket_allows_burst_then_paces():
+    async def run():
+        bucket = TokenBucket(rate=50, capacity=2)
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(run())
+    # Two from the burst, then two at 50/s
+    assert 0.03 <= elapsed < 0.5
+
+
+def test_token_bucket_without_rate_never_waits():
+    async def run():
+        bucket = TokenBucket(rate=0)
+        for _ in range(1000):
+            await bucket.acquire()
+
+    asyncio.run(run())
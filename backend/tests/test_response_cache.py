@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from core.memory import response_cache
+from core.memory.response_cache import ResponseCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(response_cache, "time", clock)
+    return clock
+
+
+def test_hit_within_distance_and_miss_beyond():
+    cache = ResponseCache(max_distance=0.05, max_entries=4)
+    cache.store([1.0, 0.0], "hi", "hello")
+
+    assert cache.lookup([1.0, 0.01])["response"] == "hello"
+    assert cache.lookup([0.0, 1.0]) is None
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_expired_near_duplicate_does_not_hide_fresh_match(clock):
+    cache = ResponseCache(max_distance=0.05, ttl=10.0, max_entries=4)
+    cache.store([1.0, 0.0], "old", "stale answer")
+    clock.now += 8
+    cache.store([1.0, 0.02], "new", "fresh answer")
+    clock.now += 5
+
+    hit = cache.lookup([1.0, 0.0])
+    assert hit["response"] == "fresh answer"
+    stats = cache.get_stats()
+    assert stats["expirations"] == 1
+    assert stats["size"] == 1
+
+
+def test_lru_entry_is_evicted_when_full():
+    cache = ResponseCache(max_entries=2)
+    cache.store([1.0, 0.0, 0.0], "a", "A")
+    cache.store([0.0, 1.0, 0.0], "b", "B")
+    cache.lookup([1.0, 0.0, 0.0])
+    cache.store([0.0, 0.0, 1.0], "c", "C")
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.0])["response"] == "A"
+    assert cache.get_stats()["evictions"] == 1
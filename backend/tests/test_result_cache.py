@@ -0,0 +1,95 @@
+from core.tools import result_cache
+from core.tools.result_cache import ToolResultCache, canonical_input, input_key, result_size
+
+
+def test_canonical_input_ignores_key_order():
+    assert canonical_input({"b": 1, "a": [1, 2]}) == canonical_input({"a": [1, 2], "b": 1})
+    assert canonical_input({"a": object()}) is None
+
+
+def test_input_key_is_a_fixed_size_digest():
+    key = input_key({"expression": "x", "variables": {"x": list(range(10000))}})
+    assert len(key) == 64
+    assert key == input_key({"variables": {"x": list(range(10000))}, "expression": "x"})
+    assert key != input_key({"expression": "x", "variables": {"x": list(range(9999))}})
+    assert input_key({"x": list(range(1000))}, max_bytes=100) is None
+    assert input_key({"a": object()}) is None
+
+
+def test_hit_miss_and_per_tool_stats():
+    cache = ToolResultCache()
+    assert cache.get("calc", "k") == (False, None)
+    cache.put("calc", "k", {"result": 1})
+    assert cache.get("calc", "k") == (True, {"result": 1})
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    assert stats["tools"]["calc"]["stores"] == 1
+
+
+def test_lru_eviction_by_count():
+    cache = ToolResultCache(max_entries=2)
+    cache.put("t", "a", 1)
+    cache.put("t", "b", 2)
+    cache.get("t", "a")
+    cache.put("t", "c", 3)
+    assert cache.get("t", "b") == (False, None)
+    assert cache.get("t", "a") == (True, 1)
+    assert cache.get_stats()["tools"]["t"]["evictions"] == 1
+
+
+def test_eviction_by_bytes_and_oversized_results():
+    cache = ToolResultCache(max_entries=100, max_bytes=1000, max_entry_bytes=400)
+    for i in range(5):
+        assert cache.put("t", f"k{i}", "x" * 300) is True
+    stats = cache.get_stats()
+    assert stats["bytes"] <= 1000
+    assert stats["size"] == 3
+    assert cache.get("t", "k4")[0] is True
+
+    assert cache.put("t", "big", "x" * 500) is False
+    assert cache.get("t", "big") == (False, None)
+    assert cache.get_stats()["tools"]["t"]["too_large"] == 1
+
+
+def test_results_that_cannot_be_sized_are_not_cached():
+    cache = ToolResultCache()
+    circular = []
+    circular.append(circular)
+    assert cache.put("t", "k", {"value": 10 ** 5000}) is False
+    assert cache.put("t", "c", circular) is False
+    assert cache.get("t", "k") == (False, None)
+    assert cache.get_stats()["tools"]["t"]["unsizable"] == 2
+
+
+def test_replacing_an_entry_does_not_leak_bytes():
+    cache = ToolResultCache(max_bytes=10000)
+    for _ in range(10):
+        cache.put("t", "k", "x" * 100)
+    assert cache.get_stats()["bytes"] == len("k") + result_size("x" * 100)
+    cache.clear()
+    assert cache.get_stats()["bytes"] == 0
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache = ToolResultCache()
+    cache.put("search", "q", "result", ttl=10)
+    now[0] += 5
+    assert cache.get("search", "q")[0] is True
+    now[0] += 6
+    assert cache.get("search", "q")[0] is False
+    assert cache.get_stats()["tools"]["search"]["expirations"] == 1
+    assert cache.get_stats()["bytes"] == 0
+
+
+def test_invalidate_drops_only_that_tool():
+    cache = ToolResultCache()
+    cache.put("read", "a", 1)
+    cache.put("read", "b", 2)
+    cache.put("calc", "a", 3)
+    cache.invalidate("read")
+    cache.invalidate("unknown")
+    assert cache.get("read", "a")[0] is False
+    assert cache.get("calc", "a") == (True, 3)
+    assert cache.get_stats()["tools"]["read"]["invalidations"] == 2
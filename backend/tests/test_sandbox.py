@@ -0,0 +1,104 @@
+import pytest
+
+from core.tools.sandbox import SandboxPool, _BoundedWriter, _run_code
+
+
+def test_run_code_captures_output_and_variables():
+    result = _run_code("import math\nx = 2\nprint('hi', x)", max_output=1000)
+    assert result["success"] is True
+    assert result["stdout"] == "hi 2\n"
+    # Modules and dunders are left out of the variables
+    assert result["result"] == "{'x': 2}"
+
+
+def test_run_code_reports_errors_and_survives_system_exit():
+    result = _run_code("y = 1\n1 / 0", max_output=1000)
+    assert result["success"] is False
+    assert result["error"].startswith("ZeroDivisionError")
+    assert "Traceback" in result["stderr"]
+    assert result["result"] == "{'y': 1}"
+
+    assert _run_code("raise SystemExit(3)", max_output=1000)["error"] == "SystemExit: 3"
+    assert _run_code("def f(:", max_output=1000)["error"].startswith("SyntaxError")
+
+
+def test_outputs_are_capped():
+    result = _run_code("print('x' * 100)\ns = 'y' * 100", max_output=10)
+    assert result["stdout"] == "x" * 10
+    assert len(result["result"]) == 10
+    assert result["truncated"] is True
+
+
+def test_bounded_writer_keeps_the_first_characters():
+    writer = _BoundedWriter(5)
+    assert writer.write("abc") == 3
+    writer.write("defg")
+    writer.write("h")
+    assert writer.getvalue() == "abcde"
+    assert writer.truncated is True
+
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool(workers=1, timeout=5.0, memory_mb=0, max_jobs=3, preload=())
+    yield pool
+    pool.close()
+
+
+def test_pool_runs_snippets_in_fresh_namespaces(pool):
+    assert pool.run("a = 1")["result"] == "{'a': 1}"
+    result = pool.run("print(a)")
+    assert result["success"] is False
+    assert "NameError" in result["error"]
+
+
+def test_pool_replaces_timed_out_and_crashed_workers(pool):
+    result = pool.run("while True: pass", timeout=0.5)
+    assert result == {"success": False, "error": "Execution timed out after 0.5s"}
+    assert pool.run("import os\nos.kill(os.getpid(), 9)")["error"].startswith("Sandbox worker exited (SIGKILL)")
+    assert pool.run("print(1)")["stdout"] == "1\n"
+
+    stats = pool.get_stats()
+    assert stats["timeouts"] == 1
+    assert stats["crashes"] == 1
+    assert stats["started"] == 3
+
+
+def test_pool_recycles_workers_after_max_jobs(pool):
+    for _ in range(4):
+        assert pool.run("pass")["success"] is True
+    stats = pool.get_stats()
+    assert stats["recycled"] == 1
+    assert stats["started"] == 2
+
+
+def test_closed_pool_rejects_runs(pool):
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.run("pass")
+
+
+def test_pool_jobs_do_not_leak_into_later_jobs(pool):
+    assert pool.run("import builtins, tempfile\nbuiltins.len = lambda x: 0\ntempfile.gettempdir = None\n"
+                    "__builtins__['print'] = None")["success"] is True
+    assert pool.run("import tempfile\nprint(len([1, 2]), callable(tempfile.gettempdir))")["stdout"] == "2 True\n"
+
+    assert pool.run("import os\nopen('scratch.txt', 'w').write('x')\nos.environ['LEAK'] = '1'\n"
+                    "os.chdir('/')")["success"] is True
+    result = pool.run("import os\nprint(os.environ.get('LEAK'), os.listdir('.'), os.getcwd() != '/')")
+    assert result["stdout"] == "None [] True\n"
+    # Only max_jobs recycled the worker
+    assert pool.get_stats()["recycled"] == 1
+
+
+def test_pool_replaces_workers_after_new_imports(pool):
+    assert pool.run("import colorsys")["success"] is True
+    assert pool.run("import sys\nprint('colorsys' in sys.modules)")["stdout"] == "False\n"
+    stats = pool.get_stats()
+    assert stats["recycled"] == 1
+    assert stats["started"] == 2
+
+
+def test_pool_reports_unnamed_signals_by_number(pool):
+    result = pool.run("import os\nos.kill(os.getpid(), 40)")
+    assert result["error"].startswith("Sandbox worker exited (signal 40)")
@@ -0,0 +1,90 @@
+import pytest
+
+from core.tools.schema import SchemaError, compile_schema
+
+
+def _validator(properties, **extra):
+    return compile_schema({"type": "object", "properties": properties, **extra})
+
+
+def test_types_and_required():
+    validate = _validator({"code": {"type": "string"}, "n": {"type": "integer"}}, required=["code"])
+    assert validate({"code": "x", "n": 2}) is None
+    # JSON has one number type
+    assert validate({"code": "x", "n": 2.0}) is None
+    assert validate({}) == "input is missing required property 'code'"
+    assert validate({"code": 1}) == "code must be string"
+    assert validate({"code": "x", "n": True}) == "n must be integer"
+    assert validate([]) == "input must be object"
+
+
+def test_nested_paths_in_messages():
+    validate = _validator({"points": {"type": "array", "items": {
+        "type": "object", "properties": {"x": {"type": "number"}}
+    }}})
+    assert validate({"points": [{"x": 1}, {"x": "a"}]}) == "points[1].x must be number"
+
+
+def test_enum_const_and_bool_vs_number():
+    validate = _validator({"mode": {"enum": ["overwrite", "append"]}, "flag": {"const": 1}})
+    assert validate({"mode": "append", "flag": 1.0}) is None
+    assert "must be one of 'overwrite', 'append'" in validate({"mode": "prepend"})
+    assert validate({"flag": True}) is not None
+
+
+def test_bounds_lengths_and_patterns():
+    validate = _validator({
+        "n": {"type": "integer", "minimum": 1, "exclusiveMaximum": 10},
+        "name": {"type": "string", "minLength": 2, "maxLength": 4, "pattern": "^[a-z]+$"},
+        "tags": {"type": "array", "maxItems": 2},
+    })
+    assert validate({"n": 9, "name": "abc", "tags": []}) is None
+    assert validate({"n": 0}) == "n must be >= 1"
+    assert validate({"n": 10}) == "n must be < 10"
+    assert validate({"name": "a"}) == "name must be between 2 and 4 characters"
+    assert validate({"name": "ABC"}) == "name does not match '^[a-z]+$'"
+    assert validate({"tags": [1, 2, 3]}) == "tags must have at most 2 items"
+
+
+def test_additional_properties():
+    closed = _validator({"a": {"type": "string"}}, additionalProperties=False)
+    assert closed({"a": "x"}) is None
+    assert closed({"a": "x", "b": 1}) == "input has unexpected property 'b'"
+
+    typed = compile_schema({"type": "object", "additionalProperties": {
+        "anyOf": [{"type": "number"}, {"type": "array", "items": {"type": "number"}}]
+    }})
+    assert typed({"x": 1, "y": [1, 2]}) is None
+    assert typed({"x": "1"}) == "x must match at least one of the allowed schemas"
+
+
+def test_one_of_and_all_of():
+    validate = _validator({
+        "v": {"oneOf": [{"type": "number"}, {"type": "integer"}]},
+        "w": {"allOf": [{"type": "number"}, {"minimum": 0}]},
+    })
+    assert validate({"v": 1.5}) is None
+    assert validate({"v": 1}) == "v must match exactly one of the allowed schemas"
+    assert validate({"w": -1}) == "w must be >= 0"
+
+
+def test_annotations_are_ignored():
+    validate = _validator({"q": {"type": "string", "description": "query", "default": "", "examples": ["a"]}})
+    assert validate({"q": "x"}) is None
+
+
+@pytest.mark.parametrize("schema", [
+    {"type": "array"},
+    {"type": "object", "properties": {"a": {"$ref": "#/defs/a"}}},
+    {"type": "object", "properties": {"a": {"type": "strng"}}},
+    {"type": "object", "properties": {"a": {"minLength": -1}}},
+    {"type": "object", "properties": {"a": {"maximum": "10"}}},
+    {"type": "object", "properties": {"a": {"pattern": "("}}},
+    {"type": "object", "properties": {"a": {"enum": []}}},
+    {"type": "object", "properties": {"a": {"anyOf": []}}},
+    {"type": "object", "required": "a"},
+    {"type": "object", "properties": []},
+])
+def test_bad_schemas_raise_at_compile_time(schema):
+    with pytest.raises(SchemaError):
+        compile_schema(schema)
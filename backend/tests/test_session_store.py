@@ -0,0 +1,96 @@
+import pytest
+
+from core.memory import session_store
+from core.memory.session_store import SessionStore
+from core.storage.sqlite_store import SQLiteStore
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(session_store, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def sqlite(tmp_path):
+    store = SQLiteStore(str(tmp_path / "nexus.db"))
+    yield store
+    store.close()
+
+
+def _history(sessions, session_id):
+    return [message["content"] for message in sessions.get_history(session_id)]
+
+
+def test_history_keeps_the_last_turns_as_messages(clock):
+    sessions = SessionStore(max_turns=2)
+    for i in range(3):
+        sessions.append_turn("s", f"q{i}", f"a{i}")
+
+    assert sessions.get_history("s") == [
+        {"role": "user", "content": "q1"},
+        {"role": "assistant", "content": "a1"},
+        {"role": "user", "content": "q2"},
+        {"role": "assistant", "content": "a2"},
+    ]
+    assert sessions.get_history("other") == []
+
+
+def test_idle_sessions_expire(clock):
+    sessions = SessionStore(ttl=60)
+    sessions.append_turn("s", "q0", "a0")
+    clock.now += 30
+    assert _history(sessions, "s") == ["q0", "a0"]
+
+    clock.now += 61
+    sessions.append_turn("s", "q1", "a1")
+    assert _history(sessions, "s") == ["q1", "a1"]
+    clock.now += 61
+    assert sessions.get_history("s") == []
+    assert sessions.get_stats()["evictions"] == 1
+
+
+def test_least_recently_used_sessions_are_evicted(clock):
+    sessions = SessionStore(max_sessions=2)
+    sessions.append_turn("a", "q", "a")
+    sessions.append_turn("b", "q", "a")
+    sessions.append_turn("a", "q2", "a2")
+    sessions.append_turn("c", "q", "a")
+
+    assert sessions.get_history("b") == []
+    assert _history(sessions, "a") == ["q", "a", "q2", "a2"]
+    assert sessions.get_stats() == {"sessions": 2, "turns_recorded": 4, "evictions": 1}
+
+
+def test_delete_and_clear(clock):
+    sessions = SessionStore()
+    sessions.append_turn("a", "q", "a")
+    sessions.append_turn("b", "q", "a")
+    sessions.delete("a")
+    assert sessions.get_history("a") == []
+    sessions.clear()
+    assert sessions.get_stats()["sessions"] == 0
+
+
+def test_sessions_are_shared_through_the_store(clock, sqlite):
+    first = SessionStore(max_turns=2, ttl=60, store=sqlite)
+    second = SessionStore(max_turns=2, ttl=60, store=sqlite)
+    for i in range(3):
+        first.append_turn("s", f"q{i}", f"a{i}")
+
+    assert _history(second, "s") == ["q1", "a1", "q2", "a2"]
+    assert second.get_stats()["sessions"] == 1
+
+    clock.now += 61
+    assert second.get_history("s") == []
+    second.delete("s")
+    assert first.get_stats()["sessions"] == 0
@@ -0,0 +1,166 @@
+import threading
+
+import pytest
+
+from core.storage.sqlite_store import SQLiteStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "nexus.db")
+
+
+@pytest.fixture
+def store(db_path):
+    store = SQLiteStore(db_path)
+    yield store
+    store.close()
+
+
+def _pattern(pattern_id, keywords, frequency=1):
+    return {"id": pattern_id, "keywords": keywords, "frequency": frequency,
+            "first_seen": "2026-01-01T00:00:00", "last_seen": "2026-01-01T00:00:00"}
+
+
+def test_episodes_are_numbered_like_the_json_store(store):
+    ids = store.add_episodes([{"user_message": "a"}, {"user_message": "b"}])
+    assert ids == ["0", "1"]
+    assert store.add_episodes([{"user_message": "c"}]) == ["2"]
+    assert store.count_episodes() == 3
+    assert [e["user_message"] for e in store.recent_episodes(2)] == ["b", "c"]
+    assert store.get_episode("1")["user_message"] == "b"
+    assert store.get_episode("9") is None
+
+
+def test_reimported_episode_ids_are_ignored(store):
+    store.add_episodes([{"id": "0", "user_message": "a"}, {"id": "1", "user_message": "b"}])
+    store.add_episodes([{"id": "1", "user_message": "b again"}, {"id": "2", "user_message": "c"}])
+    assert store.count_episodes() == 3
+    assert store.get_episode("1")["user_message"] == "b"
+    # No seq is left unused, so generated ids continue the numbering
+    assert store.add_episodes([{"user_message": "d"}]) == ["3"]
+
+
+def test_search_ranks_filters_and_quotes_user_input(store):
+    store.add_episodes([
+        {"user_message": "python sorting", "agent_response": "use sorted", "timestamp": "2026-01-01"},
+        {"user_message": "rust ownership", "agent_response": "borrow checker", "timestamp": "2026-02-01"},
+        {"user_message": "python python generators", "agent_response": "yield", "timestamp": "2026-03-01"},
+    ])
+    page = store.search_episodes("python")
+    assert page["total"] == 2
+    assert page["results"][0]["episode"]["user_message"] == "python python generators"
+
+    assert store.search_episodes("python", start_time="2026-02-15")["total"] == 1
+    # FTS5 operators in the query are searched for literally, not parsed
+    assert store.search_episodes('python" OR rust*')["total"] == 3
+    assert store.search_episodes("", limit=1, offset=1)["results"][0]["episode"]["user_message"] == "rust ownership"
+
+
+def test_clear_episodes_empties_search(store):
+    store.add_episodes([{"user_message": "python"}])
+    store.clear_episodes()
+    assert store.count_episodes() == 0
+    assert store.search_episodes("python")["total"] == 0
+
+
+def test_racing_appends_get_distinct_positions(db_path):
+    first, second = SQLiteStore(db_path), SQLiteStore(db_path)
+    try:
+        a = first.save_patterns("keywords", [(0, _pattern("pattern_0", ["python"]), None)], [])
+        assert a["positions"] == {0: 0}
+        assert (a["before"], a["after"]) == (0, 1)
+
+        # The second process also thinks position 0 is free
+        b = second.save_patterns("keywords", [(0, _pattern("pattern_0", ["rust"]), None)], [])
+        assert b["positions"] == {0: 1}
+        assert (b["before"], b["after"]) == (1, 2)
+
+        stored = [p for p, _ in first.load_patterns("keywords")]
+        assert [p["id"] for p in stored] == ["pattern_0", "pattern_1"]
+        assert [p["keywords"] for p in stored] == [["python"], ["rust"]]
+    finally:
+        first.close()
+        second.close()
+
+
+def test_frequency_bumps_add_up_and_do_not_bump_the_generation(db_path):
+    first, second = SQLiteStore(db_path), SQLiteStore(db_path)
+    try:
+        first.save_patterns("clusters", [(0, _pattern("cluster_0", ["a"]), b"\x00" * 4)], [])
+        generation = first.generation("patterns:clusters")
+
+        result = first.save_patterns("clusters", [], [(0, 2, "2026-02-01T00:00:00", None)])
+        result = second.save_patterns("clusters", [], [(0, 3, "2026-01-15T00:00:00", b"\x01" * 4)])
+        assert result["frequencies"] == {0: 6}
+        assert result["before"] == result["after"] == generation
+
+        pattern, centroid = first.load_patterns("clusters")[0]
+        assert pattern["last_seen"] == "2026-02-01T00:00:00"
+        assert centroid == b"\x01" * 4
+        # Modes are separate
+        assert first.load_patterns("keywords") == []
+    finally:
+        first.close()
+        second.close()
+
+
+def test_skills_count_uses_and_success(store):
+    store.record_skill_uses([("calculate", {}), ("calculate", {})])
+    skills = store.record_skill_uses([("calculate", {})] * 9)
+    assert skills["calculate"]["uses"] == 10
+    assert skills["calculate"]["level"] == 2
+
+    assert store.update_skill_success("calculate", True)["success_rate"] == pytest.approx(1 / 11)
+    assert store.update_skill_success("missing", True) is None
+
+
+def test_import_skills_reports_inserted_rows(store):
+    skill = {"level": 3, "uses": 20, "success_rate": 0.5, "created": "2026-01-01"}
+    assert store.import_skills({"a": skill, "b": skill}) == 2
+    assert store.import_skills({"b": skill, "c": skill}) == 1
+    assert list(store.load_skills()) == ["a", "b", "c"]
+
+
+def test_sessions_keep_the_last_turns_and_expire(store):
+    for i in range(4):
+        turns = store.append_session_turn("s", (f"q{i}", f"a{i}"), max_turns=3, now=100.0 + i, min_last_seen=0.0)
+    assert turns == [("q1", "a1"), ("q2", "a2"), ("q3", "a3")]
+    assert store.load_session("s", min_last_seen=100.0) == turns
+    assert store.load_session("s", min_last_seen=200.0) == []
+
+    # An expired session starts over
+    assert store.append_session_turn("s", ("q", "a"), 3, now=300.0, min_last_seen=250.0) == [("q", "a")]
+    store.append_session_turn("t", ("q", "a"), 3, now=50.0, min_last_seen=0.0)
+    assert store.delete_sessions_before(100.0) == 1
+    assert store.count_sessions() == 1
+
+
+def test_generations_are_shared_between_stores(db_path):
+    first, second = SQLiteStore(db_path), SQLiteStore(db_path)
+    try:
+        assert second.generation("memory") == 0
+        assert first.bump_generation("memory") == 1
+        assert second.generation("memory") == 1
+    finally:
+        first.close()
+        second.close()
+
+
+def test_close_from_another_thread(db_path):
+    store = SQLiteStore(db_path)
+    worker = threading.Thread(target=store.add_episodes, args=([{"user_message": "a"}],))
+    worker.start()
+    worker.join()
+    store.close()
+    # Reopens lazily on next use
+    assert store.count_episodes() == 1
+    store.close()
+
+
+def test_failed_transaction_rolls_back(store):
+    with pytest.raises(RuntimeError):
+        with store.transaction() as conn:
+            conn.execute("INSERT INTO generations (name, value) VALUES ('x', 5)")
+            raise RuntimeError("boom")
+    assert store.generation("x") == 0
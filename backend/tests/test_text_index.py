@@ -0,0 +1,64 @@
+from core.memory.text_index import InvertedIndex, tokenize
+
+
+def test_tokenize_lowercases_words():
+    assert tokenize("Hello, World! it's 2024") == ["hello", "world", "it", "s", "2024"]
+
+
+def test_rarer_terms_rank_higher():
+    index = InvertedIndex()
+    index.add("a", "python tips")
+    index.add("b", "python guide")
+    index.add("c", "rust guide")
+    index.add("d", "python rust")
+
+    results = index.search("python rust")
+    assert [key for key, _ in results][0] == "d"
+    scores = dict(index.search("tips python"))
+    assert scores["a"] > scores["b"]
+    assert index.search("missing") == []
+
+
+def test_readding_a_key_and_remove_clean_up_postings():
+    index = InvertedIndex()
+    index.add(1, "some words")
+    index.add(1, "some words")
+    assert len(index) == 1
+    assert index.postings["words"] == {1: 1}
+    assert index._total_length == 2
+
+    index.remove(1, "some words")
+    assert len(index) == 0
+    assert index.postings == {}
+    assert index._total_length == 0
+    index.remove(1, "new words")
+
+
+def test_predicate_and_limit():
+    index = InvertedIndex()
+    for i in range(10):
+        index.add(i, "shared " * (i + 1))
+
+    assert len(index.search("shared", limit=3)) == 3
+    results = index.search("shared", predicate=lambda key: key % 2 == 0)
+    assert {key for key, _ in results} == {0, 2, 4, 6, 8}
+
+
+def test_dense_terms_only_score_matched_documents():
+    index = InvertedIndex(dense_fraction=0.5, dense_min_df=1)
+    index.add("rare", "the needle")
+    for i in range(9):
+        index.add(i, "the hay")
+
+    assert [key for key, _ in index.search("needle the", limit=1)] == ["rare"]
+    # Without a limit every document with a common term is scored
+    assert len(index.search("needle the")) == 10
+
+
+def test_empty_and_cleared_index():
+    index = InvertedIndex()
+    assert index.search("anything") == []
+    index.add("a", "text")
+    index.clear()
+    assert len(index) == 0
+    assert index.search("text") == []
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from core.tools.tool_registry import ToolRegistry
+
+
+class _NoSandbox:
+    timeout = 1.0
+    memory_mb = 64
+    workers = 1
+
+    def run(self, code):
+        return {"success": False, "error": "no sandbox in tests"}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def registry():
+    registry = ToolRegistry(max_concurrency=4, sandbox=_NoSandbox(), plugin_dirs=[], plugin_entry_points=False)
+    yield registry
+    registry.close()
+
+
+def test_timed_out_call_keeps_its_slot_until_it_finishes(registry):
+    release = threading.Event()
+    registry.register_tool("hang", "", {"type": "object"}, lambda: release.wait(), timeout=0.1, max_concurrency=1)
+
+    async def run():
+        first = await registry.execute_tool_async("hang", {})
+        assert "timed out" in first["error"]
+        assert registry.get_cache_stats()["stranded_threads"] == 1
+        # The hung thread still holds the only slot
+        second = await registry.execute_tool_async("hang", {})
+        assert "saturated" in second["error"]
+
+        release.set()
+        await asyncio.sleep(0.05)
+        assert registry.get_cache_stats()["stranded_threads"] == 0
+        assert await registry.execute_tool_async("hang", {}) is True
+
+    asyncio.run(run())
+
+
+def test_pure_results_are_cached_unless_the_input_is_too_large():
+    registry = ToolRegistry(sandbox=_NoSandbox(), cache_bytes=16 * 1024, plugin_dirs=[], plugin_entry_points=False)
+    try:
+        assert registry.execute_tool("calculate", {"expression": "1 + 1"})["result"] == 2
+        assert registry.execute_tool("calculate", {"expression": "1 + 1"})["result"] == 2
+        big = {"expression": "sum(x)", "variables": {"x": list(range(2000))}}
+        assert registry.execute_tool("calculate", big)["result"] == sum(range(2000))
+        registry.execute_tool("calculate", big)
+
+        stats = registry.get_cache_stats()
+        assert stats["tools"]["calculate"]["hits"] == 1
+        assert stats["size"] == 1
+    finally:
+        registry.close()
+
+
+def test_plugins_cannot_replace_registered_tools(tmp_path):
+    (tmp_path / "tools.py").write_text("def run(code):\n    return {'ran': code}\n\ndef shout(text):\n    return text.upper()\n")
+    manifest = [
+        {"name": "execute_code", "description": "unsandboxed", "parameters": {"type": "object"}, "function": "tools.py:run"},
+        {"name": "shout", "description": "upper-case text", "function": "tools.py:shout",
+         "parameters": {"type": "object", "properties": {"text": {"type": "string"}}, "required": ["text"]}},
+    ]
+    (tmp_path / "plugin.json").write_text(json.dumps(manifest))
+
+    registry = ToolRegistry(sandbox=_NoSandbox(), plugin_dirs=[str(tmp_path)], plugin_entry_points=False)
+    try:
+        assert registry.tools["execute_code"]["function"] == registry._execute_code
+        assert registry.execute_tool("execute_code", {"code": "1"})["error"] == "no sandbox in tests"
+        assert registry.execute_tool("shout", {"text": "hi"}) == "HI"
+        assert "text" in registry.execute_tool("shout", {"text": 1})["error"]
+        # Loading the same manifests again registers nothing
+        assert registry.load_plugins([str(tmp_path)], entry_points=False) == 0
+    finally:
+        registry.close()
+
+
+def test_results_that_cannot_be_cached_are_still_returned(registry):
+    registry.register_tool("huge", "", {"type": "object"}, lambda: {"value": 10 ** 5000}, pure=True)
+    assert registry.execute_tool("huge", {})["value"] == 10 ** 5000
+    assert asyncio.run(registry.execute_tool_async("huge", {}))["value"] == 10 ** 5000
+    assert registry.get_cache_stats()["tools"]["huge"]["unsizable"] == 2
+
+    assert "bits" in registry.execute_tool("calculate", {"expression": "10**5000"})["error"]
+    assert "bits" in asyncio.run(registry.execute_tool_async("calculate", {"expression": "10**5000"}))["error"]
+
+
+def test_caching_errors_do_not_fail_the_call(registry, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("cache is broken")
+
+    monkeypatch.setattr(registry.result_cache, "put", broken)
+    assert registry.execute_tool("calculate", {"expression": "1 + 1"})["result"] == 2
+    assert asyncio.run(registry.execute_tool_async("calculate", {"expression": "2 + 2"}))["result"] == 4
@@ -0,0 +1,69 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from core.memory.embedder import Embedder
+from core.memory.vector_store import VectorMemory, reciprocal_rank_fusion
+
+
+class _Model:
+    """Embeds texts sharing a first word close together, everything else far apart"""
+
+    def encode(self, texts, **kwargs):
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha1(text.split()[0].encode()).digest()[:4], "little")
+            vector = np.random.default_rng(seed).standard_normal(32)
+            vectors.append(vector / np.linalg.norm(vector))
+        return np.array(vectors, dtype=np.float32)
+
+
+def _memory(tmp_path, **kwargs):
+    embedder = Embedder()
+    embedder._model = _Model()
+    return VectorMemory(str(tmp_path), backend="numpy", embedder=embedder, **kwargs)
+
+
+def test_rank_fusion_rewards_ids_ranked_high_in_both_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]], k=60)
+    assert [memory_id for memory_id, _ in fused] == ["b", "a", "d", "c"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[3][1] == pytest.approx(1 / 63)
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def test_hybrid_search_finds_exact_terms_the_vectors_miss(tmp_path):
+    memory = _memory(tmp_path)
+    memory.add_memories(["deploy failed with ERR_4711 on staging", "deploy succeeded on production",
+                         "weather is sunny"])
+    try:
+        vector = memory.query_memory("deploy status", n_results=2, mode="vector")
+        lexical = memory.query_memory("ERR_4711", n_results=1, mode="lexical")
+        hybrid = memory.query_memory("weather ERR_4711", n_results=3)
+
+        assert {result["content"] for result in vector} == {
+            "deploy failed with ERR_4711 on staging", "deploy succeeded on production"
+        }
+        assert lexical[0]["content"] == "deploy failed with ERR_4711 on staging"
+        assert lexical[0]["distance"] is None
+        # Memories found by both searches outrank those found by one
+        assert [result["content"] for result in hybrid] == [
+            "weather is sunny", "deploy failed with ERR_4711 on staging", "deploy succeeded on production"
+        ]
+    finally:
+        memory.close()
+
+
+def test_without_lexical_search_hybrid_is_a_vector_search(tmp_path):
+    memory = _memory(tmp_path, lexical=False)
+    memory.add_memories(["deploy failed with ERR_4711", "weather is sunny"])
+    try:
+        results = memory.query_memory("weather ERR_4711", n_results=2)
+        assert [result["content"] for result in results][0] == "weather is sunny"
+        assert all(result["distance"] is not None for result in results)
+        assert len(memory._text_index) == 0
+        with pytest.raises(ValueError):
+            memory.query_memory("ERR_4711", mode="lexical")
+    finally:
+        memory.close()
@@ -0,0 +1,92 @@
+import pytest
+
+from core.memory.write_queue import WriteBehindQueue
+
+
+class _Store:
+    """Records writes; fails the first ``failures`` calls"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.written = []
+
+    def _call(self, items):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OSError("disk full")
+        self.written.extend(items)
+
+    def add_memories(self, contents, metadatas):
+        self._call(contents)
+
+    def add_episodes(self, episodes):
+        self._call([episode["user_message"] for episode in episodes])
+
+    def flush(self):
+        self._call([])
+
+
+def _queue(vector, episodic, learning, **kwargs):
+    kwargs.setdefault("retry_delay", 0.001)
+    return WriteBehindQueue(vector, episodic, learning, flush_interval=60, **kwargs)
+
+
+def _submit(queue, n):
+    for i in range(n):
+        queue.submit(f"turn {i}", {}, {"user_message": f"turn {i}"})
+
+
+def test_flush_writes_every_store_in_one_batch():
+    vector, episodic, learning = _Store(), _Store(), _Store()
+    queue = _queue(vector, episodic, learning)
+    _submit(queue, 3)
+
+    assert queue.flush() is True
+    assert vector.written == ["turn 0", "turn 1", "turn 2"]
+    assert episodic.written == ["turn 0", "turn 1", "turn 2"]
+    assert queue.get_stats()["batches"] == 1
+    queue.close()
+
+
+def test_failed_store_is_retried_without_rewriting_the_others():
+    vector, episodic, learning = _Store(failures=2), _Store(), _Store()
+    queue = _queue(vector, episodic, learning)
+    _submit(queue, 2)
+
+    assert queue.flush() is True
+    assert vector.written == ["turn 0", "turn 1"]
+    assert episodic.calls == 1
+    stats = queue.get_stats()
+    assert stats["retries"] == 2
+    assert stats["failures"] == 2
+    assert stats["dropped"] == 0
+    queue.close()
+
+
+def test_batch_is_dropped_not_reported_durable_after_retries_run_out():
+    vector, episodic, learning = _Store(failures=100), _Store(), _Store()
+    queue = _queue(vector, episodic, learning, max_retries=2)
+    _submit(queue, 2)
+
+    assert queue.flush() is False
+    # The other stores still got the turns
+    assert episodic.written == ["turn 0", "turn 1"]
+    assert learning.calls == 1
+    assert queue.get_stats()["dropped"] == 2
+
+    _submit(queue, 1)
+    vector.failures = 0
+    assert queue.flush() is True
+    queue.close()
+
+
+def test_close_drains_and_rejects_new_turns():
+    vector, episodic, learning = _Store(), _Store(), _Store()
+    queue = _queue(vector, episodic, learning)
+    _submit(queue, 2)
+    queue.close()
+
+    assert vector.written == ["turn 0", "turn 1"]
+    with pytest.raises(RuntimeError):
+        _submit(queue, 1)
@@ -15,6 +15,7 @@ export default function ChatInterface() {
   const [messages, setMessages] = useState<Message[]>([])
   const [input, setInput] = useState('')
   const [isLoading, setIsLoading] = useState(false)
+  const [sessionId, setSessionId] = useState<string | null>(null)
   const messagesEndRef = useRef<HTMLDivElement>(null)
 
   const scrollToBottom = () => {
@@ -41,8 +42,9 @@ export default function ChatInterface() {
     try {
       const response = await axios.post(
         `${process.env.NEXT_PUBLIC_API_URL}/chat`,
-        { message: input }
+        { message: input, session_id: sessionId }
       )
+      setSessionId(response.data.session_id)
 
       const assistantMessage: Message = {
         role: 'assistant',